@@ -0,0 +1,211 @@
+import io
+from typing import TYPE_CHECKING, Optional
+
+from sqlitecloud.datatypes import SQLITECLOUD_DEFAULT, BytesLike
+from sqlitecloud.exceptions import (
+    SQLiteCloudOperationalError,
+    SQLiteCloudProgrammingError,
+)
+
+if TYPE_CHECKING:
+    from sqlitecloud.dbapi2 import Connection
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class SQLiteCloudBlob(io.RawIOBase):
+    """
+    File-like access to a BLOB stored in a table cell, created with
+    `Connection.blob_reader()` or `Connection.blob_writer()`.
+
+    The BLOB is read and written in ranges of at most `chunk_size` bytes,
+    one statement for each range, so the memory used does not depend
+    on the size of the BLOB.
+
+    Like `sqlite3.Blob`, the size of the BLOB cannot be changed by writing:
+    allocate it beforehand, eg with `zeroblob(N)`. A cell of another type
+    cannot be opened.
+
+    SQL cannot write a range of a BLOB in place: each range written rewrites
+    the whole cell on the server, so writing a BLOB of N bytes costs
+    O(N * N / chunk_size). Use a larger `chunk_size` for large BLOBs.
+    """
+
+    def __init__(
+        self,
+        connection: "Connection",
+        table: str,
+        column: str,
+        rowid: int,
+        readonly: bool = True,
+        chunk_size: int = SQLITECLOUD_DEFAULT.BLOB_CHUNK_SIZE.value,
+        name: str = "main",
+    ) -> None:
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be greater than zero")
+
+        super().__init__()
+
+        self._connection = connection
+        self._rowid = rowid
+        self._readonly = readonly
+        self._chunk_size = chunk_size
+        self._position = 0
+        self._name = name
+
+        target = f"{_quote_identifier(name)}.{_quote_identifier(table)}"
+        column = _quote_identifier(column)
+
+        self._sql_length = (
+            f"SELECT typeof({column}), length({column}) FROM {target} WHERE rowid = ?"
+        )
+        self._sql_read = f"SELECT substr({column}, ?, ?) FROM {target} WHERE rowid = ?"
+        # the cell is rewritten replacing the range: prefix || data || suffix.
+        # `||` returns TEXT, with the same bytes only in UTF-8 databases:
+        # the others splice the hex of the bytes, with unhex() of SQLite 3.41
+        self._sql_write = (
+            f"UPDATE {target} SET {column} = CAST("
+            f"substr({column}, 1, ?) || ? || substr({column}, ?) AS BLOB) "
+            "WHERE rowid = ?"
+        )
+        self._sql_write_hex = (
+            f"UPDATE {target} SET {column} = unhex("
+            f"hex(substr({column}, 1, ?)) || hex(?) || hex(substr({column}, ?))) "
+            "WHERE rowid = ?"
+        )
+        self._utf8: Optional[bool] = None
+
+        self._size = self._fetch_size()
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return not self._readonly
+
+    def seekable(self) -> bool:
+        return True
+
+    def __len__(self) -> int:
+        return self._size
+
+    def tell(self) -> int:
+        self._ensure_open()
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self._ensure_open()
+
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self._size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+
+        if position < 0 or position > self._size:
+            raise ValueError("Offset out of blob range")
+
+        self._position = position
+        return self._position
+
+    def readinto(self, buffer: BytesLike) -> int:
+        """
+        Read up to `len(buffer)` bytes into the buffer, with a single
+        statement of at most `chunk_size` bytes.
+
+        Returns:
+            int: The number of bytes read, zero at the end of the BLOB.
+        """
+        self._ensure_open()
+
+        view = memoryview(buffer).cast("B")
+        length = min(len(view), self._size - self._position, self._chunk_size)
+        if length <= 0:
+            return 0
+
+        cursor = self._connection.execute(
+            self._sql_read, (self._position + 1, length, self._rowid)
+        )
+        row = cursor.fetchone()
+        data = row[0] if row else None
+        if data is None:
+            raise SQLiteCloudOperationalError("The blob row no longer exists.")
+
+        nread = len(data)
+        view[:nread] = data
+        self._position += nread
+
+        return nread
+
+    def readall(self) -> bytes:
+        """Read until the end of the BLOB, in ranges of `chunk_size` bytes."""
+        data = bytearray()
+        while True:
+            chunk = self.read(self._chunk_size)
+            if not chunk:
+                break
+            data += chunk
+
+        return bytes(data)
+
+    def write(self, data: BytesLike) -> int:
+        """
+        Write the data at the current position, splitting it in ranges
+        of `chunk_size` bytes.
+
+        Raises:
+            ValueError: If the data does not fit in the BLOB.
+        """
+        self._ensure_open()
+        if self._readonly:
+            raise SQLiteCloudProgrammingError("The blob is opened in read-only mode.")
+
+        view = memoryview(data).cast("B")
+        if self._position + len(view) > self._size:
+            raise ValueError("Data is larger than the blob")
+
+        if self._utf8 is None:
+            cursor = self._connection.execute(
+                f"PRAGMA {_quote_identifier(self._name)}.encoding"
+            )
+            row = cursor.fetchone()
+            self._utf8 = row is None or row[0] == "UTF-8"
+        sql = self._sql_write if self._utf8 else self._sql_write_hex
+
+        for start in range(0, len(view), self._chunk_size):
+            chunk = view[start : start + self._chunk_size]
+            self._connection.execute(
+                sql,
+                (
+                    self._position,
+                    chunk,
+                    self._position + len(chunk) + 1,
+                    self._rowid,
+                ),
+            )
+            self._position += len(chunk)
+
+        return len(view)
+
+    def close(self) -> None:
+        self._connection = None
+        super().close()
+
+    def _fetch_size(self) -> int:
+        cursor = self._connection.execute(self._sql_length, (self._rowid,))
+        row = cursor.fetchone()
+        if row is None:
+            raise SQLiteCloudOperationalError(f"no such rowid: {self._rowid}")
+        if row[0] != "blob":
+            raise SQLiteCloudOperationalError(f"cannot open value of type {row[0]}")
+
+        return row[1]
+
+    def _ensure_open(self) -> None:
+        if self.closed:
+            raise SQLiteCloudProgrammingError("Cannot operate on a closed blob.")
@@ -0,0 +1,799 @@
+import copy
+import hashlib
+import io
+import os
+import re
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from sqlitecloud.datatypes import (
+    SQLITECLOUD_CMD,
+    SQLITECLOUD_PUBSUB_SUBJECT,
+    SQLiteCloudConnect,
+)
+from sqlitecloud.driver import Driver
+from sqlitecloud.exceptions import SQLiteCloudException
+from sqlitecloud.pubsub import SQLiteCloudPubSub
+from sqlitecloud.resultset import (
+    SQLITECLOUD_RESULT_TYPE,
+    SQLiteCloudResult,
+    SQLiteCloudResultSet,
+)
+from sqlitecloud.sqltokens import SQL_TOKEN_PATTERN, normalize_select
+
+# Python variable names: start with letter or underscore, followed by letters, digits, or underscores
+NAMED_PARAMETER_PATTERN = re.compile(r":([a-zA-Z_][a-zA-Z0-9_]*)")
+
+# words after a table that are not its alias
+_NOT_ALIASES = set(
+    "WHERE GROUP ORDER LIMIT HAVING WINDOW UNION EXCEPT INTERSECT JOIN LEFT RIGHT "
+    "FULL INNER OUTER CROSS NATURAL ON USING INDEXED NOT RETURNING".split()
+)
+
+
+class SQLiteCloudStatement:
+    """
+    Represents the parts of a statement that do not change between executions:
+    the query serialized with the SCSP protocol and the order of its named parameters.
+    """
+
+    def __init__(self, sql: str, encoded_sql: bytes) -> None:
+        self.sql = sql
+        # query already serialized as zero-terminated string, ready to be sent
+        self.encoded_sql = encoded_sql
+        # parsed only the first time the statement is executed with named parameters
+        self._named_parameters: Optional[Tuple[str, ...]] = None
+
+    @property
+    def named_parameters(self) -> Tuple[str, ...]:
+        """Names of the placeholders in order of appearance, without duplicates."""
+        if self._named_parameters is None:
+            matches = NAMED_PARAMETER_PATTERN.findall(self.sql)
+            # filter out duplicates
+            self._named_parameters = tuple(dict.fromkeys(matches))
+
+        return self._named_parameters
+
+
+class StatementCache:
+    """
+    Bounded LRU cache of statements keyed by the SQL text.
+
+    Args:
+        maxsize (int): The maximum number of statements to keep. Zero disables the cache.
+        encoder (Callable[[str], bytes]): Serializes the query text of a statement.
+    """
+
+    def __init__(self, maxsize: int, encoder: Callable[[str], bytes]) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+        self._encoder = encoder
+        self._statements: "OrderedDict[str, SQLiteCloudStatement]" = OrderedDict()
+        # the cache is shared by the threads using the same connection
+        self._lock = threading.Lock()
+
+    def get(self, sql: str) -> SQLiteCloudStatement:
+        """
+        Return the cached statement for the SQL text, creating it on a miss.
+        """
+        with self._lock:
+            statement = self._statements.get(sql)
+            if statement is not None:
+                self.hits += 1
+                self._statements.move_to_end(sql)
+                return statement
+
+            self.misses += 1
+
+        statement = SQLiteCloudStatement(sql, self._encoder(sql))
+
+        if self.maxsize > 0:
+            with self._lock:
+                self._statements[sql] = statement
+                if len(self._statements) > self.maxsize:
+                    # evict the least recently used
+                    self._statements.popitem(last=False)
+
+        return statement
+
+    def clear(self) -> None:
+        with self._lock:
+            self._statements.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._statements)
+
+    def __contains__(self, sql: str) -> bool:
+        return sql in self._statements
+
+
+class ResultCache:
+    """
+    Client-side LRU cache of query results, kept fresh by the PubSub
+    notifications of the tables the results are read from.
+
+    Only the rowsets of single SELECT statements are cached and each entry is
+    tagged with the tables of its columns (the `tblname` of the rowset header).
+    A result is cached only when the statement reads no other table than the ones
+    of its columns, eg tables only in a WHERE clause or a subquery are not tagged.
+    The cache starts listening for the changes of the tables of a statement
+    before executing it the first time, so that no change can be missed.
+    Results with columns not coming from a table, like `count(*)`, are not cached.
+
+    The entries are distinguished by the host, port and database of the
+    connection executing the statement, and each hit returns a copy
+    of the result.
+
+    Any other statement executed through the cache invalidates all its entries,
+    so that the writes of the connection are read back immediately.
+
+    Table names are sent by the server only in the rowsets with the columns
+    metadata (version 2): the other results are never cached.
+
+    Args:
+        pubsub_connection (SQLiteCloudConnect): A connection to the same database
+            reserved to the cache to receive the notifications of the tables.
+        maxsize (int): The maximum number of results to keep.
+        maxbytes (int): The maximum estimated size in bytes of the cached results.
+    """
+
+    def __init__(
+        self,
+        pubsub_connection: SQLiteCloudConnect,
+        maxsize: int = 1024,
+        maxbytes: int = 64 * 1024 * 1024,
+    ) -> None:
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self._pubsub = SQLiteCloudPubSub()
+        self._pubsub_connection = pubsub_connection
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, _ResultCacheEntry]" = OrderedDict()
+        self._nbytes = 0
+        # tables already listened on the pubsub connection
+        self._listening: Set[str] = set()
+        # counter of the invalidations, and the last value for each table
+        self._clock = 0
+        self._invalidated_at: Dict[str, int] = {}
+
+    @property
+    def nbytes(self) -> int:
+        """The estimated size in bytes of the cached results."""
+        return self._nbytes
+
+    def key(
+        self,
+        sql: str,
+        parameters: Union[Tuple[Any, ...], Dict[Any, Any]] = (),
+        connection: Optional[SQLiteCloudConnect] = None,
+    ) -> Optional[Tuple]:
+        """
+        Build the key of the statement, or None if its result cannot be cached.
+        """
+        normalized = normalize_select(sql)
+        if normalized is None:
+            return None
+
+        # 1, True and 1.0 are equal but they are different parameters
+        if isinstance(parameters, dict):
+            parameters = sorted((k, (type(v), v)) for k, v in parameters.items())
+        else:
+            parameters = [(type(v), v) for v in parameters]
+
+        key = (_database_namespace(connection), normalized, tuple(parameters))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+
+        return key
+
+    def execute(
+        self,
+        sql: str,
+        parameters: Union[Tuple[Any, ...], Dict[Any, Any]],
+        run: Callable[[], Any],
+        connection: Optional[SQLiteCloudConnect] = None,
+    ) -> Any:
+        """
+        Return the cached result of the statement, or call `run` to execute it.
+
+        Args:
+            sql (str): The SQL statement.
+            parameters (Union[Tuple[Any, ...], Dict[Any, Any]]): The parameters of the statement.
+            run (Callable[[], Any]): Executes the statement on the server.
+            connection (Optional[SQLiteCloudConnect]): The connection executing it,
+                whose database distinguishes the entries.
+        """
+        if normalize_select(sql) is None:
+            # it can be a write: read it back from the server
+            try:
+                return run()
+            finally:
+                self.invalidate()
+
+        key = self.key(sql, parameters, connection)
+        if key is None:
+            return run()
+
+        result = self.get(key)
+        if result is not None:
+            return result
+
+        tables = _select_tables(key[1])
+        if tables:
+            with self._lock:
+                tables -= self._listening
+            self._listen(tables)
+
+        clock = self.clock()
+        result = run()
+        self.put(key, result, clock)
+
+        return result
+
+    def get(self, key: Tuple) -> Optional[SQLiteCloudResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return _copy_result(entry.result)
+
+    def clock(self) -> int:
+        """
+        Take the current value of the invalidations clock before running a query,
+        to be passed to `put()` with its result.
+        """
+        with self._lock:
+            return self._clock
+
+    def put(self, key: Tuple, result: SQLiteCloudResult, clock: int) -> bool:
+        """
+        Store the result of the query unless its tables changed since `clock`.
+
+        Returns:
+            bool: True if the result has been cached.
+        """
+        if (
+            not isinstance(result, SQLiteCloudResult)
+            or result.tag != SQLITECLOUD_RESULT_TYPE.RESULT_ROWSET
+        ):
+            return False
+
+        tables = {name.lower() for name in result.tblname}
+        if not tables or "" in tables or len(result.tblname) != result.ncols:
+            return False
+
+        # the changes of a table read only to filter the rows are not listened to
+        read = _select_tables(key[1])
+        if not read or not read <= tables:
+            return False
+
+        with self._lock:
+            new_tables = tables - self._listening
+
+        if new_tables:
+            # changes happened before listening cannot be detected,
+            # the result is cached starting from the next execution
+            self._listen(new_tables)
+            return False
+
+        nbytes = _estimate_size(result)
+        if nbytes > self.maxbytes:
+            return False
+
+        with self._lock:
+            if any(self._invalidated_at.get(t, -1) > clock for t in tables):
+                # the result may be already stale
+                return False
+
+            previous = self._entries.pop(key, None)
+            if previous:
+                self._nbytes -= previous.nbytes
+
+            # the caller can change the result it got
+            self._entries[key] = _ResultCacheEntry(_copy_result(result), tables, nbytes)
+            self._nbytes += nbytes
+
+            while len(self._entries) > self.maxsize or self._nbytes > self.maxbytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+                self.evictions += 1
+
+        return True
+
+    def invalidate(self, table: Optional[str] = None) -> None:
+        """Discard the results read from the table, or all the results."""
+        with self._lock:
+            self._clock += 1
+            self.invalidations += 1
+
+            if table is None:
+                for name in self._listening:
+                    self._invalidated_at[name] = self._clock
+                self._entries.clear()
+                self._nbytes = 0
+                return
+
+            table = table.lower()
+            self._invalidated_at[table] = self._clock
+
+            for key in [k for k, e in self._entries.items() if table in e.tables]:
+                self._nbytes -= self._entries.pop(key).nbytes
+
+    def clear(self) -> None:
+        self.invalidate()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _listen(self, tables: Set[str]) -> None:
+        for table in tables:
+            self._pubsub.listen(
+                self._pubsub_connection,
+                SQLITECLOUD_PUBSUB_SUBJECT.TABLE,
+                table,
+                self._on_notification,
+            )
+            with self._lock:
+                self._listening.add(table)
+                # the results of the queries started before are not cached:
+                # their changes may not have been notified
+                self._clock += 1
+                self._invalidated_at[table] = self._clock
+
+    def _on_notification(
+        self,
+        connection: SQLiteCloudConnect,
+        result: Optional[SQLiteCloudResultSet],
+        data: Optional[Any],
+    ) -> None:
+        if result is None:
+            # the pubsub connection is lost and the changes can be missed
+            with self._lock:
+                self._listening.clear()
+            self.invalidate()
+            return
+
+        content = result.get_result()
+        table = content.get("channel") if isinstance(content, dict) else None
+        self.invalidate(table if isinstance(table, str) else None)
+
+
+class _ResultCacheEntry:
+    def __init__(self, result: SQLiteCloudResult, tables: Set[str], nbytes: int):
+        self.result = result
+        self.tables = tables
+        self.nbytes = nbytes
+
+
+def _copy_result(result: SQLiteCloudResult) -> SQLiteCloudResult:
+    copied = copy.copy(result)
+    for name, value in vars(result).items():
+        if isinstance(value, list):
+            setattr(copied, name, list(value))
+
+    return copied
+
+
+def _estimate_size(result: SQLiteCloudResult) -> int:
+    """Rough size in bytes of the values of the result."""
+    nbytes = 0
+    for value in result.data:
+        if isinstance(value, (str, bytes, bytearray)):
+            nbytes += len(value)
+        elif isinstance(value, memoryview):
+            nbytes += value.nbytes
+        else:
+            nbytes += 8
+
+    return nbytes + 64 * result.ncols
+
+
+def _select_tables(sql: str) -> Optional[Set[str]]:
+    """
+    The lowercase names of the tables after FROM and JOIN in the statement,
+    including its subqueries. None when a table-valued function is read.
+    """
+    tokens = SQL_TOKEN_PATTERN.findall(sql)
+    tables: Set[str] = set()
+
+    i = 0
+    while i < len(tokens):
+        keyword = tokens[i].upper()
+        i += 1
+        if keyword not in ("FROM", "JOIN"):
+            continue
+
+        while i < len(tokens) and tokens[i] != "(":
+            # schema.table, with quoted names as separate tokens
+            name = tokens[i]
+            while i + 2 < len(tokens) and tokens[i + 1] == ".":
+                i += 2
+                name = tokens[i]
+            i += 1
+            if i < len(tokens) and tokens[i] == "(":
+                return None
+
+            tables.add(_unquote(name.rsplit(".", 1)[-1]).lower())
+            if keyword == "JOIN":
+                break
+
+            # the alias, then the next table of the list
+            if i < len(tokens) and tokens[i].upper() == "AS":
+                i += 2
+            elif (
+                i < len(tokens)
+                and tokens[i].upper() not in _NOT_ALIASES
+                and (tokens[i][0].isalnum() or tokens[i][0] in '_"`[')
+            ):
+                i += 1
+            if i < len(tokens) and tokens[i] == ",":
+                i += 1
+            else:
+                break
+
+    return tables
+
+
+def _unquote(name: str) -> str:
+    if name[:1] in '"`' and len(name) > 1:
+        return name[1:-1].replace(name[0] * 2, name[0])
+    if name[:1] == "[":
+        return name[1:-1]
+    return name
+
+
+class DiskResultCache:
+    """
+    Persistent cache of query results which expire after `ttl` seconds,
+    to share the results of expensive queries between the runs of a process.
+
+    The results are stored as the SCSP messages received from the server
+    and they are parsed again only on a hit. Only the rowsets of single SELECT
+    statements are cached: the entries are not invalidated by the changes
+    of the tables, use it for data that can be stale for up to `ttl` seconds.
+
+    Args:
+        path (str): The directory, or the SQLite database file with `backend="sqlite"`.
+        ttl (float): The seconds after which the results expire.
+        backend (str): Store each result in a file of the directory (`"directory"`)
+            or in a table of a local SQLite database (`"sqlite"`).
+        namespace (Optional[str]): Distinguishes the results of the same query
+            on different databases sharing the same cache. By default, the host,
+            port and database name of the connection executing the statement.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = 3600,
+        backend: str = "directory",
+        namespace: Optional[str] = None,
+    ) -> None:
+        if backend == "directory":
+            self._store = _DirectoryStore(path)
+        elif backend == "sqlite":
+            self._store = _SQLiteStore(path)
+        else:
+            raise ValueError(f"Invalid backend: {backend}")
+
+        self.ttl = ttl
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+        self._driver = Driver()
+
+    def key(
+        self,
+        sql: str,
+        parameters: Union[Tuple[Any, ...], Dict[Any, Any]] = (),
+        connection: Optional[SQLiteCloudConnect] = None,
+    ) -> Optional[str]:
+        """
+        Build the key of the statement, or None if its result cannot be cached.
+        """
+        normalized = normalize_select(sql)
+        if normalized is None:
+            return None
+
+        namespace = self.namespace
+        if namespace is None:
+            namespace = _database_namespace(connection)
+
+        digest = hashlib.sha256()
+        digest.update(_encode_key_value(namespace))
+        digest.update(_encode_key_value(normalized))
+
+        if isinstance(parameters, dict):
+            items = sorted(parameters.items(), key=lambda item: str(item[0]))
+            digest.update(b"d")
+            for name, value in items:
+                digest.update(_encode_key_value(str(name)))
+                encoded = _encode_key_value(value)
+                if encoded is None:
+                    return None
+                digest.update(encoded)
+        else:
+            digest.update(b"t")
+            for value in parameters:
+                encoded = _encode_key_value(value)
+                if encoded is None:
+                    return None
+                digest.update(encoded)
+
+        return digest.hexdigest()
+
+    def execute(
+        self,
+        sql: str,
+        parameters: Union[Tuple[Any, ...], Dict[Any, Any]],
+        run: Callable[..., Any],
+        connection: Optional[SQLiteCloudConnect] = None,
+    ) -> Any:
+        """
+        Return the cached result of the statement, or call `run` to execute it.
+
+        Args:
+            sql (str): The SQL statement.
+            parameters (Union[Tuple[Any, ...], Dict[Any, Any]]): The parameters of the statement.
+            run (Callable[..., Any]): Executes the statement on the server, appending
+                the messages of the response to the list passed as `frames`.
+            connection (Optional[SQLiteCloudConnect]): The connection executing it,
+                whose database is the default namespace of the key.
+        """
+        key = self.key(sql, parameters, connection)
+        if key is None:
+            return run()
+
+        result = self.get(key)
+        if result is not None:
+            return result
+
+        frames: List[bytes] = []
+        result = run(frames=frames)
+        self.put(key, result, frames)
+
+        return result
+
+    def get(self, key: str) -> Optional[SQLiteCloudResult]:
+        entry = self._store.load(key, time.time())
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return self._parse(entry)
+
+    def put(self, key: str, result: SQLiteCloudResult, frames: List[bytes]) -> bool:
+        """
+        Store the messages the result has been parsed from.
+
+        Returns:
+            bool: True if the result has been cached.
+        """
+        if (
+            not isinstance(result, SQLiteCloudResult)
+            or result.tag != SQLITECLOUD_RESULT_TYPE.RESULT_ROWSET
+            or not frames
+            or chr(frames[0][0]) == SQLITECLOUD_CMD.COMMAND.value
+        ):
+            return False
+
+        self._store.save(key, time.time() + self.ttl, _encode_frames(frames))
+        return True
+
+    def prune(self) -> None:
+        """Delete the expired results."""
+        self._store.prune(time.time())
+
+    def clear(self) -> None:
+        self._store.clear()
+
+    def close(self) -> None:
+        self._store.close()
+
+    def _parse(self, entry: bytes) -> SQLiteCloudResult:
+        connection = SQLiteCloudConnect()
+        connection.socket = _FramesSocket(_decode_frames(entry))
+        return self._driver._internal_socket_read(connection)
+
+
+def _encode_key_value(value: Any) -> Optional[bytes]:
+    """
+    Encode a value of the key with its type and length, unlike `repr()`
+    independent of the Python version. None for the types not bound as is.
+    """
+    if value is None:
+        return b"n"
+    if isinstance(value, bool):
+        return b"T" if value else b"F"
+    if isinstance(value, int):
+        data, tag = str(value).encode(), b"i"
+    elif isinstance(value, float):
+        data, tag = value.hex().encode(), b"f"
+    elif isinstance(value, str):
+        data, tag = value.encode("utf-8", "surrogatepass"), b"s"
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        data, tag = bytes(value), b"b"
+    else:
+        return None
+
+    return tag + _ENTRY_FRAME.pack(len(data)) + data
+
+
+def _database_namespace(connection: Optional[SQLiteCloudConnect]) -> str:
+    config = getattr(connection, "config", None)
+    account = getattr(config, "account", None)
+    if account is None:
+        return ""
+
+    return f"{account.hostname}:{account.port}/{account.dbname or ''}"
+
+
+# entry: magic, format version, number of frames,
+# followed by the length of each frame and its bytes
+_ENTRY_HEADER = struct.Struct("<4sBI")
+_ENTRY_FRAME = struct.Struct("<Q")
+_ENTRY_MAGIC = b"SCRC"
+_ENTRY_VERSION = 1
+
+
+def _encode_frames(frames: List[bytes]) -> bytes:
+    parts = [_ENTRY_HEADER.pack(_ENTRY_MAGIC, _ENTRY_VERSION, len(frames))]
+    for frame in frames:
+        parts.append(_ENTRY_FRAME.pack(len(frame)))
+        parts.append(frame)
+
+    return b"".join(parts)
+
+
+def _decode_frames(entry: bytes) -> List[bytes]:
+    magic, version, nframes = _ENTRY_HEADER.unpack_from(entry)
+    if magic != _ENTRY_MAGIC or version != _ENTRY_VERSION:
+        raise SQLiteCloudException("Invalid result cache entry.")
+
+    frames = []
+    offset = _ENTRY_HEADER.size
+    for _ in range(nframes):
+        (length,) = _ENTRY_FRAME.unpack_from(entry, offset)
+        offset += _ENTRY_FRAME.size
+        frames.append(entry[offset : offset + length])
+        offset += length
+
+    return frames
+
+
+class _FramesSocket:
+    """Replays the messages of a response to the socket reader of the driver."""
+
+    def __init__(self, frames: List[bytes]) -> None:
+        self._stream = io.BytesIO(b"".join(frames))
+
+    def recv(self, size: int) -> bytes:
+        return self._stream.read(size)
+
+    def recv_into(self, buffer: memoryview) -> int:
+        return self._stream.readinto(buffer)
+
+
+class _DirectoryStore:
+    """One file for each entry, prefixed by its expiration time."""
+
+    _EXPIRES = struct.Struct("<d")
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        os.makedirs(path, exist_ok=True)
+
+    def load(self, key: str, now: float) -> Optional[bytes]:
+        try:
+            with open(self._filename(key), "rb") as file:
+                (expires,) = self._EXPIRES.unpack(file.read(self._EXPIRES.size))
+                if expires <= now:
+                    return None
+                return file.read()
+        except (OSError, struct.error):
+            return None
+
+    def save(self, key: str, expires: float, entry: bytes) -> None:
+        # write a temporary file first, so readers never see a partial entry
+        fd, tmpname = tempfile.mkstemp(dir=self._path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(self._EXPIRES.pack(expires))
+                file.write(entry)
+            os.replace(tmpname, self._filename(key))
+        except BaseException:
+            os.unlink(tmpname)
+            raise
+
+    def prune(self, now: float) -> None:
+        for name in self._entries():
+            try:
+                with open(name, "rb") as file:
+                    (expires,) = self._EXPIRES.unpack(file.read(self._EXPIRES.size))
+                if expires <= now:
+                    os.unlink(name)
+            except (OSError, struct.error):
+                pass
+
+    def clear(self) -> None:
+        for name in self._entries():
+            try:
+                os.unlink(name)
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        pass
+
+    def _entries(self) -> List[str]:
+        return [
+            os.path.join(self._path, name)
+            for name in os.listdir(self._path)
+            if name.endswith(".scrc")
+        ]
+
+    def _filename(self, key: str) -> str:
+        return os.path.join(self._path, key + ".scrc")
+
+
+class _SQLiteStore:
+    """Entries stored in a table of a local SQLite database."""
+
+    def __init__(self, path: str) -> None:
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results "
+            "(key TEXT PRIMARY KEY, expires REAL NOT NULL, entry BLOB NOT NULL)"
+        )
+        self._db.commit()
+
+    def load(self, key: str, now: float) -> Optional[bytes]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT entry FROM results WHERE key = ? AND expires > ?", (key, now)
+            ).fetchone()
+
+        return row[0] if row else None
+
+    def save(self, key: str, expires: float, entry: bytes) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, expires, entry) VALUES (?, ?, ?)",
+                (key, expires, entry),
+            )
+
+    def prune(self, now: float) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM results WHERE expires <= ?", (now,))
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM results")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -1,8 +1,14 @@
 """ Module to interact with remote SqliteCloud database
 
 """
-from typing import Dict, Optional, Tuple, Union
-
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlitecloud.cache import DiskResultCache, ResultCache
 from sqlitecloud.datatypes import (
     SQLiteCloudAccount,
     SQLiteCloudConfig,
@@ -10,9 +16,20 @@ from sqlitecloud.datatypes import (
     SQLiteCloudDataTypes,
 )
 from sqlitecloud.driver import Driver
-from sqlitecloud.exceptions import SQLiteCloudException
+from sqlitecloud.exceptions import SQLiteCloudException, SQLiteCloudOperationalError
+from sqlitecloud.hedging import HedgingPolicy
+from sqlitecloud.nodes import Node
 from sqlitecloud.resultset import SQLiteCloudResultSet
 
+# a query, or a statement and its parameters
+SQLiteCloudQuery = Union[
+    str,
+    Tuple[
+        str,
+        Union[Tuple[SQLiteCloudDataTypes], Dict[Union[str, int], SQLiteCloudDataTypes]],
+    ],
+]
+
 
 class SQLiteCloudClient:
     """
@@ -35,6 +52,19 @@ class SQLiteCloudClient:
         """
         self._driver = Driver()
 
+        # opt-in cache of the query results, see `ResultCache` and `DiskResultCache`
+        self.result_cache: Optional[Union[ResultCache, DiskResultCache]] = None
+
+        # idle connections used by `exec_many()`
+        self._pool: List[SQLiteCloudConnect] = []
+        self._pool_lock = threading.Lock()
+        self._pool_pid = os.getpid()
+
+        # when `exec_hedged()` sends the copy of a read
+        self.hedging = HedgingPolicy()
+        # runs the reads of `exec_hedged()`
+        self._hedging_executor: Optional[ThreadPoolExecutor] = None
+
         self.config = SQLiteCloudConfig()
 
         if connection_str:
@@ -88,7 +118,15 @@ class SQLiteCloudClient:
         Raises:
             SQLiteCloudException: If an error occurs while executing the query.
         """
-        result = self._driver.execute(query, conn)
+        if self.result_cache is not None:
+            result = self.result_cache.execute(
+                query,
+                (),
+                lambda frames=None: self._driver.execute(query, conn, frames),
+                conn,
+            )
+        else:
+            result = self._driver.execute(query, conn)
 
         return SQLiteCloudResultSet(result)
 
@@ -121,7 +159,17 @@ class SQLiteCloudClient:
         Returns:
             SqliteCloudResultSet: The result set obtained from executing the query.
         """
-        result = self._driver.execute_statement(query, parameters, conn)
+        if self.result_cache is not None:
+            result = self.result_cache.execute(
+                query,
+                parameters,
+                lambda frames=None: self._driver.execute_statement(
+                    query, parameters, conn, frames=frames
+                ),
+                conn,
+            )
+        else:
+            result = self._driver.execute_statement(query, parameters, conn)
 
         return SQLiteCloudResultSet(result)
 
@@ -133,3 +181,221 @@ class SQLiteCloudClient:
             conn (SQLiteCloudConnect): The connection to the database.
         """
         return self._driver.send_blob(blob, conn)
+
+    def exec_many(
+        self, queries: Iterable[SQLiteCloudQuery], concurrency: int = 4
+    ) -> List[Union[SQLiteCloudResultSet, Exception]]:
+        """Executes independent queries in parallel, each on its own connection.
+
+        Up to `concurrency` queries run at the same time. The connections
+        are opened when needed and kept open for the next calls, until `close()`.
+
+        Args:
+            queries (Iterable[SQLiteCloudQuery]): The queries, or tuples of
+                a statement and its parameters as in `exec_statement()`.
+            concurrency (int): The maximum number of queries running at once.
+
+        Returns:
+            List[Union[SqliteCloudResultSet, Exception]]: The result of each query,
+                in the order of the queries, or the exception it raised.
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+
+        workers = max(min(concurrency, len(queries)), 1)
+        with ThreadPoolExecutor(workers, thread_name_prefix="sqlitecloud") as pool:
+            return list(pool.map(self._exec_pooled, queries))
+
+    async def gather(
+        self, queries: Iterable[SQLiteCloudQuery], concurrency: int = 4
+    ) -> List[Union[SQLiteCloudResultSet, Exception]]:
+        """Like `exec_many()`, awaiting the results without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, self.exec_many, list(queries), concurrency
+        )
+
+    def exec_hedged(self, query: SQLiteCloudQuery) -> SQLiteCloudResultSet:
+        """Executes a read, sending a copy of it when the response is late.
+
+        When the read has not been answered within the delay of the `hedging`
+        policy, eg the p95 of the latencies observed, the same read is sent
+        on another connection, to another node of the cluster when there are
+        many, and the first response wins: the other read completes
+        in the background and its connection goes back to the pool.
+        The latencies of all the reads answered are passed to the policy.
+        Statements other than a single SELECT are executed only once,
+        see `HedgingPolicy`.
+
+        The connections are taken from the ones of `exec_many()`.
+
+        Args:
+            query (SQLiteCloudQuery): The query, or a tuple of a statement
+                and its parameters as in `exec_statement()`.
+
+        Returns:
+            SqliteCloudResultSet: The result set of the first response.
+
+        Raises:
+            SQLiteCloudException: If an error occurs while executing the query.
+        """
+        policy = self.hedging
+        sql = query if isinstance(query, str) else query[0]
+
+        if not policy.should_hedge(sql):
+            result = self._exec_pooled(query)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        executor = self._get_hedging_executor()
+        attempts: Dict[Future, _HedgedRead] = {}
+
+        primary = _HedgedRead(query)
+        attempts[executor.submit(self._exec_pooled, query, primary)] = primary
+        done, pending = wait(attempts, timeout=policy.delay())
+
+        if not done:
+            # on another node of the cluster than the primary read, if any
+            copy = _HedgedRead(query, exclude=primary.node)
+            attempts[executor.submit(self._exec_pooled, query, copy)] = copy
+            pending = set(attempts)
+            policy.hedged += 1
+
+        winner = None
+        result = None
+        while winner is None:
+            for future in done:
+                result = future.result()
+                if not isinstance(result, Exception) or not pending:
+                    winner = attempts[future]
+                    break
+            else:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+        for future, attempt in attempts.items():
+            if attempt is not winner:
+                # not sent yet, otherwise its response is read in the background
+                future.cancel()
+                attempt.cancel()
+
+        if isinstance(result, Exception):
+            raise result
+
+        if winner is not primary:
+            policy.wins += 1
+
+        return result
+
+    def close(self) -> None:
+        """Close the connections kept open by `exec_many()` and `exec_hedged()`."""
+        with self._pool_lock:
+            executor, self._hedging_executor = self._hedging_executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+        with self._pool_lock:
+            connections, self._pool = self._pool, []
+
+        for connection in connections:
+            self._driver.disconnect(connection)
+
+    def _exec_pooled(
+        self, query: SQLiteCloudQuery, hedged: Optional["_HedgedRead"] = None
+    ) -> Union[SQLiteCloudResultSet, Exception]:
+        try:
+            connection = self._acquire_connection(hedged.exclude if hedged else None)
+        except Exception as e:
+            return e
+
+        reusable = True
+        try:
+            if hedged is not None:
+                hedged.start(connection)
+            if isinstance(query, str):
+                result = self.exec_query(query, connection)
+            else:
+                result = self.exec_statement(query[0], query[1], connection)
+            if hedged is not None:
+                # every read answered, also the ones completed after the other copy
+                self.hedging.observe(time.monotonic() - hedged.submitted)
+            return result
+        except SQLiteCloudException as e:
+            # network errors leave the connection unusable
+            reusable = False
+            return e
+        except Exception as e:
+            return e
+        finally:
+            self._release_connection(connection, reusable)
+
+    def _get_hedging_executor(self) -> ThreadPoolExecutor:
+        self._check_pid()
+
+        with self._pool_lock:
+            if self._hedging_executor is None:
+                self._hedging_executor = ThreadPoolExecutor(
+                    thread_name_prefix="sqlitecloud-hedging"
+                )
+            return self._hedging_executor
+
+    def _acquire_connection(self, exclude: Optional[Node] = None) -> SQLiteCloudConnect:
+        self._check_pid()
+
+        if exclude is not None and all(
+            node == exclude for node in self.config.account.nodes
+        ):
+            # a single node
+            exclude = None
+
+        with self._pool_lock:
+            for i in range(len(self._pool) - 1, -1, -1):
+                if exclude is None or self._pool[i].node != exclude:
+                    return self._pool.pop(i)
+
+        if exclude is None:
+            return self.open_connection()
+        return self._driver.connect(
+            self.config.account.hostname, self.config.account.port, self.config, exclude
+        )
+
+    def _release_connection(
+        self, connection: SQLiteCloudConnect, reusable: bool
+    ) -> None:
+        if reusable:
+            with self._pool_lock:
+                self._pool.append(connection)
+        else:
+            self._driver.disconnect(connection)
+
+    def _check_pid(self) -> None:
+        if self._pool_pid != os.getpid():
+            # inherited from the parent process, the lock may have been held
+            # by one of its threads and the threads are not running in this
+            # process; the connections reopen their sockets
+            self._pool_lock = threading.Lock()
+            self._pool_pid = os.getpid()
+            self._hedging_executor = None
+
+
+class _HedgedRead:
+    """One of the copies of a read sent by `SQLiteCloudClient.exec_hedged()`."""
+
+    def __init__(self, query: SQLiteCloudQuery, exclude: Optional[Node] = None) -> None:
+        self.query = query
+        # the node of the other copy
+        self.exclude = exclude
+        # the node the read is sent to, once started
+        self.node: Optional[Node] = None
+        self.submitted = time.monotonic()
+        self._cancelled = False
+
+    def start(self, connection: SQLiteCloudConnect) -> None:
+        if self._cancelled:
+            raise SQLiteCloudOperationalError("interrupted")
+        self.node = connection.node
+
+    def cancel(self) -> None:
+        """Do not send the read if not sent yet."""
+        self._cancelled = True
@@ -23,10 +23,19 @@ from typing import (
     overload,
 )
 
+from sqlitecloud.blob import SQLiteCloudBlob, _quote_identifier
+from sqlitecloud.cache import (
+    DiskResultCache,
+    ResultCache,
+    SQLiteCloudStatement,
+    StatementCache,
+)
 from sqlitecloud.datatypes import (
+    SQLITECLOUD_DEFAULT,
     SQLiteCloudAccount,
     SQLiteCloudConfig,
     SQLiteCloudConnect,
+    SQLiteCloudVM,
     SQLiteDataTypes,
 )
 from sqlitecloud.driver import Driver
@@ -86,8 +95,8 @@ SQLiteTypes = Union[int, float, str, bytes, None]
 # Module also supports Named style, e.g. ...WHERE name=:name
 paramstyle = "qmark"
 
-# Threads may share the module, but not connections
-threadsafety = 1
+# Threads may share the module and connections, but not cursors
+threadsafety = 2
 
 # DB API level
 apilevel = "2.0"
@@ -102,6 +111,12 @@ adapters: Dict[Type[Any], Callable[[Any], SQLiteDataTypes]] = {}
 # Converters registry to convert SQLite types to Python types
 converters: Dict[str, Callable[[bytes], Any]] = {}
 
+# The adapter resolved for each type, None when its values are used as is,
+# valid for the state of the adapters registry in `_resolved_registry`
+_resolved_adapters: Dict[Type[Any], Optional[Callable[[Any], SQLiteTypes]]] = {}
+_resolved_registry: Tuple[int, int] = (0, 0)
+_MAX_RESOLVED_ADAPTERS = 1024
+
 
 @overload
 def connect(connection_str: str) -> "Connection":
@@ -146,6 +161,7 @@ def connect(
     connection_info: Union[str, SQLiteCloudAccount],
     config: Optional[SQLiteCloudConfig] = None,
     detect_types: int = 0,
+    cached_statements: int = 128,
 ) -> "Connection":
     """
     Establishes a connection to the SQLite Cloud database.
@@ -160,6 +176,8 @@ def connect(
             registered with register_converter().
             Accepts any combination (using |, bitwise or) of PARSE_DECLTYPES and PARSE_COLNAMES.
             Column names takes precedence over declared types if both flags are set.
+        cached_statements (int): Default (128). The number of statements the connection
+            keeps already parsed and encoded. Zero disables the cache.
 
     Returns:
         Connection: A DB-API 2.0 connection object representing the connection to the database.
@@ -179,6 +197,7 @@ def connect(
     connection = Connection(
         driver.connect(config.account.hostname, config.account.port, config),
         detect_types=detect_types,
+        cached_statements=cached_statements,
     )
 
     return connection
@@ -197,6 +216,8 @@ def register_adapter(
     """
     registry = _get_adapters_registry()
     registry[pytype] = adapter_callable
+    # the types already resolved, eg to __conform__()
+    _resolved_adapters.clear()
 
 
 def register_converter(type_name: str, converter: Callable[[bytes], Any]) -> None:
@@ -220,6 +241,47 @@ def _get_converters_registry() -> dict:
     return converters
 
 
+def _get_adapter(pytype: Type) -> Optional[Callable[[Any], SQLiteTypes]]:
+    """
+    Look up how to convert the values of the given type.
+
+    The resolution is memoized per type, up to `_MAX_RESOLVED_ADAPTERS` types,
+    and discarded when an adapter is registered.
+
+    Returns:
+        Optional[Callable]: The adapter to apply or None when the value is used as is.
+    """
+    global _resolved_registry
+
+    registry = _get_adapters_registry()
+    # the registry can also be replaced or changed directly
+    state = (id(registry), len(registry))
+    if state != _resolved_registry:
+        _resolved_adapters.clear()
+        _resolved_registry = state
+
+    try:
+        return _resolved_adapters[pytype]
+    except KeyError:
+        pass
+
+    adapter = registry.get(pytype)
+    if adapter is None and hasattr(pytype, "__conform__"):
+        adapter = _conform
+
+    if len(_resolved_adapters) >= _MAX_RESOLVED_ADAPTERS:
+        # eg types created dynamically
+        _resolved_adapters.clear()
+    _resolved_adapters[pytype] = adapter
+
+    return adapter
+
+
+def _conform(value: Any) -> SQLiteTypes:
+    # we don't support sqlite3.PrepareProtocol
+    return value.__conform__(None)
+
+
 class Connection:
     """
     Represents a DB-API 2.0 connection to the SQLite Cloud database.
@@ -232,12 +294,23 @@ class Connection:
     """
 
     def __init__(
-        self, sqlitecloud_connection: SQLiteCloudConnect, detect_types: int = 0
+        self,
+        sqlitecloud_connection: SQLiteCloudConnect,
+        detect_types: int = 0,
+        cached_statements: int = 128,
     ) -> None:
         self._driver = Driver()
         self._autocommit = True
         self.sqlitecloud_connection = sqlitecloud_connection
 
+        # LRU cache of the statements executed with this connection,
+        # see `hits` and `misses` for its statistics
+        self.statement_cache = StatementCache(
+            cached_statements, self._driver.encode_query
+        )
+        # opt-in cache of the query results, see `ResultCache` and `DiskResultCache`
+        self.result_cache: Optional[Union[ResultCache, DiskResultCache]] = None
+
         self.row_factory: Optional[Callable[["Cursor", Tuple], object]] = None
         self.text_factory: Union[Type[Union[str, bytes]], Callable[[bytes], Any]] = str
 
@@ -259,6 +332,7 @@ class Connection:
         self,
         sql: str,
         parameters: Union[Tuple[any], Dict[Union[str, int], any]] = (),
+        timeout: Optional[float] = None,
     ) -> "Cursor":
         """
         Shortcut for cursor.execute().
@@ -268,13 +342,13 @@ class Connection:
             sql (str): The SQL query to execute.
             parameters (Union[Tuple[any], Dict[Union[str, int], any]]):
                 The parameters to be used in the query. It can be a tuple or a dictionary. (Default ())
-            conn (SQLiteCloudConnect): The connection object to use for executing the query.
+            timeout (Optional[float]): Seconds to wait for the result. (Default None)
 
         Returns:
             Cursor: The cursor object.
         """
         cursor = self.cursor()
-        return cursor.execute(sql, parameters)
+        return cursor.execute(sql, parameters, timeout)
 
     def executemany(
         self,
@@ -296,6 +370,92 @@ class Connection:
         cursor = self.cursor()
         return cursor.executemany(sql, seq_of_parameters)
 
+    def prepare(self, sql: str) -> "PreparedStatement":
+        """
+        Compile the SQL statement on the SQLite Cloud server.
+
+        The prepared statement can be executed many times: the server
+        does not parse and plan the query again and only the parameters
+        are sent on each execution.
+
+        Args:
+            sql (str): The SQL statement to compile.
+
+        Returns:
+            PreparedStatement: The statement ready to be executed.
+        """
+        vm = self._driver.vm_compile(self.sqlitecloud_connection, sql)
+
+        return PreparedStatement(self, sql, vm)
+
+    def blob_reader(
+        self,
+        table: str,
+        column: str,
+        rowid: int,
+        chunk_size: int = SQLITECLOUD_DEFAULT.BLOB_CHUNK_SIZE.value,
+        name: str = "main",
+    ) -> SQLiteCloudBlob:
+        """
+        Open the BLOB in the cell identified by table, column and rowid to read it
+        incrementally, like `sqlite3.Connection.blobopen()`.
+
+        Args:
+            table (str): The name of the table.
+            column (str): The name of the column.
+            rowid (int): The rowid of the row.
+            chunk_size (int): The max number of bytes read with a single statement.
+            name (str): The name of the database, default "main".
+
+        Returns:
+            SQLiteCloudBlob: The file-like object to read the BLOB.
+        """
+        return SQLiteCloudBlob(
+            self, table, column, rowid, readonly=True, chunk_size=chunk_size, name=name
+        )
+
+    def blob_writer(
+        self,
+        table: str,
+        column: str,
+        rowid: int,
+        size: Optional[int] = None,
+        chunk_size: int = SQLITECLOUD_DEFAULT.BLOB_CHUNK_SIZE.value,
+        name: str = "main",
+    ) -> SQLiteCloudBlob:
+        """
+        Open the BLOB in the cell identified by table, column and rowid to read
+        and write it incrementally, like `sqlite3.Connection.blobopen()`.
+
+        Args:
+            table (str): The name of the table.
+            column (str): The name of the column.
+            rowid (int): The rowid of the row.
+            size (Optional[int]): When set, the cell is first replaced by a
+                zero-filled BLOB of this size.
+            chunk_size (int): The max number of bytes written with a single statement.
+            name (str): The name of the database, default "main".
+
+        Returns:
+            SQLiteCloudBlob: The file-like object to write the BLOB.
+        """
+        if size is not None:
+            self.execute(
+                f"UPDATE {_quote_identifier(name)}.{_quote_identifier(table)} "
+                f"SET {_quote_identifier(column)} = zeroblob(?) WHERE rowid = ?",
+                (size, rowid),
+            )
+
+        return SQLiteCloudBlob(
+            self,
+            table,
+            column,
+            rowid,
+            readonly=False,
+            chunk_size=chunk_size,
+            name=name,
+        )
+
     def executescript(self, sql_script: str):
         raise SQLiteCloudNotSupportedError("executescript() is not supported.")
 
@@ -308,14 +468,34 @@ class Connection:
     def create_collation(self, name, func):
         raise SQLiteCloudNotSupportedError("create_collation() is not supported.")
 
-    def interrupt(self):
-        raise SQLiteCloudNotSupportedError("interrupt() is not supported.")
+    def interrupt(self) -> None:
+        """
+        Abort the query running on the connection, from any thread.
+        The query raises an OperationalError and the connection is reopened
+        for the next one. The server rolls back the open transaction, reported
+        by an OperationalError of the next query, and releases the prepared
+        statements, which cannot be executed anymore.
+        """
+        self._driver.interrupt(self.sqlitecloud_connection)
 
     def set_authorizer(self, authorizer):
         raise SQLiteCloudNotSupportedError("set_authorizer() is not supported.")
 
-    def set_progress_handler(self, handler, n):
-        raise SQLiteCloudNotSupportedError("set_progress_handler() is not supported.")
+    def set_progress_handler(
+        self, handler: Optional[Callable[[], Any]], n: int
+    ) -> None:
+        """
+        Call `handler` every `n` blocks of data received from the server,
+        eg to report the progress of large results. The query is aborted
+        with an OperationalError when the handler returns a true value.
+        Pass None as the handler to remove it.
+
+        Unlike in SQLite, the handler runs on the client: it counts
+        the blocks of the response, not the instructions of the server.
+        """
+        connection = self.sqlitecloud_connection
+        connection.progress_n = n
+        connection.progress_handler = handler
 
     def set_trace_callback(self, trace_callback):
         raise SQLiteCloudNotSupportedError("set_trace_callback() is not supported.")
@@ -406,14 +586,11 @@ class Connection:
         Returns:
             SQLiteTypes: The SQLite supported type or the given value when no adapter is found.
         """
-        if type(value) in adapters:
-            return adapters[type(value)](value)
-
-        if hasattr(value, "__conform__"):
-            # we don't support sqlite3.PrepareProtocol
-            return value.__conform__(None)
+        adapter = _get_adapter(type(value))
+        if adapter is None:
+            return value
 
-        return value
+        return adapter(value)
 
     def __enter__(self):
         """
@@ -549,6 +726,7 @@ class Cursor(Iterator[Any]):
         self,
         sql: str,
         parameters: Union[Tuple[Any], Dict[Union[str, int], Any]] = (),
+        timeout: Optional[float] = None,
     ) -> "Cursor":
         """
         Prepare and execute a SQL statement (either a query or command) to the SQLite Cloud database.
@@ -568,29 +746,43 @@ class Cursor(Iterator[Any]):
             sql (str): The SQL query to execute.
             parameters (Union[Tuple[any], Dict[Union[str, int], any]]):
                 The parameters to be used in the query. It can be a tuple or a dictionary. (Default ())
-            conn (SQLiteCloudConnect): The connection object to use for executing the query.
+            timeout (Optional[float]): Seconds to wait for the result, then
+                an OperationalError is raised and the connection is reopened
+                for the next query. (Default None)
 
         Returns:
             Cursor: The cursor object.
         """
         self._ensure_connection()
 
+        statement = self._connection.statement_cache.get(sql)
+
         parameters = self._adapt_parameters(parameters)
 
         if isinstance(parameters, dict):
-            parameters = self._named_to_question_mark_parameters(sql, parameters)
-
-        result = self._driver.execute_statement(
-            sql, parameters, self.connection.sqlitecloud_connection
-        )
+            parameters = self._named_to_question_mark_parameters(statement, parameters)
+
+        def run(
+            frames: Optional[List[bytes]] = None,
+        ) -> Union[SQLiteCloudResult, SQLiteCloudOperationResult]:
+            return self._driver.execute_statement(
+                sql,
+                parameters,
+                self.connection.sqlitecloud_connection,
+                encoded_query=statement.encoded_sql,
+                frames=frames,
+                timeout=timeout,
+            )
 
-        self._reset()
+        result_cache = self._connection.result_cache
+        if result_cache is not None:
+            result = result_cache.execute(
+                sql, parameters, run, self.connection.sqlitecloud_connection
+            )
+        else:
+            result = run()
 
-        if isinstance(result, SQLiteCloudResult):
-            self._resultset = result
-        if isinstance(result, SQLiteCloudOperationResult):
-            self._result_operation = result
-            self._connection.total_changes = result.total_changes
+        self._set_result(result)
 
         return self
 
@@ -616,9 +808,12 @@ class Cursor(Iterator[Any]):
 
         commands = ""
         params = []
+        statement = self._connection.statement_cache.get(sql)
         for parameters in seq_of_parameters:
             if isinstance(parameters, dict):
-                parameters = self._named_to_question_mark_parameters(sql, parameters)
+                parameters = self._named_to_question_mark_parameters(
+                    statement, parameters
+                )
 
             params += list(parameters)
 
@@ -730,13 +925,12 @@ class Cursor(Iterator[Any]):
             raise SQLiteCloudProgrammingError("The cursor is closed.", code=1)
 
     def _adapt_parameters(self, parameters: Union[Dict, Tuple]) -> Union[Dict, Tuple]:
+        apply_adapter = self._connection._apply_adapter
+
         if isinstance(parameters, dict):
-            params = {}
-            for i in parameters.keys():
-                params[i] = self._connection._apply_adapter(parameters[i])
-            return params
+            return {key: apply_adapter(value) for key, value in parameters.items()}
 
-        return tuple(self._connection._apply_adapter(p) for p in parameters)
+        return tuple(apply_adapter(p) for p in parameters)
 
     def _convert_value(
         self, value: Any, colname: Optional[str], decltype: Optional[str]
@@ -803,9 +997,10 @@ class Cursor(Iterator[Any]):
         registry = _get_converters_registry()
         if decltype in registry:
             # sqlite3 always passes value as bytes
-            value = (
-                str(value).encode("utf-8") if not isinstance(value, bytes) else value
-            )
+            if isinstance(value, memoryview):
+                value = value.tobytes()
+            elif not isinstance(value, bytes):
+                value = str(value).encode("utf-8")
             return registry[decltype](value)
 
         raise MissingDecltypeException(f"No decltype registered for: {decltype}")
@@ -824,7 +1019,7 @@ class Cursor(Iterator[Any]):
         return value
 
     def _named_to_question_mark_parameters(
-        self, sql: str, params: Dict[str, Any]
+        self, statement: SQLiteCloudStatement, params: Dict[str, Any]
     ) -> Tuple[Any]:
         """
         Convert named placeholders parameters from a dictionary to a list of
@@ -832,18 +1027,9 @@ class Cursor(Iterator[Any]):
 
         SCSP protocol does not support named placeholders yet.
         """
-        # Python variable names: start with letter or underscore, followed by letters, digits, or underscores
-        pattern = r":([a-zA-Z_][a-zA-Z0-9_]*)"
-        matches = re.findall(pattern, sql)
-        # filter out duplicates
-        matches = list(dict.fromkeys(matches))
-
-        params_list = ()
-        for match in matches:
-            if match in params:
-                params_list += (params[match],)
-
-        return params_list
+        return tuple(
+            params[name] for name in statement.named_parameters if name in params
+        )
 
     def _get_value(self, row: int, col: int) -> Optional[Any]:
         if not self._is_result_rowset():
@@ -855,6 +1041,17 @@ class Cursor(Iterator[Any]):
 
         return self._convert_value(value, colname, decltype)
 
+    def _set_result(
+        self, result: Union[SQLiteCloudResult, SQLiteCloudOperationResult]
+    ) -> None:
+        self._reset()
+
+        if isinstance(result, SQLiteCloudResult):
+            self._resultset = result
+        if isinstance(result, SQLiteCloudOperationResult):
+            self._result_operation = result
+            self._connection.total_changes = result.total_changes
+
     def _reset(self) -> None:
         self._resultset = None
         self._result_operation = None
@@ -882,6 +1079,147 @@ class Cursor(Iterator[Any]):
         raise StopIteration
 
 
+class PreparedStatement(Iterator[Any]):
+    """
+    A statement compiled on the SQLite Cloud server, created with `Connection.prepare()`.
+
+    Each call to `execute()` sends the parameters and steps to the first row
+    in a single round trip. Rows are then fetched one step at a time.
+
+    Eg:
+        statement = conn.prepare("SELECT * FROM albums WHERE AlbumId = ?")
+        for album_id in (1, 2, 3):
+            print(statement.execute((album_id,)).fetchone())
+        statement.close()
+    """
+
+    def __init__(self, connection: Connection, sql: str, vm: SQLiteCloudVM) -> None:
+        self._driver = connection._driver
+        self._connection = connection
+        self._statement = connection.statement_cache.get(sql)
+        self._vm = vm
+
+        # cursor of the current step, used to convert the values of the rows
+        self._cursor = connection.cursor()
+        self._description = None
+        self._done = True
+
+    @property
+    def sql(self) -> str:
+        return self._statement.sql
+
+    @property
+    def readonly(self) -> bool:
+        return self._vm.readonly
+
+    @property
+    def description(self):
+        """See `Cursor.description`. Available once a row has been stepped."""
+        return self._description
+
+    @property
+    def rowcount(self) -> int:
+        """The number of rows affected by DML statements, -1 otherwise."""
+        if self._cursor._is_result_operation():
+            return self._cursor.rowcount
+        return -1
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        return self._cursor.lastrowid
+
+    def execute(
+        self, parameters: Union[Tuple[Any], Dict[Union[str, int], Any]] = ()
+    ) -> "PreparedStatement":
+        """
+        Bind the parameters and step the statement to its first row.
+        See the docstring of Cursor.execute() for the supported parameters styles.
+
+        Returns:
+            PreparedStatement: The statement itself, to fetch the rows.
+        """
+        self._ensure_open()
+        self._cursor.row_factory = self._connection.row_factory
+
+        parameters = self._cursor._adapt_parameters(parameters)
+
+        if isinstance(parameters, dict):
+            parameters = self._cursor._named_to_question_mark_parameters(
+                self._statement, parameters
+            )
+
+        result = self._driver.vm_step(
+            self._connection.sqlitecloud_connection, self._vm, tuple(parameters)
+        )
+        self._load_step(result)
+
+        return self
+
+    def fetchone(self) -> Optional[Any]:
+        """Fetch the next row, stepping the statement when needed."""
+        return next(self, None)
+
+    def fetchall(self) -> List[Any]:
+        """Step the statement until the last row."""
+        return list(self)
+
+    def reset(self) -> None:
+        """Reset the statement, discarding the rows not yet fetched."""
+        self._ensure_open()
+
+        self._driver.vm_reset(self._connection.sqlitecloud_connection, self._vm)
+        self._cursor._reset()
+        self._done = True
+
+    def close(self) -> None:
+        """Release the statement on the server."""
+        if self._vm.finalized:
+            return
+
+        self._done = True
+        if self._connection.is_connected():
+            self._driver.vm_finalize(self._connection.sqlitecloud_connection, self._vm)
+        else:
+            self._vm.finalized = True
+
+    def _load_step(
+        self, result: Union[SQLiteCloudResult, SQLiteCloudOperationResult]
+    ) -> None:
+        self._cursor._set_result(result)
+        self._done = not self._cursor._is_result_rowset()
+        if not self._done:
+            self._description = self._cursor.description
+
+    def _ensure_open(self) -> None:
+        if self._vm.finalized:
+            raise SQLiteCloudProgrammingError(
+                "Cannot operate on a closed statement.", code=1
+            )
+
+    def __iter__(self) -> "PreparedStatement":
+        return self
+
+    def __next__(self) -> Any:
+        while not self._done:
+            row = self._cursor.fetchone()
+            if row is not None:
+                return row
+
+            # rows of the current step are over
+            result = self._driver.vm_step(
+                self._connection.sqlitecloud_connection, self._vm
+            )
+            self._load_step(result)
+
+        raise StopIteration
+
+    def __enter__(self) -> "PreparedStatement":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
 class Row:
     def __init__(self, data: Tuple[Any], column_names: List[str]):
         """
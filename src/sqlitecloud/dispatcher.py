@@ -0,0 +1,370 @@
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Set, Tuple
+
+from sqlitecloud.datatypes import SQLITECLOUD_PUBSUB_OVERFLOW, SQLiteCloudConnect
+from sqlitecloud.resultset import (
+    SQLITECLOUD_RESULT_TYPE,
+    SQLiteCloudResult,
+    SQLiteCloudResultSet,
+)
+
+# receives a batch of notifications of a channel, in order
+BatchCallback = Callable[[List[SQLiteCloudResultSet]], None]
+
+
+class _Event:
+    __slots__ = ("seq", "enqueued_at", "result", "merged", "call")
+
+    def __init__(
+        self,
+        seq: int,
+        result: Optional[SQLiteCloudResultSet],
+        call: Optional[Tuple[Callable[..., Any], Tuple[Any, ...]]] = None,
+    ) -> None:
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.result = result
+        # number of notifications merged into the result
+        self.merged = 1
+        # function and arguments queued with `submit()` in place of a result
+        self.call = call
+
+    def merge(self, result: SQLiteCloudResultSet) -> None:
+        """
+        Merge a later notification of the channel: the rows changed in a table
+        are appended to the `payload`, the payloads of other messages are
+        collected into a list.
+        """
+        previous, content = self.result.get_result(), result.get_result()
+        old, new = _payload(previous), _payload(content)
+
+        merged = dict(content) if isinstance(content, dict) else {}
+        if _is_table_change(previous) and _is_table_change(content):
+            merged["payload"] = old + new
+        else:
+            merged["payload"] = (old if self.merged > 1 else [old]) + [new]
+        merged.setdefault("channel", _channel(self.result))
+
+        self.result = SQLiteCloudResultSet(
+            SQLiteCloudResult(SQLITECLOUD_RESULT_TYPE.RESULT_JSON, merged)
+        )
+        self.merged += 1
+
+
+class PubSubDispatcher:
+    """
+    Deliver the PubSub notifications to callbacks running in a pool of threads,
+    so that a slow callback does not stop the reading of the socket.
+
+    Pass the dispatcher as the callback of `SQLiteCloudPubSub.listen()`, and
+    register any number of callbacks for each channel with `add_callback()`.
+    The notifications of a channel are delivered in order, in batches of up to
+    `batch_size`, by one worker at a time. Different channels are delivered
+    in parallel. The workers are started when needed, up to `workers`.
+
+    Other functions can be queued with `submit()`, eg by the PubSub reactor
+    to run the callbacks of the connections.
+
+    At most `maxsize` notifications wait to be delivered. When the queue is full,
+    `overflow` decides what happens to a new notification:
+    - DROP_OLDEST: discard the notification waiting the longest (the default).
+    - COALESCE: merge it into the last notification waiting in the same channel,
+      or discard the oldest one when there is none. The rows changed in a table
+      are appended to the `payload`, the payloads of other messages are
+      collected into a list.
+    - BLOCK: wait for room, slowing down the reading of the socket. Only the
+      connection is blocked, but with the event loop of `subscribe()`
+      the whole loop waits.
+
+    Args:
+        workers (int): The number of threads running the callbacks.
+        maxsize (int): The maximum number of notifications waiting.
+        overflow (SQLITECLOUD_PUBSUB_OVERFLOW): The policy when the queue is full.
+        batch_size (int): The maximum number of notifications per callback call.
+        on_closed (Optional[Callable[[SQLiteCloudConnect], None]]): Called when
+            the PubSub connection is closed.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        maxsize: int = 1024,
+        overflow: SQLITECLOUD_PUBSUB_OVERFLOW = SQLITECLOUD_PUBSUB_OVERFLOW.DROP_OLDEST,
+        batch_size: int = 1,
+        on_closed: Optional[Callable[[SQLiteCloudConnect], None]] = None,
+    ) -> None:
+        self.workers = max(workers, 1)
+        self.maxsize = max(maxsize, 1)
+        self.overflow = overflow
+        self.batch_size = max(batch_size, 1)
+        self.on_closed = on_closed
+
+        # metrics
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        # seconds waited by the last notification delivered
+        self.last_lag = 0.0
+
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._not_empty = threading.Condition(self._lock)
+        self._callbacks: Dict[Optional[str], List[BatchCallback]] = {}
+        self._pending: Dict[str, Deque[_Event]] = {}
+        # channels with notifications waiting and no worker delivering them
+        self._ready: Deque[str] = deque()
+        self._busy: Set[str] = set()
+        self._depth = 0
+        # functions queued with `submit()`
+        self._calls = 0
+        self._seq = itertools.count()
+        self._threads: List[threading.Thread] = []
+        self._idle = 0
+        self._closed = False
+
+    @property
+    def depth(self) -> int:
+        """The number of notifications waiting to be delivered."""
+        return self._depth
+
+    @property
+    def threads(self) -> int:
+        """The number of running workers."""
+        return sum(thread.is_alive() for thread in self._threads)
+
+    @property
+    def lag(self) -> float:
+        """Seconds waited by the oldest notification not delivered yet."""
+        with self._lock:
+            oldest = self._oldest_channel()
+            if oldest is None:
+                return 0.0
+            return time.monotonic() - self._pending[oldest][0].enqueued_at
+
+    def add_callback(
+        self, callback: BatchCallback, channel: Optional[str] = None
+    ) -> None:
+        """
+        Call `callback` with the notifications of `channel`,
+        or of every channel when it is None.
+        """
+        with self._lock:
+            self._callbacks.setdefault(channel, []).append(callback)
+
+    def remove_callback(
+        self, callback: BatchCallback, channel: Optional[str] = None
+    ) -> None:
+        with self._lock:
+            callbacks = self._callbacks.get(channel, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def __call__(
+        self,
+        connection: SQLiteCloudConnect,
+        result: Optional[SQLiteCloudResultSet],
+        data: Optional[Any],
+    ) -> None:
+        """Queue a notification, called by the PubSub reader."""
+        if result is None:
+            if self.on_closed:
+                self.on_closed(connection)
+            return
+
+        self.put(result)
+
+    def put(self, result: SQLiteCloudResultSet) -> bool:
+        """
+        Queue a notification, applying the overflow policy when the queue is full.
+
+        Returns:
+            bool: False if the dispatcher is closed.
+        """
+        channel = _channel(result)
+
+        with self._lock:
+            if self._closed:
+                return False
+
+            while self._depth >= self.maxsize and not self._closed:
+                if self.overflow == SQLITECLOUD_PUBSUB_OVERFLOW.COALESCE:
+                    events = self._pending.get(channel)
+                    if events:
+                        events[-1].merge(result)
+                        self.coalesced += 1
+                        return True
+
+                if self.overflow != SQLITECLOUD_PUBSUB_OVERFLOW.BLOCK:
+                    oldest = self._oldest_channel()
+                    if oldest is not None:
+                        self._pop(oldest)
+                        self.dropped += 1
+                        continue
+
+                self._not_full.wait()
+
+            if self._closed:
+                return False
+
+            events = self._pending.setdefault(channel, deque())
+            events.append(_Event(next(self._seq), result))
+            self._depth += 1
+            self.max_depth = max(self.max_depth, self._depth)
+
+            self._schedule(channel)
+
+        return True
+
+    def submit(self, key: Hashable, callback: Callable[..., Any], *args: Any) -> bool:
+        """
+        Run `callback(*args)` in a worker, after the functions submitted with
+        the same key. The functions are not counted in `maxsize` and never dropped.
+
+        Returns:
+            bool: False if the dispatcher is closed.
+        """
+        with self._lock:
+            if self._closed:
+                return False
+
+            events = self._pending.setdefault(key, deque())
+            events.append(_Event(next(self._seq), None, (callback, args)))
+            self._calls += 1
+
+            self._schedule(key)
+
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Deliver the notifications waiting and stop the workers."""
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+            threads, self._threads = self._threads, []
+
+        for thread in threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+
+    def __enter__(self) -> "PubSubDispatcher":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _schedule(self, channel: Hashable) -> None:
+        if len(self._pending[channel]) == 1 and channel not in self._busy:
+            self._ready.append(channel)
+            self._not_empty.notify()
+
+        # a worker for each channel ready, up to `workers`
+        if len(self._ready) > self._idle and len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._work,
+                name=f"sqlitecloud-dispatch-{len(self._threads)}",
+                daemon=True,
+            )
+            self._threads.append(thread)
+            self._idle += 1
+            thread.start()
+
+    def _drained(self) -> bool:
+        return self._closed and self._depth == 0 and self._calls == 0
+
+    def _work(self) -> None:
+        while True:
+            with self._lock:
+                while not self._ready and not self._drained():
+                    self._not_empty.wait()
+                self._idle -= 1
+                if not self._ready:
+                    return
+
+                channel = self._ready.popleft()
+                self._busy.add(channel)
+                batch = [self._pop(channel) for _ in range(self._batch_length(channel))]
+                callbacks = self._callbacks.get(channel, []) + self._callbacks.get(
+                    None, []
+                )
+
+            if batch[0].call is not None:
+                for event in batch:
+                    function, args = event.call
+                    try:
+                        function(*args)
+                    except Exception as e:
+                        logging.error(f"An error occurred in the PubSub callback: {e}.")
+            else:
+                self.last_lag = time.monotonic() - batch[0].enqueued_at
+                results = [event.result for event in batch]
+                for callback in callbacks:
+                    try:
+                        callback(results)
+                    except Exception as e:
+                        logging.error(
+                            f"An error occurred in the PubSub callback of {channel}: {e}."
+                        )
+
+            with self._lock:
+                self._idle += 1
+                if batch[0].call is None:
+                    self.delivered += len(batch)
+                self._busy.discard(channel)
+                if self._pending.get(channel):
+                    # the next batch of the channel, after the other channels
+                    self._ready.append(channel)
+                    self._not_empty.notify()
+                elif self._drained():
+                    self._not_empty.notify_all()
+
+    def _batch_length(self, channel: str) -> int:
+        return min(len(self._pending[channel]), self.batch_size)
+
+    def _pop(self, channel: Hashable) -> _Event:
+        events = self._pending[channel]
+        event = events.popleft()
+        if not events:
+            del self._pending[channel]
+            if channel in self._ready:
+                self._ready.remove(channel)
+        if event.call is not None:
+            self._calls -= 1
+        else:
+            self._depth -= 1
+            self._not_full.notify()
+        return event
+
+    def _oldest_channel(self) -> Optional[str]:
+        oldest: Optional[Tuple[int, str]] = None
+        for channel, events in self._pending.items():
+            if events[0].call is not None:
+                continue
+            if oldest is None or events[0].seq < oldest[0]:
+                oldest = (events[0].seq, channel)
+        return oldest[1] if oldest else None
+
+
+def _payload(content: Any) -> Any:
+    return content.get("payload") if isinstance(content, dict) else content
+
+
+def _is_table_change(content: Any) -> bool:
+    """A notification of the rows changed in a table, listened with `listen_table()`."""
+    return (
+        isinstance(content, dict)
+        and isinstance(content.get("channel"), str)
+        and isinstance(content.get("payload"), list)
+        and "pk" in content
+    )
+
+
+def _channel(result: SQLiteCloudResultSet) -> str:
+    content = result.get_result()
+    channel = content.get("channel") if isinstance(content, dict) else None
+    return channel if isinstance(channel, str) else ""
@@ -1,9 +1,20 @@
+import json
 import logging
+import os
+import sqlite3
+import tempfile
 from io import BufferedWriter
+from typing import Any
 
 from sqlitecloud.datatypes import SQLiteCloudConnect
 from sqlitecloud.driver import Driver
 
+# bytes downloaded between two saves of the progress
+DOWNLOAD_CHECKPOINT_SIZE = 64 * 1024 * 1024
+
+# `sqlite3.Connection.deserialize()`, from Python 3.11
+_HAS_DESERIALIZE = hasattr(sqlite3.Connection, "deserialize")
+
 
 def xCallback(
     fd: BufferedWriter, data: bytes, blen: int, ntot: int, nprogress: int
@@ -28,14 +39,210 @@ def xCallback(
         logging.log(logging.DEBUG, f"{(nprogress + blen) / ntot * 100:.2f}%")
 
 
-def download_db(connection: SQLiteCloudConnect, dbname: str, filename: str) -> None:
+def download_db(
+    connection: SQLiteCloudConnect,
+    dbname: str,
+    filename: str,
+    reuse_partial: bool = False,
+) -> None:
     """
     Download a database from the server.
 
+    The file is allocated with the size of the database. With `reuse_partial`,
+    the bytes written are recorded in `<filename>.progress` until the download
+    completes, and the next call after a failure compares the chunks received
+    with the ones already in the file, writing only the ones that changed.
+    The download is not resumed: the server always sends the whole database.
+
+    Args:
+        connection (SQLiteCloudConnect): The connection to the node.
+        dbname (str): The name of the database to download.
+        filename (str): The path of the local file.
+        reuse_partial (bool): Keep the chunks saved by a failed download
+            of the same database into the file.
+
     Raises:
         SQLiteCloudException: If an error occurs while downloading the database.
     """
     driver = Driver()
 
-    with open(filename, "wb") as fd:
-        driver.download_database(connection, dbname, fd, xCallback, False)
+    with _DownloadFile(filename, dbname, reuse_partial) as download:
+        driver.download_database(connection, dbname, download, download.write, False)
+
+
+def download_db_to_sqlite3(
+    connection: SQLiteCloudConnect, dbname: str, **kwargs: Any
+) -> sqlite3.Connection:
+    """
+    Download a database into an in-memory SQLite database.
+
+    The chunks are written into a buffer allocated with the size of the database,
+    which is then loaded with `sqlite3.Connection.deserialize()`.
+
+    Note:
+        `deserialize()` is available from Python 3.11. On older versions the
+        buffer is written to a file in the temporary directory (see
+        `tempfile.gettempdir()`) and copied with the backup API, then removed:
+        it needs free disk space for the whole database, and its content
+        is written to the disk unencrypted.
+
+    Args:
+        connection (SQLiteCloudConnect): The connection to the node.
+        dbname (str): The name of the database to download.
+        kwargs: Arguments passed to `sqlite3.connect()`.
+
+    Returns:
+        sqlite3.Connection: The connection to the in-memory database.
+
+    Raises:
+        SQLiteCloudException: If an error occurs while downloading the database.
+    """
+    driver = Driver()
+
+    download = _DownloadBuffer()
+    driver.download_database(connection, dbname, download, download.write, False)
+
+    db = sqlite3.connect(":memory:", **kwargs)
+    if _HAS_DESERIALIZE:
+        db.deserialize(download.buffer)
+        return db
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "download.db")
+        with open(filename, "wb") as file:
+            file.write(download.buffer)
+
+        source = sqlite3.connect(filename)
+        try:
+            source.backup(db)
+        finally:
+            source.close()
+
+    return db
+
+
+class _DownloadBuffer:
+    """
+    Destination buffer of a download, allocated once with the size of the database.
+    """
+
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+
+    def write(
+        self, fd: "_DownloadBuffer", data: bytes, blen: int, ntot: int, nprogress: int
+    ) -> None:
+        """Callback of `Driver.download_database()`."""
+        if len(self.buffer) != ntot:
+            self.buffer = bytearray(ntot)
+
+        self.buffer[nprogress - blen : nprogress] = data
+
+
+class _DownloadFile:
+    """
+    Destination file of a download, written at the offsets of the chunks.
+    """
+
+    def __init__(self, filename: str, dbname: str, reuse_partial: bool) -> None:
+        self.filename = filename
+        self.dbname = dbname
+        self.progress_filename = filename + ".progress"
+        self.reuse_partial = reuse_partial
+
+        # bytes saved by the previous download, compared with the chunks received
+        self._saved = 0
+        if reuse_partial:
+            self._saved = self._load_progress()
+        if self._saved == 0 or not os.path.exists(filename):
+            self._saved = 0
+            open(filename, "wb").close()
+
+        self._fd = open(filename, "r+b")
+        self._checkpoint = 0
+        self._size = -1
+
+    def write(
+        self, fd: "_DownloadFile", data: bytes, blen: int, ntot: int, nprogress: int
+    ) -> None:
+        """Callback of `Driver.download_database()`."""
+        if self._size != ntot:
+            self._allocate(ntot)
+
+        offset = nprogress - blen
+        if blen > 0 and not self._verify(offset, data):
+            self._fd.seek(offset)
+            self._fd.write(data)
+
+        if (
+            self.reuse_partial
+            and nprogress - self._checkpoint >= DOWNLOAD_CHECKPOINT_SIZE
+        ):
+            self._save_progress(nprogress)
+
+        if blen == 0 or nprogress >= ntot:
+            logging.log(logging.DEBUG, "DOWNLOAD COMPLETE")
+        else:
+            logging.log(logging.DEBUG, f"{nprogress / ntot * 100:.2f}%")
+
+    def __enter__(self) -> "_DownloadFile":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._fd.close()
+
+        if exc_type is None:
+            if os.path.exists(self.progress_filename):
+                os.unlink(self.progress_filename)
+
+    def _allocate(self, size: int) -> None:
+        if self._saved > size:
+            # the database changed since the previous download
+            self._saved = 0
+
+        self._size = size
+        self._fd.truncate(size)
+        if hasattr(os, "posix_fallocate") and size > 0:
+            try:
+                os.posix_fallocate(self._fd.fileno(), 0, size)
+            except OSError:
+                # not supported by the filesystem, the file is sparse
+                pass
+
+        if self.reuse_partial:
+            self._save_progress(0)
+
+    def _verify(self, offset: int, data: bytes) -> bool:
+        """Check whether the chunk has been already saved by the previous download."""
+        if offset + len(data) > self._saved:
+            return False
+
+        self._fd.seek(offset)
+        return self._fd.read(len(data)) == data
+
+    def _load_progress(self) -> int:
+        try:
+            with open(self.progress_filename, "r") as file:
+                progress = json.load(file)
+        except (OSError, ValueError):
+            return 0
+
+        if progress.get("dbname") != self.dbname:
+            return 0
+
+        return int(progress.get("offset", 0))
+
+    def _save_progress(self, offset: int) -> None:
+        # chunks are on disk before the progress
+        self._fd.flush()
+        os.fsync(self._fd.fileno())
+
+        # keep the progress of the previous download until it is passed
+        progress = {"dbname": self.dbname, "offset": max(offset, self._saved)}
+
+        tmpname = self.progress_filename + ".tmp"
+        with open(tmpname, "w") as file:
+            json.dump(progress, file)
+        os.replace(tmpname, self.progress_filename)
+
+        self._checkpoint = offset
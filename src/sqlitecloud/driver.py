@@ -1,30 +1,46 @@
+import errno
+import functools
 import json
 import logging
-import select
+import os
+import re
+import selectors
 import socket
 import ssl
 import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from io import BufferedReader, BufferedWriter
-from typing import Any, Callable, List, Optional, Tuple, Union
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple, Union
 
 import lz4.block
 
 from sqlitecloud.datatypes import (
+    SQLITECLOUD_ARRAY_TYPE,
     SQLITECLOUD_CMD,
     SQLITECLOUD_DEFAULT,
     SQLITECLOUD_INTERNAL_ERRCODE,
     SQLITECLOUD_ROWSET,
+    BytesLike,
     SQLiteCloudConfig,
     SQLiteCloudConnect,
     SQLiteCloudNumber,
     SQLiteCloudRowsetSignature,
     SQLiteCloudValue,
+    SQLiteCloudVM,
     SQLiteDataTypes,
 )
 from sqlitecloud.exceptions import (
+    SQLiteCloudError,
     SQLiteCloudException,
+    SQLiteCloudOperationalError,
+    SQLiteCloudWarning,
     get_sqlitecloud_error_with_extended_code,
 )
+from sqlitecloud.nodes import Node, get_node_selector
+from sqlitecloud.reactor import get_pubsub_reactor
 from sqlitecloud.resultset import (
     SQLITECLOUD_RESULT_TYPE,
     SQLiteCloudOperationResult,
@@ -32,14 +48,79 @@ from sqlitecloud.resultset import (
     SQLiteCloudResultSet,
 )
 
+# max number of buffers for a single scatter-gather write
+try:
+    SOCKET_IOV_MAX = max(os.sysconf("SC_IOV_MAX"), 16)
+except (AttributeError, ValueError, OSError):
+    SOCKET_IOV_MAX = 1024
+
+# seconds to wait for a connection attempt before starting the next one,
+# the "Connection Attempt Delay" of Happy Eyeballs (RFC 8305)
+HAPPY_EYEBALLS_DELAY = 0.25
+
+# non blocking connect in progress
+_CONNECT_IN_PROGRESS = {
+    0,
+    errno.EINPROGRESS,
+    errno.EWOULDBLOCK,
+    getattr(errno, "WSAEWOULDBLOCK", errno.EWOULDBLOCK),
+}
+
+# error code of SQLite for the interrupted operations
+SQLITE_INTERRUPT = 9
+
+# statements beginning and ending a transaction, ROLLBACK TO keeps it open
+_BEGIN_PATTERN = re.compile(r"\s*(BEGIN|SAVEPOINT)\b", re.IGNORECASE)
+_END_PATTERN = re.compile(
+    r"\s*(COMMIT|END|ROLLBACK(?!\s+(TRANSACTION\s+)?TO\b))\b", re.IGNORECASE
+)
+
+
+def _exclusive(method: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Hold the lock of the connection, the first argument of the method,
+    while the requests are sent and their responses read.
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, connection: SQLiteCloudConnect, *args, **kwargs) -> Any:
+        if connection.pid != os.getpid():
+            self._internal_reconnect_after_fork(connection)
+
+        with connection.lock:
+            if connection.reopen:
+                self._internal_reopen(connection)
+            if connection.transaction_lost:
+                connection.transaction_lost = False
+                raise SQLiteCloudOperationalError(
+                    "The transaction has been rolled back: the connection was reopened."
+                )
+            return method(self, connection, *args, **kwargs)
+
+    return wrapper
+
+
+# serializes the reconnections of the connections inherited from the parent process
+_fork_lock = threading.Lock()
+
+
+def _reinit_after_fork() -> None:
+    global _fork_lock
+    # the lock may have been held by a thread of the parent process
+    _fork_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reinit_after_fork)
 
-class Driver:
-    def __init__(self) -> None:
-        # Used while parsing chunked rowset
-        self._rowset: SQLiteCloudResult = None
 
+class Driver:
     def connect(
-        self, hostname: str, port: int, config: SQLiteCloudConfig
+        self,
+        hostname: str,
+        port: int,
+        config: SQLiteCloudConfig,
+        exclude: Optional[Node] = None,
     ) -> SQLiteCloudConnect:
         """
         Connect to the SQLite Cloud server.
@@ -48,6 +129,8 @@ class Driver:
             hostname (str): The hostname of the server.
             port (int): The port number of the server.
             config (SQLiteCloudConfig): The configuration for the connection.
+            exclude (Optional[Node]): A node of the cluster not to connect to,
+                unless it is the only one.
 
         Returns:
             SQLiteCloudConnect: The connection object.
@@ -55,11 +138,9 @@ class Driver:
         Raises:
             SQLiteCloudException: If an error occurs while connecting the socket.
         """
-        sock = self._internal_connect(hostname, port, config)
-
         connection = SQLiteCloudConnect()
         connection.config = config
-        connection.socket = sock
+        self._internal_open(connection, hostname, port, config, exclude)
 
         self._internal_config_apply(connection, config)
 
@@ -75,21 +156,43 @@ class Driver:
             if conn.socket:
                 conn.socket.close()
             if not only_main_socket and conn.pubsub_socket:
+                # the reactor of the parent process is not running in a child
+                reactor = (
+                    conn.pubsub_reactor or get_pubsub_reactor(create=False)
+                    if conn.pid == os.getpid()
+                    else None
+                )
+                if reactor:
+                    reactor.unregister(conn)
                 conn.pubsub_socket.close()
         finally:
             conn.socket = None
+            conn.reopen = False
             if not only_main_socket:
                 conn.pubsub_socket = None
 
     def execute(
-        self, command: str, connection: SQLiteCloudConnect
+        self,
+        command: str,
+        connection: SQLiteCloudConnect,
+        frames: Optional[List[bytes]] = None,
+        timeout: Optional[float] = None,
     ) -> SQLiteCloudResult:
         """
         Execute a command on the SQLite Cloud server.
+
+        The raw SCSP messages of the response are appended to `frames`, if given.
+        The command is abandoned after `timeout` seconds, see `_internal_request()`.
         """
-        command = self._internal_serialize_command(command)
+        result = self._internal_run_command(
+            connection,
+            self._internal_serialize_buffers(command),
+            frames=frames,
+            timeout=timeout,
+        )
+        self._internal_track_transaction(connection, command)
 
-        return self._internal_run_command(connection, command)
+        return result
 
     def execute_statement(
         self,
@@ -97,27 +200,161 @@ class Driver:
         bindings: Tuple[SQLiteDataTypes],
         # bindings: Union[Tuple[SQLiteDataTypes], Dict[str, SQLiteDataTypes]],
         connection: SQLiteCloudConnect,
+        encoded_query: Optional[bytes] = None,
+        frames: Optional[List[bytes]] = None,
+        timeout: Optional[float] = None,
     ) -> Union[SQLiteCloudResult, SQLiteCloudOperationResult]:
         """
         Execute the statement on the SQLite Cloud server.
         It supports only the `qmark` style for parameter binding.
+
+        The query already serialized with `encode_query()` can be passed
+        as `encoded_query` to skip its encoding.
+        The raw SCSP messages of the response are appended to `frames`, if given.
+        The statement is abandoned after `timeout` seconds, see `_internal_request()`.
         """
-        command = self._internal_serialize_command(
-            [query] + list(bindings), zero_string=True
-        )
+        if encoded_query is None:
+            encoded_query = self.encode_query(query)
+
+        command = self._internal_serialize_statement(encoded_query, bindings)
 
-        result = self._internal_run_command(connection, command)
+        result = self._internal_run_command(
+            connection, command, frames=frames, timeout=timeout
+        )
+        self._internal_track_transaction(connection, query)
 
         if result.tag != SQLITECLOUD_RESULT_TYPE.RESULT_ARRAY:
             return result
 
         return SQLiteCloudOperationResult(result)
 
-    def send_blob(self, blob: bytes, conn: SQLiteCloudConnect) -> SQLiteCloudResult:
+    def _internal_track_transaction(
+        self, connection: SQLiteCloudConnect, query: Any
+    ) -> None:
+        """Follow the transaction begun and ended by the statement executed."""
+        if not isinstance(query, str):
+            return
+
+        if _BEGIN_PATTERN.match(query):
+            connection.in_transaction = True
+        elif _END_PATTERN.match(query):
+            connection.in_transaction = False
+
+    def encode_query(self, query: str) -> bytes:
+        """
+        Serialize the query of a statement so that it can be reused
+        for multiple executions.
+        """
+        return self._internal_serialize_command(query, zero_string=True)
+
+    def send_blob(self, blob: BytesLike, conn: SQLiteCloudConnect) -> SQLiteCloudResult:
         """
         Send a blob to the SQLite Cloud server.
         """
-        return self._internal_run_command(conn, self._internal_serialize_command(blob))
+        return self._internal_run_command(conn, self._internal_serialize_buffers(blob))
+
+    def vm_compile(self, connection: SQLiteCloudConnect, query: str) -> SQLiteCloudVM:
+        """
+        Compile the query on the SQLite Cloud server.
+        The returned VM can be executed many times with different bindings
+        without the server parsing the query again.
+        """
+        result = self._internal_run_command(
+            connection,
+            self._internal_serialize_statement(
+                self.encode_query("VM COMPILE ?"), (query,)
+            ),
+        )
+
+        # ARRAY (type, index, readonly, number of parameters, number of columns)
+        if (
+            result.tag != SQLITECLOUD_RESULT_TYPE.RESULT_ARRAY
+            or result.data[0][0] != SQLITECLOUD_ARRAY_TYPE.VM_COMPILE.value
+        ):
+            raise SQLiteCloudException("An error occurred while compiling the query.")
+
+        vm_info = result.data[0]
+
+        vm = SQLiteCloudVM()
+        vm.generation = connection.generation
+        vm.index = vm_info[1]
+        vm.readonly = bool(vm_info[2])
+        vm.nparams = vm_info[3]
+        vm.ncols = vm_info[4]
+
+        return vm
+
+    def vm_step(
+        self,
+        connection: SQLiteCloudConnect,
+        vm: SQLiteCloudVM,
+        bindings: Optional[Tuple[SQLiteDataTypes]] = None,
+    ) -> Union[SQLiteCloudResult, SQLiteCloudOperationResult]:
+        """
+        Step the VM to its next row.
+
+        When `bindings` are provided, the VM is reset and the values are bound
+        before stepping. Reset, bindings and step are sent together and cost
+        a single round trip.
+
+        Returns:
+            The ROWSET of the next row or the operation result once the VM is done.
+        """
+        if vm.finalized:
+            raise SQLiteCloudException("The statement has been finalized.")
+        self._internal_check_vm(connection, vm)
+
+        commands = []
+        if bindings is not None:
+            if len(bindings) != vm.nparams:
+                raise SQLiteCloudException(
+                    f"Incorrect number of bindings supplied. The statement uses {vm.nparams}, and there are {len(bindings)} supplied."
+                )
+
+            commands.append(self._internal_serialize_command(f"VM RESET {vm.index}"))
+            for position, value in enumerate(bindings, start=1):
+                commands.append(
+                    self._internal_serialize_statement(
+                        self.encode_query("VM BIND ? ? ?"),
+                        (vm.index, position, value),
+                    )
+                )
+        commands.append(self._internal_serialize_command(f"VM STEP {vm.index}"))
+
+        result = self._internal_run_pipeline(connection, commands)[-1]
+
+        if result.tag != SQLITECLOUD_RESULT_TYPE.RESULT_ARRAY:
+            return result
+
+        return SQLiteCloudOperationResult(result)
+
+    def vm_reset(self, connection: SQLiteCloudConnect, vm: SQLiteCloudVM) -> None:
+        """Reset the VM to be stepped again from the first row."""
+        self._internal_check_vm(connection, vm)
+        self._internal_run_command(
+            connection, self._internal_serialize_command(f"VM RESET {vm.index}")
+        )
+
+    def vm_finalize(self, connection: SQLiteCloudConnect, vm: SQLiteCloudVM) -> None:
+        """Release the VM on the server."""
+        if vm.finalized:
+            return
+
+        vm.finalized = True
+        if vm.generation != connection.generation:
+            # released by the server along with the socket
+            return
+        self._internal_run_command(
+            connection, self._internal_serialize_command(f"VM FINALIZE {vm.index}")
+        )
+
+    def _internal_check_vm(
+        self, connection: SQLiteCloudConnect, vm: SQLiteCloudVM
+    ) -> None:
+        if vm.generation != connection.generation:
+            raise SQLiteCloudOperationalError(
+                "The statement has been lost: the connection was reopened."
+            )
 
     def is_connected(
         self, connection: SQLiteCloudConnect, main_socket: bool = True
@@ -128,7 +365,8 @@ class Driver:
         sock = connection.socket if main_socket else connection.pubsub_socket
 
         if not sock:
-            return False
+            # reopened by the next request
+            return main_socket and connection.reopen
         try:
             sock.sendall(b"")
         except OSError:
@@ -136,17 +374,74 @@ class Driver:
 
         return True
 
+    def interrupt(self, connection: SQLiteCloudConnect) -> bool:
+        """
+        Abandon the request running on the connection, called by another thread.
+
+        The socket is shut down to stop waiting for the response, and
+        it is replaced by a new one with the next request. The state of
+        the socket on the server is lost: the statements compiled with
+        `vm_compile()` raise SQLiteCloudOperationalError, and so does
+        the next request once when a transaction was open, since it
+        has been rolled back.
+
+        Returns:
+            bool: True if a request was running.
+        """
+        # not to shut down the socket after the request is over
+        with connection.interrupt_lock:
+            if not connection.busy:
+                return False
+
+            connection.interrupted = True
+            sock = connection.socket
+            if sock:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+        return True
+
     def _internal_connect(
         self, hostname: str, port: int, config: SQLiteCloudConfig
     ) -> socket:
         """
         Create a socket connection to the SQLite Cloud server.
         """
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(config.connect_timeout)
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
-        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock, _ = self._internal_connect_nodes([(hostname, port)], config)
+        return sock
 
+    def _internal_open(
+        self,
+        connection: SQLiteCloudConnect,
+        hostname: str,
+        port: int,
+        config: SQLiteCloudConfig,
+        exclude: Optional[Node] = None,
+    ) -> None:
+        """
+        Connect the main socket to the node, or to the fastest node available
+        when it is one of the nodes of the connection string.
+        """
+        nodes = config.account.nodes if config.account else []
+        if len(nodes) > 1 and (hostname, port) in nodes:
+            others = [node for node in nodes if node != exclude]
+            connection.socket, connection.node = self._internal_connect_nodes(
+                others or nodes, config
+            )
+        else:
+            connection.socket = self._internal_connect(hostname, port, config)
+            connection.node = (hostname, port)
+
+    def _internal_connect_nodes(
+        self, nodes: List[Node], config: SQLiteCloudConfig
+    ) -> Tuple[socket.socket, Node]:
+        """
+        Connect to the first node answering, trying all the addresses
+        of the nodes, IPv4 and IPv6, in the order of the node selector.
+        """
+        context = None
         if not config.insecure:
             context = ssl.create_default_context(cafile=config.root_certificate)
             if config.certificate:
@@ -157,25 +452,331 @@ class Driver:
                 context.check_hostname = False
                 context.verify_mode = ssl.CERT_NONE
 
-            sock = context.wrap_socket(sock, server_hostname=hostname)
+        errmsg = "An error occurred while initializing the socket."
+        selector = get_node_selector()
+        deadline = time.monotonic() + config.connect_timeout
+
+        addresses, error = self._internal_resolve_nodes(selector.order(nodes), deadline)
+        if not addresses:
+            raise SQLiteCloudException(errmsg) from error
 
         try:
-            sock.connect((hostname, port))
-        except Exception as e:
-            errmsg = "An error occurred while initializing the socket."
+            sock, node = self._internal_race_addresses(addresses, deadline)
+        except OSError as e:
             raise SQLiteCloudException(errmsg) from e
 
-        return sock
+        sock.settimeout(config.connect_timeout)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        if context is not None:
+            try:
+                sock = context.wrap_socket(sock, server_hostname=node[0])
+            except Exception as e:
+                sock.close()
+                raise SQLiteCloudException(errmsg) from e
+
+        return sock, node
+
+    def _internal_resolve_nodes(
+        self, nodes: List[Node], deadline: float
+    ) -> Tuple[List[Tuple[int, Any, Node]], Optional[Exception]]:
+        """
+        Look up the addresses of the nodes in parallel, so that a slow lookup
+        does not delay the others.
+
+        The lookups are waited for until the deadline, or HAPPY_EYEBALLS_DELAY
+        seconds after the first one resolved: the slower nodes are left out
+        of this connection. A node that cannot be resolved is not ejected:
+        the error comes from the resolver, not from the node.
+
+        Returns:
+            The addresses, in the order of the nodes, and the last lookup error.
+        """
+        results: Dict[Node, Union[List[Tuple[int, Any, Node]], OSError]] = {}
+        resolved = threading.Condition()
+
+        def resolve(node: Node) -> None:
+            try:
+                infos = socket.getaddrinfo(node[0], node[1], type=socket.SOCK_STREAM)
+                result = [(info[0], info[4], node) for info in infos]
+            except OSError as e:
+                result = e
+            with resolved:
+                results[node] = result
+                resolved.notify_all()
+
+        for node in nodes:
+            # a lookup cannot be cancelled: the thread is left
+            # to finish by itself after the deadline
+            threading.Thread(
+                target=resolve, args=(node,), name="sqlitecloud-resolve", daemon=True
+            ).start()
+
+        with resolved:
+            first_at = None
+            while len(results) < len(nodes):
+                now = time.monotonic()
+                if first_at is None and any(
+                    isinstance(r, list) for r in results.values()
+                ):
+                    first_at = now
+                limit = (
+                    deadline
+                    if first_at is None
+                    else min(deadline, first_at + HAPPY_EYEBALLS_DELAY)
+                )
+                if now >= limit:
+                    break
+                resolved.wait(limit - now)
+            results = dict(results)
+
+        addresses = []
+        error = None
+        for node in nodes:
+            result = results.get(node)
+            if isinstance(result, OSError):
+                error = result
+            elif result is not None:
+                addresses += result
+
+        if not addresses and error is None and len(results) < len(nodes):
+            error = socket.timeout("timed out while resolving the nodes")
+
+        return addresses, error
+
+    def _internal_race_addresses(
+        self, addresses: List[Tuple[int, Any, Node]], deadline: float
+    ) -> Tuple[socket.socket, Node]:
+        """
+        Happy Eyeballs (RFC 8305): start a connection attempt to the next address
+        every HAPPY_EYEBALLS_DELAY seconds, or as soon as an attempt fails, and
+        keep the first socket connected. IPv6 and IPv4 addresses are alternated.
+
+        A node is ejected by the node selector when all its addresses fail,
+        the time to connect to the winner is recorded.
+        """
+        selector = get_node_selector()
+        # addresses of each node not failed yet
+        remaining = Counter(node for _, _, node in addresses)
+        pending = deque(_interleave_families(addresses))
+        attempts = {}
+        next_attempt = 0.0
+        error: Optional[OSError] = None
+
+        def failed(node: Node, e: OSError) -> None:
+            nonlocal error
+            error = e
+            remaining[node] -= 1
+            if remaining[node] == 0:
+                selector.eject(node)
+
+        waiting = selectors.DefaultSelector()
+        try:
+            while pending or attempts:
+                now = time.monotonic()
+                if now >= deadline:
+                    raise socket.timeout("timed out")
+
+                if pending and (now >= next_attempt or not attempts):
+                    family, address, node = pending.popleft()
+                    sock = socket.socket(family, socket.SOCK_STREAM)
+                    sock.setblocking(False)
+                    err = sock.connect_ex(address)
+                    if err in _CONNECT_IN_PROGRESS:
+                        attempts[sock] = (node, now)
+                        waiting.register(sock, selectors.EVENT_WRITE)
+                        next_attempt = now + HAPPY_EYEBALLS_DELAY
+                    else:
+                        sock.close()
+                        failed(node, OSError(err, os.strerror(err)))
+                    continue
+
+                timeout = deadline - now
+                if pending:
+                    timeout = min(timeout, next_attempt - now)
+
+                for key, _ in waiting.select(max(timeout, 0)):
+                    sock = key.fileobj
+                    node, started_at = attempts.pop(sock)
+                    waiting.unregister(sock)
+
+                    err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    if err == 0:
+                        sock.setblocking(True)
+                        selector.observe(node, time.monotonic() - started_at)
+                        return sock, node
+
+                    sock.close()
+                    failed(node, OSError(err, os.strerror(err)))
+                    # start the next attempt without waiting
+                    next_attempt = 0.0
+
+            raise error or socket.timeout("timed out")
+        finally:
+            for sock in attempts:
+                sock.close()
+            waiting.close()
 
     def _internal_reconnect(self, buffer: bytes) -> bool:
         return True
 
+    def _internal_reconnect_after_fork(self, connection: SQLiteCloudConnect) -> None:
+        """
+        Replace the sockets of a connection inherited from the parent process,
+        eg by the workers of a prefork server, so that the processes do not
+        mix their messages on the same socket. The channels and tables
+        listened to by the parent are listened to again.
+        """
+        with _fork_lock:
+            if connection.pid == os.getpid():
+                # reconnected by another thread
+                return
+
+            # only the copy of the process is closed, the sockets of the parent
+            # are not shut down
+            for sock in (connection.socket, connection.pubsub_socket):
+                if sock:
+                    try:
+                        sock.close()
+                    except OSError:
+                        pass
+            connection.socket = None
+            connection.pubsub_socket = None
+            connection.pubsub_thread = None
+            connection.pubsub_reactor = None
+            connection.lock = threading.RLock()
+            connection.interrupt_lock = threading.Lock()
+            connection.generation += 1
+
+            connection.pid = os.getpid()
+            if getattr(connection, "config", None) is None:
+                return
+
+            connection.reopen = True
+            self._internal_reopen(connection)
+
+            for command in sorted(connection.pubsub_listening):
+                self._internal_run_command(
+                    connection, self._internal_serialize_command(command)
+                )
+
+    def _internal_reopen(self, connection: SQLiteCloudConnect) -> None:
+        """Open a new main socket for the connection and apply its configuration."""
+        config = connection.config
+        hostname, port = connection.node or (
+            config.account.hostname,
+            config.account.port,
+        )
+        self._internal_open(connection, hostname, port, config)
+        connection.reopen = False
+
+        # the lost transaction is reported by the request reopening the
+        # socket, not by the commands authenticating it
+        lost, connection.transaction_lost = connection.transaction_lost, False
+        try:
+            self._internal_config_apply(connection, config)
+        finally:
+            connection.transaction_lost = lost
+
+    def _internal_discard(self, connection: SQLiteCloudConnect) -> None:
+        """
+        Close the main socket with a response partially read, which cannot
+        be used anymore. A new socket is opened by the next request.
+        """
+        if connection.socket:
+            try:
+                connection.socket.close()
+            except OSError:
+                pass
+        connection.socket = None
+        connection.reopen = getattr(connection, "config", None) is not None
+
+        # the server has released the VMs and rolled back the transaction
+        connection.generation += 1
+        if connection.in_transaction:
+            connection.in_transaction = False
+            connection.transaction_lost = True
+
+    @contextmanager
+    def _internal_request(
+        self, connection: SQLiteCloudConnect, timeout: Optional[float] = None
+    ) -> Iterator[None]:
+        """
+        Track the request running on the connection, holding its lock.
+
+        The response must be read within `timeout` seconds. When the time is over,
+        or the request is interrupted, the response cannot be drained from
+        the socket since it is only partially read: the socket is discarded and
+        a SQLiteCloudOperationalError is raised.
+        A nested request runs within the deadline of the outer one.
+        """
+        if connection.busy:
+            yield
+            return
+
+        with connection.interrupt_lock:
+            connection.busy = True
+            connection.interrupted = False
+        connection.progress_count = 0
+        connection.deadline = (
+            time.monotonic() + timeout if timeout is not None else None
+        )
+        sock = connection.socket
+        sock_timeout = sock.gettimeout() if sock else None
+        started = time.monotonic()
+
+        try:
+            yield
+        except SQLiteCloudException as e:
+            if connection.interrupted:
+                self._internal_discard(connection)
+                raise SQLiteCloudOperationalError(
+                    "interrupted", SQLITE_INTERRUPT
+                ) from e
+            if (
+                connection.deadline is not None
+                and time.monotonic() >= connection.deadline
+            ):
+                self._internal_discard(connection)
+                raise SQLiteCloudOperationalError("Query timed out") from e
+            raise
+        else:
+            config = getattr(connection, "config", None)
+            if (
+                connection.node is not None
+                and config is not None
+                and config.account is not None
+                and len(config.account.nodes) > 1
+            ):
+                # the fastest nodes are preferred by the next connections
+                get_node_selector().observe_request(
+                    connection.node, time.monotonic() - started
+                )
+        finally:
+            with connection.interrupt_lock:
+                if connection.interrupted and connection.socket is sock:
+                    # interrupted after the response has been read
+                    self._internal_discard(connection)
+                elif (
+                    connection.deadline is not None
+                    and connection.socket is sock
+                    and sock
+                ):
+                    try:
+                        sock.settimeout(sock_timeout)
+                    except OSError:
+                        pass
+                connection.deadline = None
+                connection.busy = False
+
     def _internal_setup_pubsub(
         self, connection: SQLiteCloudConnect, buffer: bytes
     ) -> bool:
         """
         Prepare the connection for PubSub.
-        Opens a new specific socket and starts the thread to listen for incoming messages.
+        Opens a new specific socket and registers it with the reactor listening
+        for incoming messages, the shared PubSub thread by default.
         """
         if self.is_connected(connection, False):
             return True
@@ -185,93 +786,85 @@ class Driver:
                 "A callback function must be provided to setup the PubSub connection."
             )
 
-        connection.pubsub_socket = self._internal_connect(
+        # the same node of the main socket
+        hostname, port = connection.node or (
             connection.config.account.hostname,
             connection.config.account.port,
-            connection.config,
+        )
+        connection.pubsub_socket = self._internal_connect(
+            hostname, port, connection.config
         )
 
         self._internal_run_command(
             connection, self._internal_serialize_command(buffer.decode()), False
         )
-        thread = threading.Thread(
-            target=self._internal_pubsub_thread, args=(connection,)
+
+        reactor = connection.pubsub_reactor or get_pubsub_reactor()
+        reactor.register(
+            connection,
+            self._internal_pubsub_reader(connection, reactor),
+            lambda: self._internal_pubsub_closed(connection),
         )
-        # kill the thread when the main one is terminated
-        thread.daemon = True
-        thread.start()
-        connection.pubsub_thread = thread
+        connection.pubsub_thread = reactor.thread
 
         return True
 
-    def _internal_pubsub_thread(self, connection: SQLiteCloudConnect) -> None:
-        blen = 2048
-        buffer: bytes = b""
-        tread = 0
-
-        try:
-            while True:
-
-                try:
-                    if not connection.pubsub_socket:
-                        logging.info("PubSub socket dismissed.")
-                        break
-
-                    # wait for the socket to be readable (no timeout)
-                    ready_to_read, _, errors = select.select(
-                        [connection.pubsub_socket], [], []
-                    )
-                    # eg, if the socket is closed
-                    if len(errors) > 0:
-                        break
-                    # eg, no data to read
-                    if len(ready_to_read) == 0:
-                        continue
-
-                    data = connection.pubsub_socket.recv(blen)
-                    if not data:
-                        logging.info("PubSub connection closed.")
-                        break
-                except Exception as e:
-                    logging.error(
-                        f"An error occurred while reading data: {SQLITECLOUD_INTERNAL_ERRCODE.NETWORK.value} ({e})."
-                    )
-                    break
-
-                nread = len(data)
-                tread += nread
-                buffer += data
-
-                sqlitecloud_number = self._internal_parse_number(buffer)
-                clen = sqlitecloud_number.value
-                if clen == 0:
-                    continue
+    def _internal_pubsub_reader(
+        self, connection: SQLiteCloudConnect, reactor: Any = None
+    ) -> Callable[[], bool]:
+        """
+        Build the function called by the PubSub reactor when the socket
+        of the connection is readable. The callback of the connection
+        is passed to the `call_soon()` of the reactor, or called when None.
+        """
+        decoder = _FrameDecoder()
+        call = (
+            (lambda *args: reactor.call_soon(connection, *args))
+            if reactor is not None
+            else (lambda callback, *args: callback(*args))
+        )
 
-                # check if read is complete
-                # clen is the lenght parsed in the buffer
-                # cstart is the index of the first space
-                cstart = sqlitecloud_number.cstart
-                if clen + cstart != tread:
-                    continue
+        def read() -> bool:
+            sock = connection.pubsub_socket
+            try:
+                if decoder.recv(sock) == 0:
+                    logging.info("PubSub connection closed.")
+                    return False
+                # the records already decrypted by SSL do not make
+                # the socket readable again
+                while isinstance(sock, ssl.SSLSocket) and sock.pending() > 0:
+                    decoder.recv(sock)
+            except (BlockingIOError, ssl.SSLWantReadError):
+                # non-blocking socket: the rest of the data has not arrived yet
+                pass
+            except Exception as e:
+                logging.error(
+                    f"An error occurred while reading data: {SQLITECLOUD_INTERNAL_ERRCODE.NETWORK.value} ({e})."
+                )
+                return False
 
-                result = self._internal_parse_buffer(connection, buffer, tread)
+            # a read can contain many notifications and the beginning of the next one
+            for frame in decoder.frames():
+                result = self._internal_parse_buffer(connection, frame, len(frame))
                 if result.tag == SQLITECLOUD_RESULT_TYPE.RESULT_STRING:
                     result.tag = SQLITECLOUD_RESULT_TYPE.RESULT_JSON
 
-                connection.pubsub_callback(
-                    connection, SQLiteCloudResultSet(result), connection.pubsub_data
+                call(
+                    connection.pubsub_callback,
+                    connection,
+                    SQLiteCloudResultSet(result),
+                    connection.pubsub_data,
                 )
 
-                # reset after having read the message
-                tread = 0
-                buffer: bytes = b""
-        except Exception as e:
-            logging.error(f"An error occurred while parsing data: {e}.")
+            return True
 
-        finally:
-            if connection and connection.pubsub_callback:
-                connection.pubsub_callback(connection, None, connection.pubsub_data)
+        return read
+
+    def _internal_pubsub_closed(self, connection: SQLiteCloudConnect) -> None:
+        if connection.pubsub_callback:
+            connection.pubsub_callback(connection, None, connection.pubsub_data)
 
+    @_exclusive
     def upload_database(
         self,
         connection: SQLiteCloudConnect,
@@ -283,10 +876,17 @@ class Driver:
         fd: BufferedReader,
         dbsize: int,
         xCallback: Callable[[BufferedReader, int, int, int], bytes],
+        window: int = SQLITECLOUD_DEFAULT.UPLOAD_WINDOW.value,
+        chunk_size: Optional[int] = None,
     ) -> None:
         """
         Uploads a database to the server.
 
+        Up to `window` chunks are sent before waiting for their acknowledgement,
+        and the next chunk is read while the current one is sent. Unless
+        `chunk_size` is given, the size of the chunks is adjusted to the round
+        trip time and to the bandwidth measured from the acknowledgements.
+
         Args:
             connection (SQLiteCloudConnect): The connection object to the SQLite Cloud server.
             dbname (str): The name of the database to upload.
@@ -297,6 +897,8 @@ class Driver:
             fd (BufferedReader): The file descriptor of the database file.
             dbsize (int): The size of the database file.
             xCallback (Callable[[BufferedReader, int, int, int], bytes]): The callback function to read the buffer.
+            window (int): The maximum number of chunks sent and not yet acknowledged.
+            chunk_size (Optional[int]): The fixed size of the chunks, if given.
 
         Raises:
             SQLiteCloudException: If an error occurs during the upload process.
@@ -322,41 +924,67 @@ class Driver:
                 "An error occurred while initializing the upload of the database."
             )
 
-        buffer: bytes = b""
-        blen = 0
+        tuner = _UploadChunkTuner(chunk_size, window)
+        # chunks sent and not yet acknowledged: size and time of the write
+        inflight: Deque[Tuple[int, float]] = deque()
+
+        def read_chunk(blen: int, nprogress: int) -> bytes:
+            try:
+                return xCallback(fd, blen, dbsize, nprogress)
+            except Exception as e:
+                raise SQLiteCloudException(
+                    "An error occurred while reading the file."
+                ) from e
+
+        def read_ack() -> None:
+            blen, sent_at = inflight.popleft()
+            try:
+                self._internal_socket_read(connection)
+            except Exception as e:
+                raise SQLiteCloudException(
+                    "An error occurred while uploading the file."
+                ) from e
+            tuner.acknowledged(blen, sent_at)
+
         nprogress = 0
         try:
-            while True:
-                # execute callback to read buffer
-                blen = SQLITECLOUD_DEFAULT.UPLOAD_SIZE.value
-                try:
-                    buffer = xCallback(fd, blen, dbsize, nprogress)
+            # the next chunk is read from the file while the current one is sent
+            with ThreadPoolExecutor(max_workers=1) as reader:
+                next_chunk = reader.submit(read_chunk, tuner.chunk_size, nprogress)
+                while True:
+                    buffer = next_chunk.result()
                     blen = len(buffer)
-                except Exception as e:
-                    raise SQLiteCloudException(
-                        "An error occurred while reading the file."
-                    ) from e
-
-                try:
-                    # send also the final confirmation blob of zero bytes
-                    self.send_blob(buffer, connection)
-                except Exception as e:
-                    raise SQLiteCloudException(
-                        "An error occurred while uploading the file."
-                    ) from e
-
-                # update progress
-                nprogress += blen
+                    nprogress += blen
+                    if blen > 0:
+                        next_chunk = reader.submit(
+                            read_chunk, tuner.chunk_size, nprogress
+                        )
+
+                    while len(inflight) >= max(window, 1):
+                        read_ack()
+
+                    try:
+                        # send also the final confirmation blob of zero bytes
+                        self._internal_socket_write(
+                            connection, self._internal_serialize_buffers(buffer)
+                        )
+                    except Exception as e:
+                        raise SQLiteCloudException(
+                            "An error occurred while uploading the file."
+                        ) from e
+                    inflight.append((blen, time.monotonic()))
+
+                    if blen == 0:
+                        # Upload completed
+                        break
 
-                if blen == 0:
-                    # Upload completed
-                    break
+                while inflight:
+                    read_ack()
         except Exception as e:
-            self._internal_run_command(
-                connection, self._internal_serialize_command("UPLOAD ABORT")
-            )
+            self._internal_abort_transfer(connection, "UPLOAD ABORT", len(inflight))
             raise e
 
+    @_exclusive
     def download_database(
         self,
         connection: SQLiteCloudConnect,
@@ -364,16 +992,21 @@ class Driver:
         fd: BufferedWriter,
         xCallback: Callable[[BufferedWriter, int, int, int], bytes],
         if_exists: bool,
+        window: int = SQLITECLOUD_DEFAULT.DOWNLOAD_WINDOW.value,
     ) -> None:
         """
         Downloads a database from the SQLite Cloud service.
 
+        Up to `window` DOWNLOAD STEP requests are kept in flight, so the next
+        chunks are already on the way while the callback writes the current one.
+
         Args:
             connection (SQLiteCloudConnect): The connection object used to communicate with the SQLite Cloud service.
             dbname (str): The name of the database to download.
             fd (BufferedWriter): The file descriptor to write the downloaded data to.
             xCallback (Callable[[BufferedWriter, int, int, int], bytes]): A callback function to write downloaded data with the download progress information.
             if_exists (bool): If True, the download won't rise an exception if database is missing.
+            window (int): The maximum number of chunks requested and not yet received.
 
         Raises:
             SQLiteCloudException: If an error occurs while downloading the database.
@@ -398,16 +1031,35 @@ class Driver:
 
         # loop to download
         progress_size = 0
+        step = self._internal_serialize_command("DOWNLOAD STEP")
+        # size of the chunks, known after the first one
+        chunk_size = 0
+        inflight = 0
 
         try:
             while progress_size < db_size:
-                result = self._internal_run_command(
-                    connection, self._internal_serialize_command("DOWNLOAD STEP")
-                )
+                # keep the next steps in flight while the chunk is written,
+                # without requesting chunks past the end of the database
+                requests = 0
+                while inflight + requests < max(window, 1) and (
+                    inflight + requests == 0
+                    or (
+                        chunk_size > 0
+                        and progress_size + (inflight + requests) * chunk_size < db_size
+                    )
+                ):
+                    requests += 1
+                if requests:
+                    self._internal_socket_write(connection, [step] * requests)
+                    inflight += requests
+
+                inflight -= 1
+                result = self._internal_socket_read(connection)
 
                 # res is BLOB, decode it
                 data = result.data[0]
                 data_len = len(data)
+                chunk_size = max(chunk_size, data_len)
 
                 # execute callback (with progress_size updated)
                 progress_size += data_len
@@ -416,11 +1068,45 @@ class Driver:
                 # check exit condition
                 if data_len == 0:
                     break
+
+            # responses of the steps requested past the end, when the chunks
+            # are larger than the ones received so far
+            while inflight > 0:
+                inflight -= 1
+                try:
+                    self._internal_socket_read(connection)
+                except SQLiteCloudException:
+                    raise
+                except (SQLiteCloudError, SQLiteCloudWarning) as e:
+                    # the database has already been downloaded
+                    logging.debug(f"DOWNLOAD STEP past the end: {e}")
         except Exception as e:
+            self._internal_abort_transfer(connection, "DOWNLOAD ABORT", inflight)
+            raise e
+
+    def _internal_abort_transfer(
+        self, connection: SQLiteCloudConnect, command: str, inflight: int
+    ) -> None:
+        """
+        Abort the transfer on the server, after reading the responses
+        of the requests still in flight.
+        """
+        try:
+            for _ in range(inflight):
+                try:
+                    self._internal_socket_read(connection)
+                except SQLiteCloudException:
+                    # network errors leave the connection unusable
+                    raise
+                except (SQLiteCloudError, SQLiteCloudWarning):
+                    # error response from the server
+                    pass
             self._internal_run_command(
-                connection, self._internal_serialize_command("DOWNLOAD ABORT")
+                connection, self._internal_serialize_command(command)
             )
-            raise e
+        except SQLiteCloudException as e:
+            # the connection is unusable, the server discards the transfer
+            logging.debug(f"Cannot abort the transfer: {e}")
 
     def _internal_config_apply(
         self, connection: SQLiteCloudConnect, config: SQLiteCloudConfig
@@ -470,11 +1156,14 @@ class Driver:
                 connection, self._internal_serialize_command(command)
             )
 
+    @_exclusive
     def _internal_run_command(
         self,
         connection: SQLiteCloudConnect,
-        command: bytes,
+        command: Union[bytes, List[BytesLike]],
         main_socket: bool = True,
+        frames: Optional[List[bytes]] = None,
+        timeout: Optional[float] = None,
     ) -> SQLiteCloudResult:
         """Send serialized command to the server and read the response."""
         if not self.is_connected(connection, main_socket):
@@ -483,13 +1172,66 @@ class Driver:
                 SQLITECLOUD_INTERNAL_ERRCODE.NETWORK,
             )
 
-        self._internal_socket_write(connection, command, main_socket)
-        return self._internal_socket_read(connection, main_socket)
+        if not main_socket:
+            self._internal_socket_write(connection, command, main_socket)
+            return self._internal_socket_read(connection, main_socket, frames)
+
+        with self._internal_request(connection, timeout):
+            self._internal_socket_write(connection, command, main_socket)
+            return self._internal_socket_read(connection, main_socket, frames)
+
+    @_exclusive
+    def _internal_run_pipeline(
+        self,
+        connection: SQLiteCloudConnect,
+        commands: List[Union[bytes, List[BytesLike]]],
+        main_socket: bool = True,
+    ) -> List[SQLiteCloudResult]:
+        """
+        Send the serialized commands with a single write and read their responses in order.
+
+        All the responses are read even when one of them is an error, so
+        that the connection is left ready for the next command.
+        The first error is raised after the last response has been read.
+        """
+        if not self.is_connected(connection, main_socket):
+            raise SQLiteCloudException(
+                "The connection is closed.",
+                SQLITECLOUD_INTERNAL_ERRCODE.NETWORK,
+            )
+
+        buffers = []
+        for command in commands:
+            if isinstance(command, list):
+                buffers.extend(command)
+            else:
+                buffers.append(command)
+
+        results = []
+        error = None
+        with self._internal_request(connection):
+            self._internal_socket_write(connection, buffers, main_socket)
+
+            for _ in commands:
+                try:
+                    results.append(self._internal_socket_read(connection, main_socket))
+                except SQLiteCloudException:
+                    # network errors leave the connection unusable
+                    raise
+                except (SQLiteCloudError, SQLiteCloudWarning) as e:
+                    # error response from the server
+                    error = error or e
+                    results.append(None)
+
+        if error:
+            raise error
+
+        return results
 
     def _internal_socket_write(
         self,
         connection: SQLiteCloudConnect,
-        command: bytes,
+        command: Union[bytes, List[BytesLike]],
         main_socket: bool = True,
     ) -> None:
         """
@@ -497,24 +1239,87 @@ class Driver:
 
         Args:
             connection (SQLiteCloudConnect): The connection object to the SQLite Cloud server.
-            command (bytes): The command to send.
+            command (Union[bytes, List[BytesLike]]): The command to send, either as
+                a single buffer or as the list of buffers to write in order.
             main_socket (bool): If True, write to the main socket, otherwise write to the pubsub socket.
         """
+        buffers = (
+            self._internal_coalesce_buffers(command)
+            if isinstance(command, list)
+            else [command]
+        )
+
         # write buffer
-        if len(command) == 0:
+        if len(buffers) == 0 or (len(buffers) == 1 and len(buffers[0]) == 0):
             return
         try:
             sock = connection.socket if main_socket else connection.pubsub_socket
 
-            sock.sendall(command)
+            if len(buffers) == 1:
+                sock.sendall(buffers[0])
+            elif isinstance(sock, ssl.SSLSocket) or not hasattr(sock, "sendmsg"):
+                # TLS sockets do not support scatter-gather writes
+                for buffer in buffers:
+                    sock.sendall(buffer)
+            else:
+                self._internal_socket_sendmsg(sock, buffers)
         except Exception as exc:
             raise SQLiteCloudException(
                 "An error occurred while writing data.",
                 SQLITECLOUD_INTERNAL_ERRCODE.NETWORK,
             ) from exc
 
+    def _internal_coalesce_buffers(self, buffers: List[BytesLike]) -> List[BytesLike]:
+        """
+        Join the runs of small buffers, like headers and numbers, while large
+        buffers are kept as they are to not copy them.
+        """
+        threshold = SQLITECLOUD_DEFAULT.WRITE_COALESCE_SIZE.value
+
+        coalesced = []
+        pending = []
+        for buffer in buffers:
+            size = buffer.nbytes if isinstance(buffer, memoryview) else len(buffer)
+            if size == 0:
+                continue
+            if size < threshold:
+                pending.append(buffer)
+                continue
+
+            if pending:
+                coalesced.append(b"".join(pending))
+                pending = []
+            coalesced.append(buffer)
+
+        if pending:
+            coalesced.append(b"".join(pending))
+
+        return coalesced
+
+    def _internal_socket_sendmsg(
+        self, sock: socket.socket, buffers: List[BytesLike]
+    ) -> None:
+        """Write all the buffers with scatter-gather writes, handling partial sends."""
+        views = [memoryview(buffer).cast("B") for buffer in buffers]
+
+        first = 0
+        while first < len(views):
+            sent = sock.sendmsg(views[first : first + SOCKET_IOV_MAX])
+
+            # skip the buffers completely sent
+            while first < len(views) and sent >= len(views[first]):
+                sent -= len(views[first])
+                first += 1
+            # and the sent part of the partially sent one
+            if sent > 0:
+                views[first] = views[first][sent:]
+
     def _internal_socket_read(
-        self, connection: SQLiteCloudConnect, main_socket: bool = True
+        self,
+        connection: SQLiteCloudConnect,
+        main_socket: bool = True,
+        frames: Optional[List[bytes]] = None,
+        rowset: Optional[SQLiteCloudResult] = None,
     ) -> SQLiteCloudResult:
         """
         Read from the socket and parse the response.
@@ -523,6 +1328,10 @@ class Driver:
         The dimensions (LEN) specified in the SCSP protocol are in bytes, while
         Python counts decoded strings in characters. This can cause issues when
         slicing the buffer into parts if there are special characters like "ò".
+
+        Each message read, as received from the server, is appended to `frames`.
+        `rowset` is the chunked rowset being read, kept by the caller so that
+        the driver has no state shared between the threads.
         """
         buffer = b""
         command_type = ""
@@ -536,6 +1345,8 @@ class Driver:
         # _ for null command
         # :145 for integer command with value 145
         while True:
+            if main_socket:
+                self._internal_check_deadline(connection, sock)
             try:
                 data = sock.recv(1)
                 if not data:
@@ -567,19 +1378,27 @@ class Driver:
             or command_type == SQLITECLOUD_CMD.FLOAT.value
             or command_type == SQLITECLOUD_CMD.NULL.value
         ):
+            if frames is not None:
+                frames.append(buffer)
             return self._internal_parse_buffer(connection, buffer, len(buffer))
 
         command_length = int(command_length_value)
 
-        # read the command
-        nread = 0
-
-        while nread < command_length:
-            buffer_size = min(command_length - nread, 8192)
-
+        # read the command directly into a buffer preallocated
+        # for the whole response, so that large responses are not
+        # copied each time a block is received
+        header_length = len(buffer)
+        response = bytearray(header_length + command_length)
+        response[:header_length] = buffer
+        view = memoryview(response)
+        nread = header_length
+
+        while nread < len(response):
+            if main_socket:
+                self._internal_check_deadline(connection, sock)
             try:
-                data = sock.recv(buffer_size)
-                if not data:
+                nbytes = sock.recv_into(view[nread:])
+                if not nbytes:
                     raise SQLiteCloudException(
                         "Incomplete response from server. Cannot read the command."
                     )
@@ -589,10 +1408,57 @@ class Driver:
                     SQLITECLOUD_INTERNAL_ERRCODE.NETWORK,
                 ) from exc
 
-            nread += len(data)
-            buffer += data
+            nread += nbytes
+            if main_socket:
+                self._internal_progress(connection)
+
+        view.release()
+
+        # BLOB cells returned as memoryview reference the response buffer,
+        # which doesn't need to be copied
+        buffer = (
+            response
+            if self._internal_blob_as_memoryview(connection)
+            else bytes(response)
+        )
+
+        if frames is not None:
+            # not copied: the response buffer is not changed after the read
+            frames.append(buffer)
+
+        return self._internal_parse_buffer(
+            connection, buffer, len(buffer), frames, rowset
+        )
+
+    def _internal_check_deadline(
+        self, connection: SQLiteCloudConnect, sock: socket.socket
+    ) -> None:
+        """Limit the wait for the next block of the response to the deadline."""
+        if connection.interrupted:
+            raise SQLiteCloudException("The request has been interrupted.")
+
+        if connection.deadline is None:
+            return
+
+        remaining = connection.deadline - time.monotonic()
+        if remaining <= 0:
+            raise SQLiteCloudException("The request has timed out.")
+        sock.settimeout(remaining)
+
+    def _internal_progress(self, connection: SQLiteCloudConnect) -> None:
+        """Call the progress handler every `progress_n` blocks received."""
+        if connection.progress_handler is None:
+            return
+
+        connection.progress_count += 1
+        if connection.progress_count % max(connection.progress_n, 1) == 0:
+            if connection.progress_handler():
+                connection.interrupted = True
+                raise SQLiteCloudException("The request has been interrupted.")
 
-        return self._internal_parse_buffer(connection, buffer, len(buffer))
+    def _internal_blob_as_memoryview(self, connection: SQLiteCloudConnect) -> bool:
+        config = getattr(connection, "config", None)
+        return config is not None and config.blob_as_memoryview
 
     def _internal_parse_number(
         self, buffer: bytes, index: int = 1
@@ -636,7 +1502,12 @@ class Driver:
         return sqlitecloud_number
 
     def _internal_parse_buffer(
-        self, connection: SQLiteCloudConnect, buffer: bytes, blen: int
+        self,
+        connection: SQLiteCloudConnect,
+        buffer: bytes,
+        blen: int,
+        frames: Optional[List[bytes]] = None,
+        rowset: Optional[SQLiteCloudResult] = None,
     ) -> SQLiteCloudResult:
         # possible return values:
         # True 	=> OK
@@ -666,6 +1537,12 @@ class Driver:
             blen = len(buffer)
             cmd = chr(buffer[0])
 
+        blob_view = None
+        if self._internal_blob_as_memoryview(connection):
+            blob_view = memoryview(buffer)
+            if hasattr(blob_view, "toreadonly"):
+                blob_view = blob_view.toreadonly()
+
         # first character contains command type
         if cmd in [
             SQLITECLOUD_CMD.ZEROSTRING.value,
@@ -687,7 +1564,10 @@ class Driver:
 
             if cmd == SQLITECLOUD_CMD.ZEROSTRING.value:
                 len_ -= 1
-            clone = buffer[cstart : cstart + len_]
+            if cmd == SQLITECLOUD_CMD.BLOB.value and blob_view is not None:
+                clone = blob_view[cstart : cstart + len_]
+            else:
+                clone = buffer[cstart : cstart + len_]
 
             if cmd == SQLITECLOUD_CMD.COMMAND.value:
                 return self._internal_run_command(
@@ -749,8 +1629,6 @@ class Driver:
 
             # check for end-of-chunk condition
             if rowset_signature.start == 0 and rowset_signature.version == 0:
-                rowset = self._rowset
-                self._rowset = None
                 return rowset
 
             rowset = self._internal_parse_rowset(
@@ -760,12 +1638,16 @@ class Driver:
                 rowset_signature.version,
                 rowset_signature.nrows,
                 rowset_signature.ncols,
+                blob_view=blob_view,
+                rowset=rowset,
             )
 
             # continue reading from the socket
             # until the end-of-chunk condition
             if cmd == SQLITECLOUD_CMD.ROWSET_CHUNK.value:
-                return self._internal_socket_read(connection)
+                return self._internal_socket_read(
+                    connection, frames=frames, rowset=rowset
+                )
 
             return rowset
 
@@ -852,7 +1734,15 @@ class Driver:
 
         return r
 
-    def _internal_parse_value(self, buffer: bytes, index: int = 0) -> SQLiteCloudValue:
+    def _internal_parse_value(
+        self, buffer: bytes, index: int = 0, blob_view: Optional[memoryview] = None
+    ) -> SQLiteCloudValue:
+        """
+        Parse the value at the index of the buffer.
+
+        When `blob_view` is the memoryview of the buffer, BLOB values
+        are sliced from it instead of being copied.
+        """
         sqlitecloud_value = SQLiteCloudValue()
         len = 0
         cellsize = 0
@@ -893,7 +1783,10 @@ class Driver:
         len = blen - 1 if c == SQLITECLOUD_CMD.ZEROSTRING.value else blen
         cellsize = blen + cstart - index
 
-        value = buffer[cstart : cstart + len]
+        if c == SQLITECLOUD_CMD.BLOB.value and blob_view is not None:
+            value = blob_view[cstart : cstart + len]
+        else:
+            value = buffer[cstart : cstart + len]
 
         if c == SQLITECLOUD_CMD.STRING.value or c == SQLITECLOUD_CMD.ZEROSTRING.value:
             value = value.decode()
@@ -949,9 +1842,20 @@ class Driver:
         return SQLiteCloudRowsetSignature()
 
     def _internal_parse_rowset(
-        self, buffer: bytes, start: int, idx: int, version: int, nrows: int, ncols: int
+        self,
+        buffer: bytes,
+        start: int,
+        idx: int,
+        version: int,
+        nrows: int,
+        ncols: int,
+        blob_view: Optional[memoryview] = None,
+        rowset: Optional[SQLiteCloudResult] = None,
     ) -> SQLiteCloudResult:
-        rowset = None
+        """
+        Parse a rowset, or a chunk of it. The values of the next chunks are
+        appended to `rowset`, the result returned for the first chunk.
+        """
         n = start
         ischunk = chr(buffer[0]) == SQLITECLOUD_CMD.ROWSET_CHUNK.value
 
@@ -964,17 +1868,16 @@ class Driver:
             rowset.ncols = ncols
             rowset.version = version
             rowset.data = []
-            if ischunk:
-                self._rowset = rowset
             n = self._internal_parse_rowset_header(rowset, buffer, start)
             if n <= 0:
                 raise SQLiteCloudException("Cannot parse rowset header")
         else:
-            rowset = self._rowset
             rowset.nrows += nrows
 
         # parse values
-        self._internal_parse_rowset_values(rowset, buffer, n, nrows * ncols)
+        self._internal_parse_rowset_values(
+            rowset, buffer, n, nrows * ncols, blob_view=blob_view
+        )
 
         return rowset
 
@@ -1065,56 +1968,298 @@ class Driver:
         return start
 
     def _internal_parse_rowset_values(
-        self, rowset: SQLiteCloudResult, buffer: bytes, start: int, bound: int
+        self,
+        rowset: SQLiteCloudResult,
+        buffer: bytes,
+        start: int,
+        bound: int,
+        blob_view: Optional[memoryview] = None,
     ):
         # loop to parse each individual value
         for i in range(bound):
-            sqlitecloud_value = self._internal_parse_value(buffer, start)
+            sqlitecloud_value = self._internal_parse_value(buffer, start, blob_view)
             start += sqlitecloud_value.cellsize
             rowset.data.append(sqlitecloud_value.value)
 
     def _internal_serialize_command(
         self, data: Any, zero_string: bool = False
     ) -> bytes:
+        return b"".join(self._internal_serialize_buffers(data, zero_string))
+
+    def _internal_serialize_buffers(
+        self, data: Any, zero_string: bool = False
+    ) -> List[BytesLike]:
+        """
+        Serialize the data with the SCSP protocol as a list of buffers
+        to be written in order.
+
+        Headers and payloads are kept in separate buffers, BLOB values
+        are referenced and never copied.
+        """
+        buffers = []
+        self._internal_serialize_value(data, buffers, zero_string)
+        return buffers
+
+    def _internal_serialize_value(
+        self, data: Any, buffers: List[BytesLike], zero_string: bool = False
+    ) -> int:
+        """Append the serialized data to the buffers and return its length in bytes."""
         if isinstance(data, str):
             cmd = SQLITECLOUD_CMD.STRING.value
+            data = data.encode()
+            size = len(data)
             if zero_string:
                 cmd = SQLITECLOUD_CMD.ZEROSTRING.value
-                data += "\x00"
+                size += 1
 
-            data = data.encode()
-            header = f"{cmd}{len(data)} ".encode()
+            header = f"{cmd}{size} ".encode()
+            buffers.append(header)
+            buffers.append(data)
+            if zero_string:
+                buffers.append(b"\x00")
 
-            return header + data
+            return len(header) + size
 
         if isinstance(data, int):
-            return f"{SQLITECLOUD_CMD.INT.value}{data} ".encode()
+            return self._internal_append_buffer(
+                buffers, f"{SQLITECLOUD_CMD.INT.value}{data} ".encode()
+            )
 
         if isinstance(data, float):
-            return f"{SQLITECLOUD_CMD.FLOAT.value}{data} ".encode()
+            return self._internal_append_buffer(
+                buffers, f"{SQLITECLOUD_CMD.FLOAT.value}{data} ".encode()
+            )
+
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            size = data.nbytes if isinstance(data, memoryview) else len(data)
+            header = f"{SQLITECLOUD_CMD.BLOB.value}{size} ".encode()
+            buffers.append(header)
+            buffers.append(data)
 
-        if isinstance(data, bytes):
-            header = f"{SQLITECLOUD_CMD.BLOB.value}{len(data)} ".encode()
-            return header + data
+            return len(header) + size
 
         if data is None:
-            return f"{SQLITECLOUD_CMD.NULL.value} ".encode()
+            return self._internal_append_buffer(
+                buffers, f"{SQLITECLOUD_CMD.NULL.value} ".encode()
+            )
 
         if isinstance(data, List):
-            return self._internal_serialize_array(data, zero_string=zero_string)
+            return self._internal_serialize_array(data, buffers, zero_string)
 
         raise SQLiteCloudException(
             f"Unsupported data type for serialization: {type(data)}"
         )
 
-    def _internal_serialize_array(self, data: List, zero_string: bool = False) -> str:
-        n = len(data)
-        serialized_data: bytes = f"{n} ".encode()
-        for i in range(n):
+    def _internal_serialize_array(
+        self, data: List, buffers: List[BytesLike], zero_string: bool = False
+    ) -> int:
+        # the header is known only after the items have been serialized
+        header_index = len(buffers)
+        buffers.append(b"")
+
+        count = f"{len(data)} ".encode()
+        buffers.append(count)
+        size = len(count)
+        for i, item in enumerate(data):
             # the query must be zero-terminated
             zs = i == 0 or zero_string
-            serialized_data += self._internal_serialize_command(data[i], zero_string=zs)
+            size += self._internal_serialize_value(item, buffers, zero_string=zs)
+
+        header = f"{SQLITECLOUD_CMD.ARRAY.value}{size} ".encode()
+        buffers[header_index] = header
+
+        return len(header) + size
+
+    def _internal_serialize_statement(
+        self, encoded_query: bytes, bindings: Tuple[SQLiteDataTypes]
+    ) -> List[BytesLike]:
+        # same as serializing the array [query, *bindings] with zero-terminated strings
+        buffers = [b"", f"{len(bindings) + 1} ".encode(), encoded_query]
+        size = len(buffers[1]) + len(encoded_query)
+        for binding in bindings:
+            size += self._internal_serialize_value(binding, buffers, zero_string=True)
+
+        buffers[0] = f"{SQLITECLOUD_CMD.ARRAY.value}{size} ".encode()
+
+        return buffers
+
+    def _internal_append_buffer(self, buffers: List[BytesLike], buffer: bytes) -> int:
+        buffers.append(buffer)
+        return len(buffer)
+
+
+def _interleave_families(addresses: List[Tuple[int, Any, Node]]) -> List[Tuple]:
+    """Alternate the address families, keeping the order of each one."""
+    families: List[List[Tuple]] = []
+    for address in addresses:
+        for family in families:
+            if family[0][0] == address[0]:
+                family.append(address)
+                break
+        else:
+            families.append([address])
+
+    interleaved = []
+    for i in range(max(len(family) for family in families)):
+        interleaved += [family[i] for family in families if i < len(family)]
+    return interleaved
+
+
+class _UploadChunkTuner:
+    """
+    Size of the uploaded chunks, adjusted so that the chunks in flight cover
+    the bandwidth-delay product of the link.
+    """
+
+    # chunks sizes: min, max
+    MIN_SIZE = SQLITECLOUD_DEFAULT.UPLOAD_SIZE.value // 8
+    MAX_SIZE = SQLITECLOUD_DEFAULT.UPLOAD_SIZE.value * 8
+
+    def __init__(self, chunk_size: Optional[int], window: int) -> None:
+        self.fixed = chunk_size is not None
+        self.chunk_size = chunk_size or SQLITECLOUD_DEFAULT.UPLOAD_SIZE.value
+        self.window = max(window, 1)
+        # shortest time between a chunk and its acknowledgement
+        self.rtt: Optional[float] = None
+        # bytes per second, moving average
+        self.bandwidth: Optional[float] = None
+
+        self._last_ack: Optional[float] = None
+
+    def acknowledged(self, blen: int, sent_at: float) -> None:
+        now = time.monotonic()
+
+        latency = now - sent_at
+        self.rtt = latency if self.rtt is None else min(self.rtt, latency)
+
+        # acknowledgements of pipelined chunks arrive at the pace of the link
+        elapsed = now - max(sent_at, self._last_ack or sent_at)
+        self._last_ack = now
+        if blen == 0 or elapsed <= 0:
+            return
+
+        bandwidth = blen / elapsed
+        self.bandwidth = (
+            bandwidth
+            if self.bandwidth is None
+            else 0.8 * self.bandwidth + 0.2 * bandwidth
+        )
+
+        if not self.fixed:
+            bdp = self.bandwidth * self.rtt
+            self.chunk_size = int(
+                min(max(2 * bdp / self.window, self.MIN_SIZE), self.MAX_SIZE)
+            )
+
+
+class _FrameDecoder:
+    """
+    Split the data received from a socket into the messages of the protocol.
+
+    The data is received into a buffer reused across the reads. After each read
+    all the complete messages are extracted, and the incomplete one is kept at
+    the beginning of the buffer. The size of the reads grows while they fill
+    the buffer and shrinks when the data arrives in small bursts.
+    """
+
+    # sizes of the reads: min, max
+    MIN_RECV_SIZE = 4096
+    MAX_RECV_SIZE = 1024 * 1024
+
+    def __init__(self, recv_size: int = MIN_RECV_SIZE) -> None:
+        self.recv_size = recv_size
+        self._buffer = bytearray(recv_size)
+        # the received data not extracted yet is buffer[start:end]
+        self._start = 0
+        self._end = 0
+        # end of the message at start, once its header is complete
+        self._frame_end: Optional[int] = None
+
+    def recv(self, sock: socket.socket) -> int:
+        """
+        Read the available data from the socket.
 
-        header = f"{SQLITECLOUD_CMD.ARRAY.value}{len(serialized_data)} ".encode()
+        Returns:
+            int: The number of bytes read, 0 if the connection is closed.
+        """
+        size = self.recv_size
+        if self._frame_end is not None:
+            # room for the rest of a large message in a single read
+            size = max(size, self._frame_end - self._end)
+        self._reserve(size)
+
+        with memoryview(self._buffer) as view:
+            nread = sock.recv_into(view[self._end : self._end + size], size)
+        self._end += nread
+
+        if nread >= self.recv_size:
+            self.recv_size = min(self.recv_size * 2, self.MAX_RECV_SIZE)
+        elif nread < self.recv_size // 4:
+            self.recv_size = max(self.recv_size // 2, self.MIN_RECV_SIZE)
+
+        return nread
+
+    def feed(self, data: bytes) -> None:
+        """Add data received in another way."""
+        self._reserve(len(data))
+        self._buffer[self._end : self._end + len(data)] = data
+        self._end += len(data)
+
+    def frames(self) -> List[bytes]:
+        """Extract the complete messages received."""
+        frames = []
+        while True:
+            end = self._next_frame_end()
+            if end is None:
+                break
 
-        return header + serialized_data
+            frames.append(bytes(self._buffer[self._start : end]))
+            self._start = end
+            self._frame_end = None
+
+        if self._start == self._end:
+            self._start = self._end = 0
+            if len(self._buffer) > 2 * self.MAX_RECV_SIZE:
+                # release the memory of a large message
+                self._buffer = bytearray(self.recv_size)
+
+        return frames
+
+    def _next_frame_end(self) -> Optional[int]:
+        if self._frame_end is None:
+            start = self._start
+            # TYPE LEN<space> or TYPE VALUE<space> for numbers and null
+            space = self._buffer.find(b" ", start + 1, self._end)
+            if space < 0:
+                return None
+
+            command_type = chr(self._buffer[start])
+            if command_type in (
+                SQLITECLOUD_CMD.INT.value,
+                SQLITECLOUD_CMD.FLOAT.value,
+                SQLITECLOUD_CMD.NULL.value,
+            ):
+                self._frame_end = space + 1
+            else:
+                self._frame_end = space + 1 + int(self._buffer[start + 1 : space])
+
+        return self._frame_end if self._frame_end <= self._end else None
+
+    def _reserve(self, size: int) -> None:
+        """Make room for `size` bytes after the received data."""
+        if len(self._buffer) - self._end >= size:
+            return
+
+        # move the incomplete message to the beginning
+        pending = self._end - self._start
+        if self._start > 0:
+            self._buffer[:pending] = self._buffer[self._start : self._end]
+            if self._frame_end is not None:
+                self._frame_end -= self._start
+            self._start = 0
+            self._end = pending
+
+        if len(self._buffer) - self._end < size:
+            self._buffer.extend(
+                bytes(max(pending + size, 2 * len(self._buffer)) - len(self._buffer))
+            )
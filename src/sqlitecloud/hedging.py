@@ -0,0 +1,74 @@
+import bisect
+import threading
+from collections import deque
+from typing import Deque, List
+
+from sqlitecloud.sqltokens import normalize_select
+
+
+class HedgingPolicy:
+    """
+    When to send a second copy of a read, to cut the tail latency caused by
+    an occasional slow node or connection, see `SQLiteCloudClient.exec_hedged()`.
+
+    A read still running after the `quantile` of the latencies observed
+    (the p95 by default) is sent again on another connection, and the first
+    response wins. Until `min_samples` latencies have been observed the copy
+    is sent after `initial_delay` seconds.
+
+    Only single SELECT statements are hedged: the other statements may not be
+    idempotent. With the `non_linearizable` option the copy can be served by
+    any node of the cluster, not only by the leader.
+
+    Args:
+        quantile (float): The quantile of the latencies to wait for.
+        window (int): The number of the most recent latencies observed.
+        min_samples (int): The latencies observed before using the quantile.
+        initial_delay (float): Seconds to wait until enough latencies are observed.
+        min_delay (float): The minimum seconds to wait, so that a burst of fast
+            reads does not send a copy of every read.
+    """
+
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        window: int = 1000,
+        min_samples: int = 20,
+        initial_delay: float = 0.05,
+        min_delay: float = 0.001,
+    ) -> None:
+        self.quantile = min(max(quantile, 0.0), 1.0)
+        self.window = max(window, 1)
+        self.min_samples = max(min_samples, 1)
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+
+        # reads sent twice, and the times the copy answered first
+        self.hedged = 0
+        self.wins = 0
+
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque()
+        self._sorted: List[float] = []
+
+    def should_hedge(self, sql: str) -> bool:
+        return normalize_select(sql) is not None
+
+    def delay(self) -> float:
+        """Seconds to wait for the response before sending the copy of a read."""
+        with self._lock:
+            if len(self._sorted) < self.min_samples:
+                return self.initial_delay
+
+            index = int(self.quantile * (len(self._sorted) - 1))
+            return max(self._sorted[index], self.min_delay)
+
+    def observe(self, latency: float) -> None:
+        """Record the latency of a read that has been answered."""
+        with self._lock:
+            self._latencies.append(latency)
+            bisect.insort(self._sorted, latency)
+
+            if len(self._latencies) > self.window:
+                oldest = self._latencies.popleft()
+                del self._sorted[bisect.bisect_left(self._sorted, oldest)]
@@ -0,0 +1,153 @@
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+Node = Tuple[str, int]
+
+
+class _NodeStats:
+    __slots__ = ("latency", "request_latency", "ejected_until", "failures")
+
+    def __init__(self) -> None:
+        # moving average of the connection times, None until one is observed
+        self.latency: Optional[float] = None
+        # moving average of the request times, None until one is observed
+        self.request_latency: Optional[float] = None
+        self.ejected_until = 0.0
+        self.failures = 0
+
+
+class NodeSelector:
+    """
+    Order the nodes of a cluster to connect to, preferring the fastest ones.
+
+    The time to connect to each node, and the time of the requests sent to it,
+    are tracked as exponentially weighted moving averages (EWMA) with weight
+    `alpha` for the last one. The nodes are drawn at random with a probability
+    inversely proportional to the sum of their two averages, so that the slower
+    nodes still get a share of the connections and their averages are kept
+    updated. An average not observed yet for a node is taken as the lowest
+    of the other nodes: the nodes never connected to get the probability
+    of the fastest one.
+
+    A node that cannot be connected to is ejected for `cooldown` seconds,
+    doubled by each consecutive failure up to `max_cooldown`: it is tried
+    only after the other nodes.
+    """
+
+    def __init__(
+        self,
+        alpha: float = 0.3,
+        cooldown: float = 5.0,
+        max_cooldown: float = 300.0,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        self.alpha = alpha
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._stats: Dict[Node, _NodeStats] = {}
+
+    def latency(self, node: Node) -> Optional[float]:
+        """The average seconds to connect to the node, None if not known."""
+        stats = self._stats.get(node)
+        return stats.latency if stats else None
+
+    def request_latency(self, node: Node) -> Optional[float]:
+        """The average seconds of the requests to the node, None if not known."""
+        stats = self._stats.get(node)
+        return stats.request_latency if stats else None
+
+    def is_ejected(self, node: Node) -> bool:
+        stats = self._stats.get(node)
+        return stats is not None and stats.ejected_until > time.monotonic()
+
+    def order(self, nodes: List[Node]) -> List[Node]:
+        """The nodes in the order to try them."""
+        now = time.monotonic()
+
+        with self._lock:
+            stats = [self._stats.get(node) or _NodeStats() for node in nodes]
+            alive = [
+                (node, s) for node, s in zip(nodes, stats) if s.ejected_until <= now
+            ]
+            ejected = sorted(
+                (s.ejected_until, i)
+                for i, s in enumerate(stats)
+                if s.ejected_until > now
+            )
+
+            known = [s.latency for _, s in alive if s.latency is not None]
+            default = min(known) if known else 1.0
+            known = [s.request_latency for _, s in alive if s.request_latency]
+            request_default = min(known) if known else 0.0
+            weights = [
+                1
+                / max(
+                    (s.latency or default) + (s.request_latency or request_default),
+                    1e-6,
+                )
+                for _, s in alive
+            ]
+
+            ordered = []
+            while alive:
+                # weighted draw without replacement
+                point = self._rng.random() * sum(weights)
+                index = 0
+                while index < len(weights) - 1 and point >= weights[index]:
+                    point -= weights[index]
+                    index += 1
+                ordered.append(alive.pop(index)[0])
+                weights.pop(index)
+
+        return ordered + [nodes[i] for _, i in ejected]
+
+    def observe(self, node: Node, latency: float) -> None:
+        """Record the time taken to connect to the node."""
+        with self._lock:
+            stats = self._stats.setdefault(node, _NodeStats())
+            if stats.latency is None:
+                stats.latency = latency
+            else:
+                stats.latency += self.alpha * (latency - stats.latency)
+            stats.ejected_until = 0.0
+            stats.failures = 0
+
+    def observe_request(self, node: Node, latency: float) -> None:
+        """Record the time taken by a request to the node, until its response."""
+        with self._lock:
+            stats = self._stats.setdefault(node, _NodeStats())
+            if stats.request_latency is None:
+                stats.request_latency = latency
+            else:
+                stats.request_latency += self.alpha * (latency - stats.request_latency)
+
+    def eject(self, node: Node) -> None:
+        """Try the node after the others for a while, it cannot be connected to."""
+        with self._lock:
+            stats = self._stats.setdefault(node, _NodeStats())
+            cooldown = min(self.cooldown * 2**stats.failures, self.max_cooldown)
+            stats.ejected_until = time.monotonic() + cooldown
+            stats.failures += 1
+
+
+_selector = NodeSelector()
+
+
+def get_node_selector() -> NodeSelector:
+    """The selector shared by the connections of the process."""
+    return _selector
+
+
+def _reinit_after_fork() -> None:
+    # the lock may have been held by a thread of the parent process
+    _selector._lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reinit_after_fork)
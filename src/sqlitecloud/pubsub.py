@@ -1,8 +1,33 @@
-from typing import Callable, Optional
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
+from sqlitecloud.blob import _quote_identifier
 from sqlitecloud.datatypes import SQLITECLOUD_PUBSUB_SUBJECT, SQLiteCloudConnect
+from sqlitecloud.dispatcher import _is_table_change
 from sqlitecloud.driver import Driver
-from sqlitecloud.resultset import SQLiteCloudResultSet
+from sqlitecloud.exceptions import SQLiteCloudException
+from sqlitecloud.reactor import get_pubsub_reactor
+from sqlitecloud.resultset import (
+    SQLITECLOUD_RESULT_TYPE,
+    SQLiteCloudResult,
+    SQLiteCloudResultSet,
+)
+
+# prefix of the previous values of the primary key in the rows of UPDATE notifications
+PREVIOUS_PK_PREFIX = "sqlite_pk_"
+
+# notifications written at once by notify_many()
+NOTIFY_BATCH_SIZE = 1000
+
+PubSubCallback = Callable[
+    [SQLiteCloudConnect, Optional[SQLiteCloudResultSet], Optional[Any]], None
+]
 
 
 class SQLiteCloudPubSub:
@@ -14,17 +39,61 @@ class SQLiteCloudPubSub:
         connection: SQLiteCloudConnect,
         subject_type: SQLITECLOUD_PUBSUB_SUBJECT,
         subject_name: str,
-        callback: Callable[
-            [SQLiteCloudConnect, Optional[SQLiteCloudResultSet], Optional[any]], None
-        ],
+        callback: PubSubCallback,
         data: Optional[any] = None,
+        coalesce_window: Optional[float] = None,
+        coalesce_max: int = 1000,
     ) -> None:
+        """
+        Listen to a channel or a table, calling `callback` with each notification.
+
+        The changes of a table can be coalesced: when `coalesce_window` is set,
+        the notifications received within that many seconds, or up to
+        `coalesce_max` of them, are delivered as a single notification
+        summarizing the changes, eg:
+
+            {
+                "channel": "orders",
+                "pk": ["id"],
+                "keys": [[1], [2]],
+                "types": ["DELETE", "UPDATE"],
+                "count": 3
+            }
+
+        where `keys` are the primary keys changed, without duplicates,
+        and `count` is the number of notifications coalesced.
+        """
         subject = "TABLE " if subject_type.value == "TABLE" else ""
 
+        if coalesce_window is not None:
+            callback = _TableCoalescer(callback, coalesce_window, coalesce_max)
+
         connection.pubsub_callback = callback
         connection.pubsub_data = data
 
-        self._driver.execute(f"LISTEN {subject}{subject_name};", connection)
+        command = f"LISTEN {subject}{subject_name};"
+        self._driver.execute(command, connection)
+        connection.pubsub_listening.add(command)
+
+    def subscribe(
+        self,
+        connection: SQLiteCloudConnect,
+        subject_type: SQLITECLOUD_PUBSUB_SUBJECT,
+        subject_name: str,
+    ) -> "PubSubSubscription":
+        """
+        Listen to a channel or a table from asyncio, eg:
+
+            async with pubsub.subscribe(connection, TABLE, "orders") as events:
+                async for event in events:
+                    ...
+
+        The PubSub socket of the connection is read by the running event loop,
+        so the notifications are received in the loop, in order, without
+        passing through another thread. Like `listen()`, a connection
+        delivers its notifications to a single subscription.
+        """
+        return PubSubSubscription(self, connection, subject_type, subject_name)
 
     def unlisten(
         self,
@@ -35,6 +104,7 @@ class SQLiteCloudPubSub:
         subject = "TABLE " if subject_type.value == "TABLE" else ""
 
         self._driver.execute(f"UNLISTEN {subject}{subject_name};", connection)
+        connection.pubsub_listening.discard(f"LISTEN {subject}{subject_name};")
 
         connection.pubsub_callback = None
         connection.pubsub_data = None
@@ -50,7 +120,46 @@ class SQLiteCloudPubSub:
     def notify_channel(
         self, connection: SQLiteCloudConnect, name: str, data: str
     ) -> None:
-        self._driver.execute(f"NOTIFY {name} '{data}';", connection)
+        self._driver.execute(_notify_command(name, data), connection)
+
+    def notify_many(
+        self,
+        connection: SQLiteCloudConnect,
+        name: str,
+        payloads: Iterable[str],
+        batch_size: int = NOTIFY_BATCH_SIZE,
+    ) -> int:
+        """
+        Send many notifications to a channel, writing up to `batch_size`
+        of them at once and then reading their responses, instead of
+        waiting a round trip for each one.
+
+        Returns:
+            int: The number of notifications sent.
+
+        Raises:
+            SQLiteCloudError: The first error returned by the server, after
+                all the notifications of the batch have been sent.
+        """
+        return self._notify_batch(
+            connection, [(name, payload) for payload in payloads], batch_size
+        )
+
+    def _notify_batch(
+        self,
+        connection: SQLiteCloudConnect,
+        notifications: List[Tuple[str, str]],
+        batch_size: int = NOTIFY_BATCH_SIZE,
+    ) -> int:
+        batch_size = max(batch_size, 1)
+        for i in range(0, len(notifications), batch_size):
+            commands = [
+                self._driver._internal_serialize_command(_notify_command(name, data))
+                for name, data in notifications[i : i + batch_size]
+            ]
+            self._driver._internal_run_pipeline(connection, commands)
+
+        return len(notifications)
 
     def set_pubsub_only(self, connection: SQLiteCloudConnect) -> None:
         """
@@ -69,3 +178,518 @@ class SQLiteCloudPubSub:
         return SQLiteCloudResultSet(
             self._driver.execute("LIST PUBSUB CONNECTIONS;", connection)
         )
+
+
+class PubSubSubscription:
+    """
+    Asynchronous iterator over the notifications of a channel or a table,
+    see `SQLiteCloudPubSub.subscribe()`.
+
+    The iteration ends when the subscription or the PubSub connection is closed.
+    """
+
+    def __init__(
+        self,
+        pubsub: SQLiteCloudPubSub,
+        connection: SQLiteCloudConnect,
+        subject_type: SQLITECLOUD_PUBSUB_SUBJECT,
+        subject_name: str,
+    ) -> None:
+        self.connection = connection
+        self.subject_type = subject_type
+        self.subject_name = subject_name
+
+        self._pubsub = pubsub
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional["asyncio.Queue[Optional[SQLiteCloudResultSet]]"] = None
+        self._closed = False
+
+    def __aiter__(self) -> "PubSubSubscription":
+        return self
+
+    async def __anext__(self) -> SQLiteCloudResultSet:
+        if self._queue is None:
+            await self.start()
+
+        result = await self._queue.get()
+        if result is None:
+            self._queue.put_nowait(None)
+            raise StopAsyncIteration
+
+        return result
+
+    async def __aenter__(self) -> "PubSubSubscription":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.aclose()
+
+    async def start(self) -> None:
+        """Send the LISTEN command, called by the first iteration."""
+        if self._queue is not None:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        if self.connection.pubsub_socket is None:
+            self.connection.pubsub_reactor = _EventLoopReactor(self._loop)
+
+        # the commands are sent on the blocking socket of the connection
+        await self._loop.run_in_executor(
+            None,
+            self._pubsub.listen,
+            self.connection,
+            self.subject_type,
+            self.subject_name,
+            self._on_notification,
+        )
+
+    async def aclose(self) -> None:
+        """Stop listening and end the iteration."""
+        if self._queue is None or self._closed:
+            return
+
+        self._closed = True
+        try:
+            if self.connection.socket is not None:
+                await self._loop.run_in_executor(
+                    None,
+                    self._pubsub.unlisten,
+                    self.connection,
+                    self.subject_type,
+                    self.subject_name,
+                )
+        finally:
+            self._queue.put_nowait(None)
+
+    def _on_notification(
+        self,
+        connection: SQLiteCloudConnect,
+        result: Optional[SQLiteCloudResultSet],
+        data: Optional[Any],
+    ) -> None:
+        if _running_loop() is self._loop:
+            self._queue.put_nowait(result)
+        else:
+            # the PubSub socket was already read by another thread
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, result)
+
+
+class _EventLoopReactor:
+    """
+    Read the PubSub socket of the connections from an asyncio event loop,
+    in place of the shared reactor thread.
+    """
+
+    thread = None
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        # file descriptor and closing callback of the connections
+        self._registrations: Dict[int, Tuple[int, Callable[[], None]]] = {}
+
+    def register(
+        self,
+        connection: SQLiteCloudConnect,
+        on_readable: Callable[[], bool],
+        on_closed: Callable[[], None],
+    ) -> None:
+        sock = connection.pubsub_socket
+        sock.setblocking(False)
+        fd = sock.fileno()
+        self._registrations[id(connection)] = (fd, on_closed)
+
+        def readable() -> None:
+            try:
+                alive = on_readable()
+            except Exception as e:
+                logging.error(f"An error occurred while parsing data: {e}.")
+                alive = False
+
+            if not alive:
+                self.unregister(connection)
+
+        self._call_in_loop(self.loop.add_reader, fd, readable)
+
+    def unregister(self, connection: SQLiteCloudConnect) -> bool:
+        registration = self._registrations.pop(id(connection), None)
+        if registration is None:
+            return False
+
+        fd, on_closed = registration
+        self._call_in_loop(self.loop.remove_reader, fd)
+        self._call_in_loop(on_closed)
+        return True
+
+    def call_soon(
+        self, connection: SQLiteCloudConnect, callback: Callable[..., Any], *args: Any
+    ) -> None:
+        # the callbacks run in the event loop
+        self._call_in_loop(callback, *args)
+
+    def _call_in_loop(self, callback: Callable[..., Any], *args: Any) -> None:
+        if _running_loop() is self.loop:
+            callback(*args)
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(callback, *args)
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    """The event loop running in the current thread, if any."""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class _TableCoalescer:
+    """
+    Merge the notifications of the changes of a table into a summary,
+    delivered when the window expires or the batch is full.
+    """
+
+    def __init__(self, callback: PubSubCallback, window: float, maxsize: int) -> None:
+        self.callback = callback
+        self.window = window
+        self.maxsize = max(maxsize, 1)
+
+        self._lock = threading.Lock()
+        # keeps the summaries in order when delivered by the timer and the reader
+        self._deliver_lock = threading.Lock()
+        self._pending: Dict[str, "_TableSummary"] = {}
+
+    def __call__(
+        self,
+        connection: SQLiteCloudConnect,
+        result: Optional[SQLiteCloudResultSet],
+        data: Optional[Any],
+    ) -> None:
+        content = result.get_result() if result is not None else None
+        if not _is_table_change(content):
+            # deliver the changes before the closing or another message
+            with self._deliver_lock:
+                self._flush_all()
+                self.callback(connection, result, data)
+            return
+
+        channel = content["channel"]
+        with self._lock:
+            summary = self._pending.get(channel)
+            if summary is None:
+                summary = self._pending[channel] = _TableSummary(
+                    connection, data, content
+                )
+                summary.timer = _get_timers().schedule(
+                    self.window, self._expire, summary
+                )
+
+            summary.add(content)
+            full = summary.count >= self.maxsize
+
+        if full:
+            summary.timer.cancel()
+            self._flush(summary)
+
+    def _expire(self, summary: "_TableSummary") -> None:
+        # the timer thread only schedules: the summary is delivered along
+        # with the other callbacks of the connection
+        connection = summary.connection
+        reactor = connection.pubsub_reactor or get_pubsub_reactor()
+        reactor.call_soon(connection, self._flush, summary)
+
+    def _flush(self, summary: "_TableSummary") -> None:
+        with self._deliver_lock:
+            with self._lock:
+                if self._pending.get(summary.channel) is not summary:
+                    # already delivered
+                    return
+                del self._pending[summary.channel]
+
+            self._deliver(summary)
+
+    def _flush_all(self) -> None:
+        with self._lock:
+            summaries, self._pending = list(self._pending.values()), {}
+
+        for summary in summaries:
+            summary.timer.cancel()
+            self._deliver(summary)
+
+    def _deliver(self, summary: "_TableSummary") -> None:
+        try:
+            self.callback(
+                summary.connection,
+                SQLiteCloudResultSet(
+                    SQLiteCloudResult(
+                        SQLITECLOUD_RESULT_TYPE.RESULT_JSON, summary.content()
+                    )
+                ),
+                summary.data,
+            )
+        except Exception as e:
+            logging.error(f"An error occurred in the PubSub callback: {e}.")
+
+
+class _TableSummary:
+    def __init__(
+        self, connection: SQLiteCloudConnect, data: Optional[Any], content: Dict
+    ) -> None:
+        self.connection = connection
+        self.data = data
+        self.channel: str = content["channel"]
+        self.pk: List[str] = content.get("pk") or []
+        self.count = 0
+        self.timer: Optional[_Timer] = None
+
+        # primary keys in order of first change
+        self._keys: Dict[Tuple[Any, ...], None] = {}
+        self._types: Dict[str, None] = {}
+
+    def add(self, content: Dict) -> None:
+        self.count += 1
+        for row in content["payload"]:
+            if not isinstance(row, dict):
+                continue
+            self._types[row.get("type")] = None
+            key = tuple(row.get(name) for name in self.pk)
+            self._keys[key] = None
+            # the primary key before an UPDATE changing it
+            previous = tuple(
+                row.get(PREVIOUS_PK_PREFIX + name, row.get(name)) for name in self.pk
+            )
+            self._keys[previous] = None
+
+    def content(self) -> Dict[str, Any]:
+        return {
+            "channel": self.channel,
+            "pk": self.pk,
+            "keys": [list(key) for key in self._keys],
+            "types": sorted(t for t in self._types if t is not None),
+            "count": self.count,
+        }
+
+
+class _Timer:
+    __slots__ = ("callback", "args", "cancelled")
+
+    def __init__(self, callback: Callable[..., None], args: Tuple[Any, ...]) -> None:
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class _Timers:
+    """
+    Single thread running the callbacks when their delay expires, in place
+    of a thread for each `threading.Timer`.
+    """
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition(threading.Lock())
+        # expiration, order of scheduling and timer
+        self._heap: List[Tuple[float, int, _Timer]] = []
+        self._seq = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(
+        self, delay: float, callback: Callable[..., None], *args: Any
+    ) -> _Timer:
+        timer = _Timer(callback, args)
+
+        with self._condition:
+            heapq.heappush(
+                self._heap, (time.monotonic() + delay, next(self._seq), timer)
+            )
+            self._condition.notify()
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="sqlitecloud-timers", daemon=True
+                )
+                self._thread.start()
+
+        return timer
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    while self._heap and self._heap[0][2].cancelled:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+
+                    timeout = self._heap[0][0] - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    self._condition.wait(timeout)
+
+                _, _, timer = heapq.heappop(self._heap)
+
+            try:
+                timer.callback(*timer.args)
+            except Exception as e:
+                logging.error(f"An error occurred in a PubSub timer: {e}.")
+
+
+_timers = _Timers()
+_timers_pid = os.getpid()
+
+
+def _get_timers() -> _Timers:
+    """The timers shared by the process."""
+    global _timers, _timers_pid
+
+    if _timers_pid != os.getpid():
+        # inherited from the parent process: the thread is not running
+        _timers, _timers_pid = _Timers(), os.getpid()
+    return _timers
+
+
+class PubSubPublisher:
+    """
+    Publish notifications from a background thread, sending together
+    the notifications queued within `flush_interval` seconds,
+    up to `max_batch` of them.
+
+    The connection is used only by the publisher thread: reserve it
+    to the publisher. An error sending a batch is raised by the next call
+    to `publish()`, `flush()` or `close()`.
+
+    Args:
+        connection (SQLiteCloudConnect): The connection to send the notifications.
+        flush_interval (float): Seconds to wait for more notifications
+            before sending a batch.
+        max_batch (int): The maximum number of notifications sent at once.
+    """
+
+    def __init__(
+        self,
+        connection: SQLiteCloudConnect,
+        flush_interval: float = 0.01,
+        max_batch: int = NOTIFY_BATCH_SIZE,
+    ) -> None:
+        self.connection = connection
+        self.flush_interval = flush_interval
+        self.max_batch = max(max_batch, 1)
+        # number of notifications sent and of batches
+        self.sent = 0
+        self.batches = 0
+
+        self._pubsub = SQLiteCloudPubSub()
+        self._condition = threading.Condition()
+        self._pending: List[Tuple[str, str]] = []
+        # number of notifications queued, and of those sent or failed
+        self._queued = 0
+        self._done = 0
+        self._flushing = False
+        self._closed = False
+        self._error: Optional[Exception] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, name: str, data: str) -> None:
+        """Queue a notification to the channel."""
+        with self._condition:
+            self._raise_error()
+            if self._closed:
+                raise SQLiteCloudException("The publisher is closed.")
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="sqlitecloud-publisher", daemon=True
+                )
+                self._thread.start()
+
+            self._pending.append((name, data))
+            self._queued += 1
+            if len(self._pending) >= self.max_batch:
+                self._condition.notify_all()
+
+    def flush(self) -> None:
+        """Send the notifications queued and wait for their responses."""
+        with self._condition:
+            target = self._queued
+            self._flushing = True
+            self._condition.notify_all()
+            while self._done < target and self._thread is not None:
+                self._condition.wait()
+            self._flushing = False
+            self._raise_error()
+
+    def close(self) -> None:
+        """Send the notifications queued and stop the thread."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+            thread = self._thread
+
+        if thread is not None:
+            thread.join()
+
+        with self._condition:
+            self._raise_error()
+
+    def __enter__(self) -> "PubSubPublisher":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._pending and not self._closed:
+                    self._condition.wait()
+                # give time to more notifications to join the batch
+                deadline = time.monotonic() + self.flush_interval
+                while (
+                    len(self._pending) < self.max_batch
+                    and not self._flushing
+                    and not self._closed
+                ):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                batch = self._pending[: self.max_batch]
+                del self._pending[: self.max_batch]
+                if not batch and self._closed:
+                    self._thread = None
+                    self._condition.notify_all()
+                    return
+
+            error = None
+            if batch:
+                try:
+                    self._pubsub._notify_batch(self.connection, batch, len(batch))
+                except Exception as e:
+                    error = e
+
+            with self._condition:
+                self._done += len(batch)
+                if error is None:
+                    self.sent += len(batch)
+                    self.batches += 1
+                else:
+                    self._error = self._error or error
+                self._condition.notify_all()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+
+def _notify_command(name: str, data: str) -> str:
+    # the channel is a quoted identifier and the payload a string literal,
+    # not to end the command within a batch
+    payload = data.replace("'", "''")
+    return f"NOTIFY {_quote_identifier(name)} '{payload}';"
@@ -0,0 +1,345 @@
+import logging
+import os
+import selectors
+import socket
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from sqlitecloud.datatypes import SQLITECLOUD_PUBSUB_OVERFLOW, SQLiteCloudConnect
+from sqlitecloud.dispatcher import PubSubDispatcher
+
+
+class _Registration:
+    def __init__(
+        self,
+        connection: SQLiteCloudConnect,
+        on_readable: Callable[[], bool],
+        on_closed: Callable[[], None],
+    ) -> None:
+        self.connection = connection
+        self.sock = connection.pubsub_socket
+        self.on_readable = on_readable
+        self.on_closed = on_closed
+
+        # callbacks of the connection submitted and not run yet
+        self.pending = 0
+        # the socket is not waited on until the callbacks are run
+        self.paused = False
+
+
+class PubSubReactor:
+    """
+    Single thread waiting on the PubSub sockets of all the connections.
+
+    When a socket is readable, its `on_readable` callback reads the
+    available data and returns False if the connection has been closed.
+    `on_closed` is called once when the connection is closed or unregistered.
+
+    The callbacks of the users are passed to `call_soon()` and run by the
+    workers of a `PubSubDispatcher`, up to `max_workers`: a slow callback
+    delays only the notifications of its connection. The callbacks of
+    a connection run one at a time, in order. When more than `max_pending`
+    are waiting, its socket is not read until half of them have run.
+    A `PubSubDispatcher` used as callback queues the notifications itself.
+    """
+
+    def __init__(self, max_workers: int = 16, max_pending: int = 1024) -> None:
+        self.max_workers = max(max_workers, 1)
+        self.max_pending = max(max_pending, 1)
+
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._registrations: Dict[int, _Registration] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        # runs the callbacks, created when needed
+        self._dispatcher: Optional[PubSubDispatcher] = None
+        # the callbacks waiting to run
+        self._calls_lock = threading.Condition(threading.Lock())
+        self._in_callback = threading.local()
+
+        # written to interrupt the wait on the sockets
+        self._wakeup_reader, self._wakeup_writer = socket.socketpair()
+        self._wakeup_reader.setblocking(False)
+        self._selector.register(self._wakeup_reader, selectors.EVENT_READ)
+
+        # number of times the sockets have been readable
+        self.reads = 0
+        # the process of the thread
+        self.pid = os.getpid()
+
+    @property
+    def thread(self) -> Optional[threading.Thread]:
+        return self._thread
+
+    @property
+    def threads(self) -> int:
+        """The number of running threads of the reactor, including the workers."""
+        running = 1 if self._thread is not None and self._thread.is_alive() else 0
+        dispatcher = self._dispatcher
+        return running + (dispatcher.threads if dispatcher is not None else 0)
+
+    @property
+    def connections(self) -> int:
+        """The number of PubSub connections registered."""
+        return len(self._registrations)
+
+    def register(
+        self,
+        connection: SQLiteCloudConnect,
+        on_readable: Callable[[], bool],
+        on_closed: Callable[[], None],
+    ) -> None:
+        """Wait for the data of the PubSub socket of the connection."""
+        registration = _Registration(connection, on_readable, on_closed)
+
+        with self._lock:
+            if self._stopping:
+                raise RuntimeError("The PubSub reactor has been shut down.")
+
+            self._registrations[id(connection)] = registration
+            self._selector.register(
+                registration.sock, selectors.EVENT_READ, registration
+            )
+
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="sqlitecloud-pubsub", daemon=True
+                )
+                self._thread.start()
+
+        self._wakeup()
+
+    def unregister(self, connection: SQLiteCloudConnect) -> bool:
+        """
+        Stop waiting for the data of the connection, before closing its socket.
+
+        Returns:
+            bool: True if the connection was registered.
+        """
+        registration = self._registrations.get(id(connection))
+        if registration is None:
+            return False
+
+        removed = self._remove(registration)
+
+        # the callbacks of the connection, and `on_closed`, have run when
+        # it returns, unless called by one of them
+        if not getattr(self._in_callback, "value", False):
+            with self._calls_lock:
+                while registration.pending:
+                    self._calls_lock.wait()
+
+        return removed
+
+    def call_soon(
+        self, connection: SQLiteCloudConnect, callback: Callable[..., Any], *args: Any
+    ) -> None:
+        """Run the callback in a worker, after the previous ones of the connection."""
+        if (
+            isinstance(callback, PubSubDispatcher)
+            and callback.overflow != SQLITECLOUD_PUBSUB_OVERFLOW.BLOCK
+        ):
+            # it only queues the notification for its own workers
+            callback(*args)
+            return
+
+        registration = self._registrations.get(id(connection))
+        if registration is None:
+            # not registered anymore, eg closing
+            callback(*args)
+            return
+
+        self._submit(registration, callback, args)
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Unregister all the connections and stop the threads."""
+        with self._lock:
+            self._stopping = True
+            registrations = list(self._registrations.values())
+
+        for registration in registrations:
+            self._remove(registration)
+
+        self._wakeup()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+        # the workers stop when all the callbacks have run
+        with self._calls_lock:
+            dispatcher, self._dispatcher = self._dispatcher, None
+        if dispatcher is not None:
+            dispatcher.close(timeout)
+
+        with self._lock:
+            self._stopping = False
+
+    def _remove(self, registration: _Registration) -> bool:
+        with self._lock:
+            if self._registrations.get(id(registration.connection)) is not registration:
+                return False
+
+            del self._registrations[id(registration.connection)]
+            try:
+                self._selector.unregister(registration.sock)
+            except (KeyError, ValueError):
+                # the socket was already closed
+                pass
+
+        self._wakeup()
+
+        # after the callbacks of the notifications already read
+        self._submit(registration, registration.on_closed, ())
+
+        return True
+
+    def _submit(
+        self, registration: _Registration, callback: Callable[..., Any], args: tuple
+    ) -> None:
+        with self._calls_lock:
+            if self._dispatcher is None:
+                self._dispatcher = PubSubDispatcher(workers=self.max_workers)
+            dispatcher = self._dispatcher
+
+            registration.pending += 1
+            if registration.pending > self.max_pending and not registration.paused:
+                # along with the flag, not to race with `_resume()`
+                registration.paused = True
+                with self._lock:
+                    try:
+                        self._selector.unregister(registration.sock)
+                    except (KeyError, ValueError):
+                        pass
+
+            # keyed by the registration: run in order, one at a time
+            submitted = dispatcher.submit(
+                registration, self._run_call, registration, callback, args
+            )
+
+        if not submitted:
+            # shut down meanwhile
+            self._run_call(registration, callback, args)
+
+    def _run_call(
+        self, registration: _Registration, callback: Callable[..., Any], args: tuple
+    ) -> None:
+        self._in_callback.value = True
+        try:
+            callback(*args)
+        except Exception as e:
+            logging.error(f"An error occurred in the PubSub callback: {e}.")
+        finally:
+            self._in_callback.value = False
+
+        with self._calls_lock:
+            registration.pending -= 1
+            # `unregister()` when the last has run
+            self._calls_lock.notify_all()
+
+            if registration.paused and registration.pending <= self.max_pending // 2:
+                self._resume(registration)
+
+    def _resume(self, registration: _Registration) -> None:
+        # with `_calls_lock` held
+        registration.paused = False
+        with self._lock:
+            if self._registrations.get(id(registration.connection)) is not registration:
+                return
+            try:
+                self._selector.register(
+                    registration.sock, selectors.EVENT_READ, registration
+                )
+            except (KeyError, ValueError):
+                # the socket was already closed
+                return
+
+        self._wakeup()
+
+    def _wakeup(self) -> None:
+        try:
+            self._wakeup_writer.send(b"\0")
+        except OSError:
+            # the buffer is full: the reactor is already going to wake up
+            pass
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if self._stopping:
+                    return
+
+            try:
+                events = self._selector.select()
+            except (OSError, ValueError) as e:
+                # a socket has been closed before being unregistered
+                logging.debug(f"PubSub reactor: {e}")
+                self._discard_closed()
+                continue
+
+            for key, _ in events:
+                if key.fileobj is self._wakeup_reader:
+                    try:
+                        while self._wakeup_reader.recv(4096):
+                            pass
+                    except OSError:
+                        pass
+                    continue
+
+                registration: _Registration = key.data
+                if self._registrations.get(id(registration.connection)) is not (
+                    registration
+                ):
+                    # unregistered while waiting
+                    continue
+                if registration.connection.pubsub_socket is not registration.sock:
+                    self._remove(registration)
+                    continue
+
+                self.reads += 1
+                try:
+                    alive = registration.on_readable()
+                except Exception as e:
+                    logging.error(f"An error occurred while parsing data: {e}.")
+                    alive = False
+
+                if not alive:
+                    self._remove(registration)
+
+    def _discard_closed(self) -> None:
+        with self._lock:
+            registrations = list(self._registrations.values())
+
+        for registration in registrations:
+            if registration.sock.fileno() < 0:
+                self._remove(registration)
+
+
+_reactor: Optional[PubSubReactor] = None
+_reactor_lock = threading.Lock()
+
+
+def get_pubsub_reactor(create: bool = True) -> Optional[PubSubReactor]:
+    """The reactor shared by the PubSub connections of the process."""
+    global _reactor
+
+    with _reactor_lock:
+        if _reactor is not None and _reactor.pid != os.getpid():
+            # inherited from the parent process: the thread is not running in
+            # this process and the selector is shared with the parent
+            _reactor = None
+
+        if _reactor is None and create:
+            _reactor = PubSubReactor()
+
+        return _reactor
+
+
+def _reinit_after_fork() -> None:
+    global _reactor_lock
+    # the lock may have been held by a thread of the parent process
+    _reactor_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reinit_after_fork)
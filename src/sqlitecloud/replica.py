@@ -0,0 +1,303 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlitecloud.blob import _quote_identifier
+from sqlitecloud.datatypes import SQLITECLOUD_PUBSUB_SUBJECT, SQLiteCloudConnect
+from sqlitecloud.download import download_db_to_sqlite3, xCallback
+from sqlitecloud.driver import Driver
+from sqlitecloud.pubsub import PREVIOUS_PK_PREFIX, SQLiteCloudPubSub
+from sqlitecloud.resultset import SQLiteCloudResultSet
+
+
+class LocalReplica:
+    """
+    Read-only copy of a SQLite Cloud database in a local SQLite database,
+    to run the queries on data that rarely changes without network round trips.
+
+    The database is downloaded with `sync()`. To keep the replica up to date,
+    pass a `pubsub_connection` to the same database: the replica listens
+    to the changes of its tables and applies the rows of the notifications.
+    When a change cannot be applied, or the PubSub connection is lost,
+    the database is downloaded again before the next query.
+
+    Args:
+        connection (SQLiteCloudConnect): The connection used to download the database.
+        dbname (str): The name of the database to download.
+        filename (str): The local database file, `:memory:` by default.
+        tables (Optional[Iterable[str]]): The tables to keep up to date,
+            all the tables of the database by default.
+        pubsub_connection (Optional[SQLiteCloudConnect]): A connection reserved
+            to the replica to receive the changes of the tables.
+        max_age (Optional[float]): Seconds after which the database is downloaded
+            again, even if no change has been missed.
+    """
+
+    def __init__(
+        self,
+        connection: SQLiteCloudConnect,
+        dbname: str,
+        filename: str = ":memory:",
+        tables: Optional[Iterable[str]] = None,
+        pubsub_connection: Optional[SQLiteCloudConnect] = None,
+        max_age: Optional[float] = None,
+    ) -> None:
+        self.dbname = dbname
+        self.filename = filename
+        self.max_age = max_age
+        # number of downloads and of applied changes
+        self.syncs = 0
+        self.changes = 0
+
+        self._driver = Driver()
+        self._pubsub = SQLiteCloudPubSub()
+        self._connection = connection
+        self._pubsub_connection = pubsub_connection
+        self._tables = set(tables) if tables is not None else None
+
+        self._lock = threading.RLock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._synced_at = 0.0
+        self._listening = False
+        # the replica must be downloaded again
+        self._stale = True
+        # notifications received while downloading, applied after it
+        self._pending: Optional[List[Dict[str, Any]]] = None
+
+    @property
+    def stale(self) -> bool:
+        return self._stale
+
+    def sync(self) -> None:
+        """
+        Download the database, replacing the local copy.
+
+        Raises:
+            SQLiteCloudException: If an error occurs while downloading the database.
+        """
+        with self._lock:
+            self._pending = []
+            self._stale = False
+
+        try:
+            # listen before downloading, so that no change is lost
+            self._listen()
+            if self.filename == ":memory:":
+                db = self._download_in_memory()
+            else:
+                tmpname = self._download_to_file()
+        except BaseException:
+            with self._lock:
+                self._pending = None
+                self._stale = True
+            raise
+
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+            if self.filename != ":memory:":
+                os.replace(tmpname, self.filename)
+                db = self._open(self.filename)
+            self._db = db
+            self._synced_at = time.monotonic()
+            self.syncs += 1
+
+            pending, self._pending = self._pending, None
+            for content in pending:
+                self._apply(content)
+
+    def execute(
+        self, sql: str, parameters: Union[Tuple[Any, ...], Dict[str, Any]] = ()
+    ) -> List[Tuple[Any, ...]]:
+        """
+        Run a read-only query on the local database, downloading it first
+        when it is missing or stale.
+
+        Returns:
+            List[Tuple[Any, ...]]: The rows of the result.
+
+        Raises:
+            sqlite3.Error: If the query fails or tries to modify the database.
+        """
+        if self._needs_sync():
+            self.sync()
+
+        with self._lock:
+            return self._db.execute(sql, parameters).fetchall()
+
+    def close(self) -> None:
+        if self._listening and self._pubsub_connection is not None:
+            for table in self._listened_tables():
+                self._pubsub.unlisten(
+                    self._pubsub_connection, SQLITECLOUD_PUBSUB_SUBJECT.TABLE, table
+                )
+            self._listening = False
+
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+            self._stale = True
+
+    def __enter__(self) -> "LocalReplica":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _needs_sync(self) -> bool:
+        with self._lock:
+            return (
+                self._db is None
+                or self._stale
+                or (
+                    self.max_age is not None
+                    and time.monotonic() - self._synced_at > self.max_age
+                )
+            )
+
+    def _download_to_file(self) -> str:
+        # download next to the current copy, which is replaced afterwards
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        fd, tmpname = tempfile.mkstemp(dir=directory, suffix=".download")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                self._driver.download_database(
+                    self._connection, self.dbname, file, xCallback, False
+                )
+        except BaseException:
+            os.unlink(tmpname)
+            raise
+
+        return tmpname
+
+    def _download_in_memory(self) -> sqlite3.Connection:
+        db = download_db_to_sqlite3(
+            self._connection,
+            self.dbname,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        db.execute("PRAGMA query_only = 1")
+        return db
+
+    def _open(self, filename: str) -> sqlite3.Connection:
+        # queries run in the caller's thread, changes in the PubSub thread
+        db = sqlite3.connect(filename, check_same_thread=False, isolation_level=None)
+        # only the changes notified by the server can modify the replica
+        db.execute("PRAGMA query_only = 1")
+        return db
+
+    def _listen(self) -> None:
+        if self._listening or self._pubsub_connection is None:
+            return
+
+        for table in self._listened_tables():
+            self._pubsub.listen(
+                self._pubsub_connection,
+                SQLITECLOUD_PUBSUB_SUBJECT.TABLE,
+                table,
+                self._on_notification,
+            )
+        self._listening = True
+
+    def _listened_tables(self) -> List[str]:
+        if self._tables is None:
+            # list the tables on the server, the local copy may not exist yet
+            result = self._driver.execute(
+                "SELECT name FROM sqlite_master "
+                "WHERE type = 'table' AND name NOT LIKE 'sqlite_%'",
+                self._connection,
+            )
+            self._tables = {result.get_value(row, 0) for row in range(result.nrows)}
+
+        return sorted(self._tables)
+
+    def _on_notification(
+        self,
+        connection: SQLiteCloudConnect,
+        result: Optional[SQLiteCloudResultSet],
+        data: Optional[Any],
+    ) -> None:
+        with self._lock:
+            if result is None:
+                # the PubSub connection is closed and the changes can be missed
+                self._listening = False
+                self._stale = True
+                return
+
+            content = result.get_result()
+            if self._pending is not None:
+                self._pending.append(content)
+            elif self._db is not None:
+                self._apply(content)
+
+    def _apply(self, content: Any) -> None:
+        """Apply the rows of a TABLE notification, or mark the replica as stale."""
+        try:
+            table = _quote_identifier(content["channel"])
+            pk = content["pk"]
+            statements = [
+                _change_statement(table, pk, row) for row in content["payload"]
+            ]
+        except (KeyError, TypeError, ValueError):
+            self._stale = True
+            return
+
+        self._db.execute("PRAGMA query_only = 0")
+        try:
+            self._db.execute("BEGIN")
+            for sql, parameters in statements:
+                if self._db.execute(sql, parameters).rowcount == 0 and (
+                    sql.startswith("UPDATE")
+                ):
+                    # the row is missing, the replica is behind
+                    raise sqlite3.DatabaseError("Row not found")
+            self._db.execute("COMMIT")
+        except sqlite3.Error:
+            if self._db.in_transaction:
+                self._db.execute("ROLLBACK")
+            self._stale = True
+            return
+        finally:
+            self._db.execute("PRAGMA query_only = 1")
+
+        self.changes += len(statements)
+
+
+def _change_statement(
+    table: str, pk: List[str], row: Dict[str, Any]
+) -> Tuple[str, Tuple[Any, ...]]:
+    """Build the statement to apply a row of a TABLE notification."""
+    change = row["type"]
+    values = {
+        name: value
+        for name, value in row.items()
+        if name != "type" and not name.startswith(PREVIOUS_PK_PREFIX)
+    }
+    # the primary key before the change, it differs when it is updated
+    where = " AND ".join(f"{_quote_identifier(name)} = ?" for name in pk)
+    where_values = tuple(row.get(PREVIOUS_PK_PREFIX + name, row[name]) for name in pk)
+
+    if change == "DELETE":
+        return f"DELETE FROM {table} WHERE {where}", where_values
+
+    if change == "INSERT":
+        columns = ", ".join(_quote_identifier(name) for name in values)
+        placeholders = ", ".join("?" for _ in values)
+        return (
+            f"INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})",
+            tuple(values.values()),
+        )
+
+    if change == "UPDATE":
+        assignments = ", ".join(f"{_quote_identifier(name)} = ?" for name in values)
+        return (
+            f"UPDATE {table} SET {assignments} WHERE {where}",
+            tuple(values.values()) + where_values,
+        )
+
+    raise ValueError(f"Unsupported change: {change}")
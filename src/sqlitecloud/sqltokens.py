@@ -0,0 +1,28 @@
+import re
+from typing import Optional
+
+# the tokens of a SQL statement: literals and quoted identifiers,
+# the start of comments, words and any other character
+SQL_TOKEN_PATTERN = re.compile(
+    r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|`(?:[^`]|``)*`|\[[^\]]*\]|--|/\*|[\w$.]+|\S"""
+)
+
+
+def normalize_select(sql: str) -> Optional[str]:
+    """
+    Collapse the whitespaces between the tokens of a single SELECT statement,
+    keeping its literals as they are. None for any other statement,
+    or when it has comments.
+    """
+    tokens = SQL_TOKEN_PATTERN.findall(sql)
+    while tokens and tokens[-1] == ";":
+        tokens.pop()
+
+    if not tokens or tokens[0].upper() != "SELECT":
+        return None
+    for token in tokens:
+        if token in ("--", "/*", ";") or token in "'\"`[":
+            # comment, another statement or unterminated literal
+            return None
+
+    return " ".join(tokens)
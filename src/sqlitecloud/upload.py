@@ -1,10 +1,18 @@
+import hashlib
+import json
 import logging
 import os
+import sqlite3
+import tempfile
 from io import BufferedReader
-from typing import Optional
+from typing import BinaryIO, Optional, Union
 
-from sqlitecloud.datatypes import SQLiteCloudConnect
+from sqlitecloud.datatypes import BytesLike, SQLiteCloudConnect
 from sqlitecloud.driver import Driver
+from sqlitecloud.exceptions import SQLiteCloudException
+
+# `sqlite3.Connection.serialize()`, from Python 3.11
+_HAS_SERIALIZE = hasattr(sqlite3.Connection, "serialize")
 
 
 def xCallback(fd: BufferedReader, blen: int, ntot: int, nprogress: int) -> bytes:
@@ -65,3 +73,221 @@ def upload_db(
             dbsize,
             xCallback,
         )
+
+
+def upload_db_from_bytes(
+    connection: SQLiteCloudConnect, dbname: str, key: Optional[str], data: BytesLike
+) -> None:
+    """
+    Uploads a SQLite database from its content in memory.
+    The chunks are sent as slices of the data, without copying it.
+
+    Args:
+        connection (SQLiteCloudConnect): The connection object used to connect to the node.
+        dbname (str): The name of the database in SQLite Cloud.
+        key (Optional[str]): The encryption key for the database. If None, no encryption is used.
+        data (BytesLike): The content of the SQLite database file.
+
+    Raises:
+        SQLiteCloudException: If an error occurs while uploading the database.
+    """
+    view = memoryview(data).cast("B")
+
+    _upload_stream(connection, dbname, key, _BytesReader(view), len(view))
+
+
+def upload_db_from_stream(
+    connection: SQLiteCloudConnect,
+    dbname: str,
+    key: Optional[str],
+    stream: BinaryIO,
+    size: int,
+) -> None:
+    """
+    Uploads a SQLite database read from a stream, eg a pipe or a socket.
+
+    Args:
+        connection (SQLiteCloudConnect): The connection object used to connect to the node.
+        dbname (str): The name of the database in SQLite Cloud.
+        key (Optional[str]): The encryption key for the database. If None, no encryption is used.
+        stream (BinaryIO): The readable stream of the SQLite database file.
+        size (int): The number of bytes of the database to read from the stream.
+
+    Raises:
+        SQLiteCloudException: If an error occurs while uploading the database,
+            or the stream ends before `size` bytes.
+    """
+    _upload_stream(connection, dbname, key, _StreamReader(stream, size), size)
+
+
+def upload_db_from_sqlite3(
+    connection: SQLiteCloudConnect,
+    dbname: str,
+    key: Optional[str],
+    db: sqlite3.Connection,
+    name: str = "main",
+) -> None:
+    """
+    Uploads a database open with the `sqlite3` module, eg an in-memory database.
+
+    The database is serialized in memory with `sqlite3.Connection.serialize()`.
+
+    Note:
+        `serialize()` is available from Python 3.11. On older versions the
+        database is copied with the backup API to a file in the temporary
+        directory (see `tempfile.gettempdir()`), removed after the upload:
+        it needs free disk space for the whole database, and its content
+        is written to the disk unencrypted.
+
+    Args:
+        connection (SQLiteCloudConnect): The connection object used to connect to the node.
+        dbname (str): The name of the database in SQLite Cloud.
+        key (Optional[str]): The encryption key for the database. If None, no encryption is used.
+        db (sqlite3.Connection): The local database to upload.
+        name (str): The name of the schema of `db` to upload.
+
+    Raises:
+        SQLiteCloudException: If an error occurs while uploading the database.
+    """
+    if _HAS_SERIALIZE:
+        upload_db_from_bytes(connection, dbname, key, db.serialize(name=name))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "upload.db")
+        target = sqlite3.connect(filename)
+        try:
+            db.backup(target, name=name)
+        finally:
+            target.close()
+
+        upload_db(connection, dbname, key, filename)
+
+
+def _upload_stream(
+    connection: SQLiteCloudConnect,
+    dbname: str,
+    key: Optional[str],
+    reader: Union["_BytesReader", "_StreamReader"],
+    size: int,
+) -> None:
+    driver = Driver()
+
+    driver.upload_database(
+        connection,
+        dbname,
+        key,
+        False,
+        0,
+        False,
+        reader,
+        size,
+        xCallback,
+    )
+
+
+class _BytesReader:
+    """Reads the chunks of the data as slices of its memoryview."""
+
+    def __init__(self, view: memoryview) -> None:
+        self._view = view
+        self._offset = 0
+
+    def read(self, size: int) -> memoryview:
+        chunk = self._view[self._offset : self._offset + size]
+        self._offset += len(chunk)
+        return chunk
+
+
+class _StreamReader:
+    """Reads exactly `size` bytes from the stream, in chunks of the requested size."""
+
+    def __init__(self, stream: BinaryIO, size: int) -> None:
+        self._stream = stream
+        self._remaining = size
+
+    def read(self, size: int) -> bytes:
+        size = min(size, self._remaining)
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+
+        nread = 0
+        while nread < size:
+            # streams like pipes and sockets may return less than requested
+            n = self._stream.readinto(view[nread:])
+            if not n:
+                raise SQLiteCloudException(
+                    f"The stream ended {self._remaining - nread} bytes before the end of the database."
+                )
+            nread += n
+
+        self._remaining -= size
+        return buffer
+
+
+def upload_db_if_changed(
+    connection: SQLiteCloudConnect,
+    dbname: str,
+    key: Optional[str],
+    filename: str,
+    manifest_filename: Optional[str] = None,
+) -> int:
+    """
+    Uploads a SQLite database only when it changed since its last upload.
+
+    The digest of the file uploaded is saved in a manifest, by default
+    `<filename>.manifest`, and compared with the digest of the file on the
+    next call. The whole database is uploaded when the file changed, the
+    manifest is missing or it was saved for another database: the server
+    has no command to upload only the pages changed.
+
+    The manifest describes the database as uploaded: it must not be changed
+    on the server between two uploads.
+
+    Args:
+        connection (SQLiteCloudConnect): The connection object used to connect to the node.
+        dbname (str): The name of the database in SQLite Cloud.
+        key (Optional[str]): The encryption key for the database. If None, no encryption is used.
+        filename (str): The path to the SQLite database file to be uploaded.
+        manifest_filename (Optional[str]): The path of the manifest.
+
+    Returns:
+        int: The number of bytes of the database uploaded, 0 if it did not change.
+
+    Raises:
+        SQLiteCloudException: If an error occurs while uploading the database.
+    """
+    manifest_filename = manifest_filename or filename + ".manifest"
+
+    manifest = {
+        "dbname": dbname,
+        "size": os.path.getsize(filename),
+        "digest": _file_digest(filename),
+    }
+    try:
+        with open(manifest_filename) as fd:
+            previous = json.load(fd)
+    except (OSError, ValueError):
+        previous = None
+
+    if previous == manifest:
+        return 0
+
+    upload_db(connection, dbname, key, filename)
+
+    # replace the previous manifest only when complete
+    tmpname = manifest_filename + ".tmp"
+    with open(tmpname, "w") as fd:
+        json.dump(manifest, fd)
+    os.replace(tmpname, manifest_filename)
+
+    return manifest["size"]
+
+
+def _file_digest(filename: str) -> str:
+    digest = hashlib.blake2b()
+    with open(filename, "rb") as fd:
+        for chunk in iter(lambda: fd.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
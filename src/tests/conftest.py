@@ -8,6 +8,7 @@ from dotenv import load_dotenv
 import sqlitecloud
 from sqlitecloud.client import SQLiteCloudClient
 from sqlitecloud.datatypes import SQLiteCloudAccount, SQLiteCloudConnect
+from tests.scsp_server import SCSPServer
 
 
 @pytest.fixture(autouse=True)
@@ -38,6 +39,16 @@ def reset_module_state():
     sqlite3.converters.update(original_sql_converters)
 
 
+@pytest.fixture()
+def scsp_server():
+    """Local stand-in for a SQLite Cloud node, see `SCSPServer`."""
+    server = SCSPServer().start()
+
+    yield server
+
+    server.stop()
+
+
 @pytest.fixture()
 def sqlitecloud_connection():
     account = SQLiteCloudAccount()
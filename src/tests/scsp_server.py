@@ -0,0 +1,138 @@
+import socket
+import threading
+from typing import Any, Callable, List, Optional, Union
+
+from sqlitecloud.datatypes import (
+    SQLITECLOUD_ROWSET,
+    SQLiteCloudAccount,
+    SQLiteCloudConfig,
+    SQLiteCloudConnect,
+)
+from sqlitecloud.driver import Driver
+from sqlitecloud.exceptions import SQLiteCloudException
+
+
+class SCSPServer:
+    """
+    Minimal stand-in for a SQLite Cloud node speaking the SCSP protocol on localhost.
+
+    Each command is passed to `handler` as a string, or as a list for array commands,
+    and the bytes it returns are sent back as the response. OK is sent when
+    the handler returns None.
+    """
+
+    def __init__(
+        self, handler: Optional[Callable[[Union[str, List[Any]]], bytes]] = None
+    ) -> None:
+        self.handler = handler
+        # commands received, in order
+        self.commands: List[Union[str, List[Any]]] = []
+
+        self._driver = Driver()
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(("127.0.0.1", 0))
+        self._sock.listen()
+        self._clients: List[socket.socket] = []
+        self._running = False
+
+    @property
+    def port(self) -> int:
+        return self._sock.getsockname()[1]
+
+    def config(self) -> SQLiteCloudConfig:
+        """Configuration to connect to the server."""
+        config = SQLiteCloudConfig()
+        config.account = SQLiteCloudAccount(
+            hostname="127.0.0.1", port=self.port, apikey="abc123"
+        )
+        config.insecure = True
+        config.compression = False
+        return config
+
+    def start(self) -> "SCSPServer":
+        self._running = True
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._running = False
+        self._sock.close()
+        for client in self._clients:
+            try:
+                client.shutdown(socket.SHUT_RDWR)
+                client.close()
+            except OSError:
+                pass
+
+    def _accept_loop(self) -> None:
+        while self._running:
+            try:
+                client, _ = self._sock.accept()
+            except OSError:
+                return
+            self._clients.append(client)
+            threading.Thread(target=self._serve, args=(client,), daemon=True).start()
+
+    def _serve(self, client: socket.socket) -> None:
+        connection = SQLiteCloudConnect()
+        connection.socket = client
+
+        while self._running:
+            try:
+                # commands share the same encoding of the responses
+                command = self._driver._internal_socket_read(connection).get_value(0, 0)
+            except (SQLiteCloudException, OSError):
+                return
+
+            self.commands.append(command)
+
+            response = self.handler(command) if self.handler else None
+            try:
+                client.sendall(response if response is not None else ok())
+            except OSError:
+                return
+
+
+def ok() -> bytes:
+    return b"+2 OK"
+
+
+def value(data: Any) -> bytes:
+    return Driver()._internal_serialize_command(data)
+
+
+def array(values: List[Any]) -> bytes:
+    driver = Driver()
+    payload = f"{len(values)} ".encode() + b"".join(
+        driver._internal_serialize_command(v) for v in values
+    )
+    return f"={len(payload)} ".encode() + payload
+
+
+def error(message: str, code: int = 1, xerrcode: int = 1) -> bytes:
+    payload = f"{code}:{xerrcode} {message}".encode()
+    return f"-{len(payload)} ".encode() + payload
+
+
+def rowset(colnames: List[str], rows: List[List[Any]]) -> bytes:
+    """ROWSET version 1: column names followed by the values."""
+    driver = Driver()
+    payload = f"0:1 {len(rows)} {len(colnames)} ".encode()
+    payload += b"".join(driver._internal_serialize_command(c) for c in colnames)
+    for row in rows:
+        payload += b"".join(driver._internal_serialize_command(v) for v in row)
+    return f"*{len(payload)} ".encode() + payload
+
+
+def chunked_rowset(colnames: List[str], rows: List[List[Any]]) -> bytes:
+    """ROWSET version 1 sent in chunks of one row."""
+    driver = Driver()
+    response = b""
+    for i, row in enumerate(rows, start=1):
+        payload = f"{i}:1 1 {len(colnames)} ".encode()
+        if i == 1:
+            payload += b"".join(driver._internal_serialize_command(c) for c in colnames)
+        payload += b"".join(driver._internal_serialize_command(v) for v in row)
+        response += f"/{len(payload)} ".encode() + payload
+    return response + SQLITECLOUD_ROWSET.CHUNKS_END.value
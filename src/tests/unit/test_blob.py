@@ -0,0 +1,123 @@
+import io
+
+import pytest
+
+import sqlitecloud
+from sqlitecloud.exceptions import SQLiteCloudOperationalError
+from tests.scsp_server import array, rowset
+
+
+class TestBlob:
+    @pytest.fixture()
+    def blob_server(self, scsp_server):
+        """Stand-in server storing a single BLOB cell with rowid 1."""
+        cell = {1: bytearray(b"0123456789")}
+        scsp_server.encoding = "UTF-8"
+
+        def handler(command):
+            if not isinstance(command, list):
+                return None
+
+            sql, params = command[0], command[1:]
+            if sql.startswith("PRAGMA"):
+                return rowset(["encoding"], [[scsp_server.encoding]])
+            if sql.startswith("SELECT typeof("):
+                value = cell.get(params[0])
+                kind = "text" if isinstance(value, str) else "blob"
+                rows = [[kind, len(value)]] if value is not None else []
+                return rowset(["typeof", "length"], rows)
+            if sql.startswith("SELECT substr("):
+                start, length, rowid = params
+                return rowset(["substr"], [[bytes(cell[rowid][start - 1 :][:length])]])
+            if "zeroblob" in sql:
+                size, rowid = params
+                cell[rowid] = bytearray(size)
+            elif sql.startswith("UPDATE"):
+                prefix, data, suffix_start, rowid = params
+                value = cell[rowid]
+                cell[rowid] = value[:prefix] + data + value[suffix_start - 1 :]
+            return array([10, 0, 0, 1, 1, 0])
+
+        scsp_server.handler = handler
+        scsp_server.cell = cell
+        return scsp_server
+
+    def test_read_in_chunks(self, blob_server):
+        conn = sqlitecloud.connect(blob_server.config().account, blob_server.config())
+
+        with conn.blob_reader("media", "data", 1, chunk_size=4) as blob:
+            assert len(blob) == 10
+            assert blob.read() == b"0123456789"
+
+        reads = [
+            c
+            for c in blob_server.commands
+            if isinstance(c, list) and c[0].startswith("SELECT substr(")
+        ]
+        assert [c[1:] for c in reads] == [[1, 4, 1], [5, 4, 1], [9, 2, 1]]
+        assert reads[0][0] == (
+            'SELECT substr("data", ?, ?) FROM "main"."media" WHERE rowid = ?'
+        )
+
+    def test_readinto_and_seek(self, blob_server):
+        conn = sqlitecloud.connect(blob_server.config().account, blob_server.config())
+
+        blob = conn.blob_reader("media", "data", 1)
+        buffer = bytearray(3)
+
+        blob.seek(-4, io.SEEK_END)
+        assert blob.readinto(buffer) == 3
+        assert buffer == b"678"
+        assert blob.tell() == 9
+
+    def test_write_in_chunks(self, blob_server):
+        conn = sqlitecloud.connect(blob_server.config().account, blob_server.config())
+
+        with conn.blob_writer("media", "data", 1, size=8, chunk_size=3) as blob:
+            blob.seek(1)
+            assert blob.write(b"abcde") == 5
+
+        assert blob_server.cell[1] == b"\x00abcde\x00\x00"
+        writes = [c[0] for c in blob_server.commands if c[0].startswith("UPDATE")]
+        assert writes[-1].startswith('UPDATE "main"."media" SET "data" = CAST(')
+
+    def test_write_in_other_encodings_splices_the_hex(self, blob_server):
+        blob_server.encoding = "UTF-16le"
+        conn = sqlitecloud.connect(blob_server.config().account, blob_server.config())
+
+        with conn.blob_writer("media", "data", 1) as blob:
+            blob.write(b"ab")
+
+        writes = [c[0] for c in blob_server.commands if c[0].startswith("UPDATE")]
+        assert writes[-1].startswith('UPDATE "main"."media" SET "data" = unhex(')
+
+    def test_text_cell_cannot_be_opened(self, blob_server):
+        blob_server.cell[1] = "text"
+        conn = sqlitecloud.connect(blob_server.config().account, blob_server.config())
+
+        with pytest.raises(SQLiteCloudOperationalError, match="type text"):
+            conn.blob_reader("media", "data", 1)
+
+    def test_write_beyond_size(self, blob_server):
+        conn = sqlitecloud.connect(blob_server.config().account, blob_server.config())
+
+        blob = conn.blob_writer("media", "data", 1)
+        blob.seek(8)
+
+        with pytest.raises(ValueError):
+            blob.write(b"abc")
+
+    def test_reader_is_readonly(self, blob_server):
+        conn = sqlitecloud.connect(blob_server.config().account, blob_server.config())
+
+        blob = conn.blob_reader("media", "data", 1)
+
+        assert not blob.writable()
+        with pytest.raises(sqlitecloud.ProgrammingError):
+            blob.write(b"abc")
+
+    def test_missing_rowid(self, blob_server):
+        conn = sqlitecloud.connect(blob_server.config().account, blob_server.config())
+
+        with pytest.raises(SQLiteCloudOperationalError):
+            conn.blob_reader("media", "data", 2)
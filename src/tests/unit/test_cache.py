@@ -0,0 +1,355 @@
+from unittest.mock import Mock
+
+import pytest
+
+import sqlitecloud
+from sqlitecloud.cache import DiskResultCache, ResultCache, StatementCache
+from sqlitecloud.datatypes import (
+    SQLITECLOUD_PUBSUB_SUBJECT,
+    SQLiteCloudConfig,
+    SQLiteCloudConnect,
+)
+from sqlitecloud.dbapi2 import Connection
+from sqlitecloud.driver import Driver
+from sqlitecloud.resultset import (
+    SQLITECLOUD_RESULT_TYPE,
+    SQLiteCloudResult,
+    SQLiteCloudResultSet,
+)
+from tests.scsp_server import chunked_rowset
+
+
+class TestStatementCache:
+    def test_get_counts_hits_and_misses(self):
+        cache = StatementCache(2, Driver().encode_query)
+
+        first = cache.get("SELECT 1")
+        second = cache.get("SELECT 1")
+
+        assert first is second
+        assert cache.hits == 1
+        assert cache.misses == 1
+        assert first.encoded_sql == b"!9 SELECT 1\x00"
+
+    def test_get_evicts_least_recently_used(self):
+        cache = StatementCache(2, Driver().encode_query)
+
+        cache.get("SELECT 1")
+        cache.get("SELECT 2")
+        cache.get("SELECT 1")
+        cache.get("SELECT 3")
+
+        assert len(cache) == 2
+        assert "SELECT 1" in cache
+        assert "SELECT 2" not in cache
+        assert "SELECT 3" in cache
+
+    def test_zero_maxsize_disables_cache(self):
+        cache = StatementCache(0, Driver().encode_query)
+
+        cache.get("SELECT 1")
+        cache.get("SELECT 1")
+
+        assert len(cache) == 0
+        assert cache.misses == 2
+
+    def test_named_parameters_in_order_without_duplicates(self):
+        cache = StatementCache(1, Driver().encode_query)
+
+        statement = cache.get("SELECT :name, :age, :name WHERE x = :_id1")
+
+        assert statement.named_parameters == ("name", "age", "_id1")
+
+
+class TestResultCache:
+    @pytest.fixture()
+    def cache(self, mocker):
+        mocker.patch("sqlitecloud.cache.SQLiteCloudPubSub.listen")
+        return ResultCache(SQLiteCloudConnect(), maxsize=2)
+
+    @staticmethod
+    def make_rowset(*tables):
+        result = SQLiteCloudResult(SQLITECLOUD_RESULT_TYPE.RESULT_ROWSET)
+        result.nrows = 1
+        result.ncols = len(tables)
+        result.data = ["value"] * len(tables)
+        result.colname = [f"col{i}" for i in range(len(tables))]
+        result.tblname = list(tables)
+        return result
+
+    @staticmethod
+    def notification(table):
+        return SQLiteCloudResultSet(
+            SQLiteCloudResult(
+                SQLITECLOUD_RESULT_TYPE.RESULT_JSON,
+                {"channel": table, "payload": [{"type": "UPDATE"}], "pk": ["id"]},
+            )
+        )
+
+    def test_listens_to_the_tables_before_the_first_query(self, cache):
+        def query():
+            assert cache._pubsub.listen.called
+            return self.make_rowset("Orders")
+
+        run = Mock(side_effect=query)
+
+        first = cache.execute("SELECT * FROM orders", (), run)
+        cache.execute("SELECT * FROM orders", (), run)
+        third = cache.execute("  SELECT *   FROM orders;", (), run)
+
+        assert third.data == first.data
+        assert run.call_count == 1
+        assert cache.hits == 2
+        cache._pubsub.listen.assert_called_once_with(
+            cache._pubsub_connection,
+            SQLITECLOUD_PUBSUB_SUBJECT.TABLE,
+            "orders",
+            cache._on_notification,
+        )
+
+    def test_queries_started_before_listening_are_not_cached(self, cache):
+        key = cache.key("SELECT * FROM orders")
+        clock = cache.clock()
+
+        cache._listen({"orders"})
+
+        assert not cache.put(key, self.make_rowset("orders"), clock)
+        assert cache.put(key, self.make_rowset("orders"), cache.clock())
+
+    def test_hits_return_copies(self, cache):
+        cache._listening.add("orders")
+        cache.execute("SELECT * FROM orders", (), lambda: self.make_rowset("orders"))
+
+        result = cache.execute("SELECT * FROM orders", (), Mock())
+        result.data[0] = "changed"
+
+        assert cache.execute("SELECT * FROM orders", (), Mock()).data == ["value"]
+
+    def test_key_includes_the_database(self, cache):
+        cache._listening.add("orders")
+        run = Mock(side_effect=lambda: self.make_rowset("orders"))
+        connections = []
+        for dbname in ("one", "two", "one"):
+            connection = SQLiteCloudConnect()
+            connection.config = SQLiteCloudConfig(
+                f"sqlitecloud://host.sqlite.cloud:8860/{dbname}?apikey=abc"
+            )
+            connections.append(connection)
+
+        for connection in connections:
+            cache.execute("SELECT * FROM orders", (), run, connection)
+
+        assert run.call_count == 2
+
+    def test_key_includes_parameters(self, cache):
+        cache._listening.add("orders")
+        run = Mock(side_effect=lambda: self.make_rowset("orders"))
+
+        cache.execute("SELECT * FROM orders WHERE id = ?", (1,), run)
+        cache.execute("SELECT * FROM orders WHERE id = ?", (2,), run)
+        cache.execute("SELECT * FROM orders WHERE id = :id", {"id": 1}, run)
+        cache.execute("SELECT * FROM orders WHERE id = :id", {"id": 1}, run)
+
+        assert run.call_count == 3
+
+    def test_key_distinguishes_parameters_types(self, cache):
+        assert len({cache.key("SELECT ?", (v,)) for v in (1, True, 1.0)}) == 3
+        assert cache.key("SELECT :a", {"a": 1}) != cache.key("SELECT :a", {"a": True})
+
+    def test_key_keeps_the_whitespaces_of_literals(self, cache):
+        assert cache.key("SELECT * FROM t WHERE a = 'x  y'") != cache.key(
+            "SELECT * FROM t WHERE a = 'x y'"
+        )
+        assert cache.key("SELECT  *\nFROM t WHERE a = 'x;y' ;") == cache.key(
+            "SELECT * FROM t WHERE a = 'x;y'"
+        )
+        assert cache.key("SELECT 'x") is None
+        assert cache.key("SELECT 1 -- comment") is None
+
+    @pytest.mark.parametrize(
+        "sql",
+        [
+            "SELECT o.* FROM orders o JOIN users u ON u.id = o.user",
+            "SELECT * FROM orders WHERE user IN (SELECT id FROM users)",
+            "SELECT * FROM orders, users",
+            "SELECT * FROM json_each('[1]')",
+        ],
+    )
+    def test_results_reading_other_tables_are_not_cached(self, cache, sql):
+        cache._listening.update({"orders", "users"})
+
+        cache.execute(sql, (), lambda: self.make_rowset("orders"))
+
+        assert len(cache) == 0
+
+    def test_results_of_all_the_tables_read_are_cached(self, cache):
+        cache._listening.update({"orders", "users"})
+
+        cache.execute(
+            'SELECT o.id, u.name FROM main.orders AS o JOIN "users" u ON u.id = o.user',
+            (),
+            lambda: self.make_rowset("orders", "users"),
+        )
+
+        assert len(cache) == 1
+
+    def test_notification_invalidates_the_table(self, cache):
+        cache._listening.update({"orders", "users"})
+        cache.execute("SELECT * FROM orders", (), lambda: self.make_rowset("orders"))
+        cache.execute("SELECT * FROM users", (), lambda: self.make_rowset("users"))
+
+        cache._on_notification(None, self.notification("orders"), None)
+
+        assert cache.key("SELECT * FROM orders") not in cache._entries
+        assert cache.key("SELECT * FROM users") in cache._entries
+
+    def test_notification_during_the_query_prevents_caching(self, cache):
+        cache._listening.add("orders")
+
+        def run():
+            cache._on_notification(None, self.notification("orders"), None)
+            return self.make_rowset("orders")
+
+        cache.execute("SELECT * FROM orders", (), run)
+
+        assert len(cache) == 0
+
+    def test_lost_pubsub_connection_clears_the_cache(self, cache):
+        cache._listening.add("orders")
+        cache.execute("SELECT * FROM orders", (), lambda: self.make_rowset("orders"))
+
+        cache._on_notification(None, None, None)
+
+        assert len(cache) == 0
+        assert not cache._listening
+
+    def test_other_statements_invalidate_the_cache(self, cache):
+        cache._listening.add("orders")
+        cache.execute("SELECT * FROM orders", (), lambda: self.make_rowset("orders"))
+
+        cache.execute("DELETE FROM orders", (), lambda: None)
+
+        assert len(cache) == 0
+
+    def test_results_without_tables_are_not_cached(self, cache):
+        cache.execute("SELECT 1", (), lambda: self.make_rowset(""))
+
+        assert len(cache) == 0
+        cache._pubsub.listen.assert_not_called()
+
+    def test_evicts_least_recently_used(self, cache):
+        cache._listening.add("orders")
+        for i in range(3):
+            cache.execute(
+                f"SELECT {i} FROM orders", (), lambda: self.make_rowset("orders")
+            )
+
+        assert len(cache) == 2
+        assert cache.evictions == 1
+        assert cache.key("SELECT 0 FROM orders") not in cache._entries
+
+    def test_cursor_uses_the_connection_cache(self, cache, mocker):
+        cache._listening.add("orders")
+        execute_statement = mocker.patch.object(
+            Driver, "execute_statement", return_value=self.make_rowset("orders")
+        )
+        connection = Connection(SQLiteCloudConnect())
+        mocker.patch.object(connection, "is_connected", return_value=True)
+        connection.result_cache = cache
+
+        connection.execute("SELECT * FROM orders WHERE id = ?", (1,))
+        cursor = connection.execute("SELECT * FROM orders WHERE id = ?", (1,))
+
+        assert cursor.fetchall() == [("value",)]
+        execute_statement.assert_called_once()
+
+
+class TestDiskResultCache:
+    @pytest.fixture()
+    def server(self, scsp_server):
+        def handler(command):
+            if isinstance(command, list) and command[0].startswith("SELECT"):
+                return chunked_rowset(
+                    ["id", "name"], [[command[1], "one"], [2, b"\x00two"]]
+                )
+            return None
+
+        scsp_server.handler = handler
+        return scsp_server
+
+    def queries(self, server):
+        return [c for c in server.commands if isinstance(c, list)]
+
+    @pytest.mark.parametrize("backend", ["directory", "sqlite"])
+    def test_results_survive_restarts(self, server, tmp_path, backend):
+        path = str(tmp_path / "cache")
+        conn = sqlitecloud.connect(server.config().account, server.config())
+
+        conn.result_cache = DiskResultCache(path, backend=backend)
+        first = conn.execute("SELECT * FROM items WHERE id = ?", (1,)).fetchall()
+        conn.result_cache.close()
+
+        # a new cache on the same path, like after a restart
+        conn.result_cache = DiskResultCache(path, backend=backend)
+        second = conn.execute("SELECT * FROM items WHERE id = ?", (1,)).fetchall()
+
+        assert first == second == [(1, "one"), (2, b"\x00two")]
+        assert len(self.queries(server)) == 1
+        assert conn.result_cache.hits == 1
+
+    def test_parameters_are_part_of_the_key(self, server, tmp_path):
+        conn = sqlitecloud.connect(server.config().account, server.config())
+        conn.result_cache = DiskResultCache(str(tmp_path))
+
+        conn.execute("SELECT * FROM items WHERE id = ?", (1,))
+        rows = conn.execute("SELECT * FROM items WHERE id = ?", (3,)).fetchall()
+
+        assert rows[0] == (3, "one")
+        assert len(self.queries(server)) == 2
+
+    def test_key_encodes_the_types_of_the_parameters(self, tmp_path):
+        cache = DiskResultCache(str(tmp_path), namespace="db")
+
+        keys = {cache.key("SELECT ?", (v,)) for v in (1, True, 1.0, "1", b"1", None)}
+        assert len(keys) == 6
+        assert cache.key("SELECT :a, :b", {"a": 1, "b": "x"}) == cache.key(
+            "SELECT :a, :b", {"b": "x", "a": 1}
+        )
+        assert cache.key("SELECT ?", ("a", "b")) != cache.key("SELECT ?", ("a\x00b",))
+        assert cache.key("SELECT ?", (object(),)) is None
+
+    def test_expired_results_are_executed_again(self, server, tmp_path, mocker):
+        conn = sqlitecloud.connect(server.config().account, server.config())
+        conn.result_cache = DiskResultCache(str(tmp_path), ttl=10)
+        now = mocker.patch("sqlitecloud.cache.time.time", return_value=1000.0)
+
+        conn.execute("SELECT * FROM items WHERE id = ?", (1,))
+        now.return_value = 1011.0
+        conn.execute("SELECT * FROM items WHERE id = ?", (1,))
+        conn.result_cache.prune()
+
+        assert len(self.queries(server)) == 2
+        assert len(list(tmp_path.iterdir())) == 1
+
+    def test_databases_sharing_the_cache_do_not_share_results(self, server, tmp_path):
+        results = []
+        for dbname in ("one.sqlite", "two.sqlite", "one.sqlite"):
+            config = server.config()
+            config.account.dbname = dbname
+            conn = sqlitecloud.connect(config.account, config)
+            conn.result_cache = DiskResultCache(str(tmp_path))
+            conn.execute("SELECT * FROM items WHERE id = ?", (1,)).fetchall()
+            results.append(conn.result_cache.hits)
+
+        assert results == [0, 0, 1]
+        assert len(self.queries(server)) == 2
+
+    def test_other_statements_are_not_cached(self, server, tmp_path):
+        conn = sqlitecloud.connect(server.config().account, server.config())
+        conn.result_cache = DiskResultCache(str(tmp_path))
+
+        conn.execute("UPDATE items SET name = ?", ("x",))
+        conn.execute("UPDATE items SET name = ?", ("x",))
+
+        assert len(self.queries(server)) == 2
+        assert not list(tmp_path.iterdir())
@@ -1,4 +1,14 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
 from sqlitecloud.client import SQLiteCloudClient
+from sqlitecloud.driver import Driver
+from sqlitecloud.exceptions import SQLiteCloudError
+from sqlitecloud.hedging import HedgingPolicy
+from tests.scsp_server import SCSPServer, error, value
 
 
 class TestClient:
@@ -56,3 +66,184 @@ class TestClient:
         assert 10 == client.config.maxdata
         assert 11 == client.config.maxrows
         assert 12 == client.config.maxrowset
+
+    def test_parse_connection_string_with_blob_as_memoryview(self):
+        connection_string = (
+            "sqlitecloud://host.com:8860/dbname?apikey=abc123&blob_as_memoryview=true"
+        )
+
+        client = SQLiteCloudClient(connection_str=connection_string)
+
+        assert client.config.blob_as_memoryview
+
+    def test_parse_connection_string_with_many_hosts(self):
+        connection_string = "sqlitecloud://user:pass@H1,h2:8861,[::1]:8862/dbname"
+
+        client = SQLiteCloudClient(connection_str=connection_string)
+
+        assert "h1" == client.config.account.hostname
+        assert 8862 == client.config.account.port
+        assert client.config.account.nodes == [
+            ("h1", 8862),
+            ("h2", 8861),
+            ("::1", 8862),
+        ]
+        assert "user" == client.config.account.username
+        assert "dbname" == client.config.account.dbname
+
+    @pytest.mark.parametrize(
+        "hosts, nodes",
+        [
+            ("h1,[::1]:8861", [("h1", 8861), ("::1", 8861)]),
+            ("[::1],h2", [("::1", 8860), ("h2", 8860)]),
+            ("[::1]:1,[fe80::2]:2", [("::1", 1), ("fe80::2", 2)]),
+        ],
+    )
+    def test_parse_connection_string_with_ipv6_hosts(self, hosts, nodes):
+        client = SQLiteCloudClient(
+            connection_str=f"sqlitecloud://{hosts}/dbname?apikey=abc123"
+        )
+
+        assert client.config.account.nodes == nodes
+        assert (client.config.account.hostname, client.config.account.port) == nodes[0]
+        assert "abc123" == client.config.account.apikey
+        assert "dbname" == client.config.account.dbname
+
+
+class TestExecMany:
+    @pytest.fixture()
+    def client(self, scsp_server):
+        def handler(command):
+            if isinstance(command, list):
+                return value(command[1])
+            if command.startswith("SELECT"):
+                time.sleep(0.1)
+                return value(command.split()[1])
+            if command.startswith("FAIL"):
+                return error("no such table: missing")
+            return None
+
+        scsp_server.handler = handler
+        client = SQLiteCloudClient(connection_str="sqlitecloud://127.0.0.1?apikey=abc")
+        client.config = scsp_server.config()
+        yield client
+        client.close()
+
+    def test_queries_run_in_parallel_in_order(self, client):
+        start = time.monotonic()
+        results = client.exec_many([f"SELECT {i}" for i in range(10)], concurrency=5)
+        elapsed = time.monotonic() - start
+
+        assert [r.get_result() for r in results] == [str(i) for i in range(10)]
+        # two rounds of five queries
+        assert elapsed < 0.5
+        assert len(client._pool) == 5
+
+    def test_errors_are_returned(self, client):
+        results = client.exec_many(
+            ["SELECT 1", "FAIL", ("SELECT ?", (7,))], concurrency=2
+        )
+
+        assert results[0].get_result() == "1"
+        assert isinstance(results[1], SQLiteCloudError)
+        assert "no such table" in str(results[1])
+        assert results[2].get_result() == 7
+
+    def test_gather(self, client):
+        async def main():
+            return await client.gather(["SELECT 1", "SELECT 2"])
+
+        results = asyncio.run(main())
+
+        assert [r.get_result() for r in results] == ["1", "2"]
+
+
+class TestExecHedged:
+    @pytest.fixture()
+    def client(self, scsp_server):
+        lock = threading.Lock()
+        # seconds waited by the next SELECT commands
+        delays = []
+
+        def handler(command):
+            if isinstance(command, list):
+                return value(command[1])
+            if command.startswith("SELECT"):
+                with lock:
+                    delay = delays.pop(0) if delays else 0
+                time.sleep(delay)
+                return value(command.split()[1])
+            if command.startswith("FAIL"):
+                return error("no such table: missing")
+            return None
+
+        scsp_server.handler = handler
+        client = SQLiteCloudClient(connection_str="sqlitecloud://127.0.0.1?apikey=abc")
+        client.config = scsp_server.config()
+        client.hedging = HedgingPolicy(initial_delay=0.05)
+        client.delays = delays
+        yield client
+        client.close()
+
+    def test_slow_read_is_sent_again(self, client, scsp_server):
+        client.delays.append(0.5)
+
+        start = time.monotonic()
+        result = client.exec_hedged("SELECT 1")
+
+        assert time.monotonic() - start < 0.4
+        assert result.get_result() == "1"
+        assert client.hedging.hedged == 1
+        assert client.hedging.wins == 1
+        assert scsp_server.commands.count("SELECT 1") == 2
+
+        for _ in range(200):
+            if len(client._pool) == 2:
+                break
+            time.sleep(0.01)
+        # the latency of the slower read too, answered after the copy
+        assert len(client.hedging._sorted) == 2
+        assert client.hedging._sorted[-1] >= 0.5
+        # the response of the slower read is drained and its connection reused
+        results = client.exec_many(["SELECT 2", "SELECT 3"], concurrency=2)
+        assert [r.get_result() for r in results] == ["2", "3"]
+        assert scsp_server.commands.count("AUTH APIKEY abc123;") == 2
+
+    def test_copy_is_sent_to_another_node(self, client, scsp_server):
+        other = SCSPServer(lambda command: value(command.split()[1])).start()
+        try:
+            slow = scsp_server.config().account
+            client.config.account.nodes = [
+                (slow.hostname, slow.port),
+                ("127.0.0.1", other.port),
+            ]
+            # the primary read is sent to the slow node
+            client._pool.append(
+                Driver().connect(slow.hostname, slow.port, scsp_server.config())
+            )
+            client.delays.append(0.5)
+
+            assert client.exec_hedged("SELECT 1").get_result() == "1"
+
+            assert scsp_server.commands.count("SELECT 1") == 1
+            assert other.commands.count("SELECT 1") == 1
+        finally:
+            client.close()
+            other.stop()
+
+    def test_fast_read_is_sent_once(self, client, scsp_server):
+        assert client.exec_hedged(("SELECT ?", (3,))).get_result() == 3
+        assert client.hedging.hedged == 0
+        assert len(client.hedging._sorted) == 1
+
+    def test_writes_are_not_hedged(self, client, scsp_server):
+        client.hedging = HedgingPolicy(initial_delay=0)
+
+        client.exec_hedged("UPDATE t SET a = 1")
+
+        assert client.hedging.hedged == 0
+        assert scsp_server.commands.count("UPDATE t SET a = 1") == 1
+
+    def test_errors_are_raised(self, client):
+        with pytest.raises(SQLiteCloudError):
+            client.exec_hedged("FAIL")
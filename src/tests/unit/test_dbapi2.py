@@ -1,12 +1,20 @@
+import threading
+import time
+
 import pytest
 from pytest_mock import MockerFixture
 
 import sqlitecloud
-from sqlitecloud import Cursor
-from sqlitecloud.datatypes import SQLiteCloudAccount, SQLiteCloudConfig
+from sqlitecloud import Cursor, dbapi2
+from sqlitecloud.datatypes import SQLiteCloudAccount, SQLiteCloudConfig, SQLiteCloudVM
 from sqlitecloud.dbapi2 import Connection
-from sqlitecloud.exceptions import SQLiteCloudProgrammingError
+from sqlitecloud.exceptions import (
+    SQLiteCloudException,
+    SQLiteCloudOperationalError,
+    SQLiteCloudProgrammingError,
+)
 from sqlitecloud.resultset import SQLITECLOUD_RESULT_TYPE, SQLiteCloudResult
+from tests.scsp_server import array, chunked_rowset, error, rowset
 
 
 def test_connect_with_account_and_config(mocker: MockerFixture):
@@ -290,6 +298,23 @@ class TestCursor:
 
         assert cursor.fetchone() == {"name": "myname1"}
 
+    def test_execute_reuses_cached_statement(self, mocker):
+        conn = Connection(mocker.patch("sqlitecloud.datatypes.SQLiteCloudConnect"))
+        mocker.patch.object(conn, "is_connected", return_value=True)
+        execute_statement_mock = mocker.patch(
+            "sqlitecloud.driver.Driver.execute_statement"
+        )
+
+        cursor = conn.cursor()
+        cursor.execute("SELECT :id, :name, :id", {"name": "John", "id": 1})
+        cursor.execute("SELECT :id, :name, :id", {"name": "Jane", "id": 2})
+
+        assert conn.statement_cache.misses == 1
+        assert conn.statement_cache.hits == 1
+        args, kwargs = execute_statement_mock.call_args
+        assert args[1] == (2, "Jane")
+        assert kwargs["encoded_query"] == b"!23 SELECT :id, :name, :id\x00"
+
     @pytest.mark.parametrize(
         "method, args",
         [
@@ -312,3 +337,238 @@ class TestCursor:
             getattr(cursor, method)(*args)
 
         assert e.value.args[0] == "The cursor is closed."
+
+
+class TestPreparedStatement:
+    @pytest.fixture()
+    def vm_server(self, scsp_server):
+        albums = {1: "For Those About To Rock", 2: "Balls to the Wall"}
+        state = {"bindings": {}, "stepped": False}
+
+        def handler(command):
+            if isinstance(command, list) and command[0] == "VM COMPILE ?":
+                return array([21, 0, 1, 1, 2])
+            if isinstance(command, list) and command[0] == "VM BIND ? ? ?":
+                if command[3] == "invalid":
+                    return error("datatype mismatch", 20, 20)
+                state["bindings"][command[2]] = command[3]
+                return None
+            if command == "VM RESET 0":
+                state["stepped"] = False
+            elif command == "VM STEP 0":
+                album_id = state["bindings"].get(1)
+                if state["stepped"] or album_id not in albums:
+                    return array([20, 0, 0, 0, 0, 0])
+                state["stepped"] = True
+                return rowset(["AlbumId", "Title"], [[album_id, albums[album_id]]])
+            return None
+
+        scsp_server.handler = handler
+        return scsp_server
+
+    def test_execute_compiles_once_and_sends_only_bindings(self, vm_server):
+        conn = sqlitecloud.connect(vm_server.config().account, vm_server.config())
+
+        statement = conn.prepare("SELECT * FROM albums WHERE AlbumId = ?")
+        first = statement.execute((1,)).fetchall()
+        second = statement.execute((2,)).fetchall()
+
+        assert first == [(1, "For Those About To Rock")]
+        assert second == [(2, "Balls to the Wall")]
+        assert statement.description[1][0] == "Title"
+
+        compile_commands = [
+            c for c in vm_server.commands if isinstance(c, list) and "COMPILE" in c[0]
+        ]
+        assert compile_commands == [
+            ["VM COMPILE ?", "SELECT * FROM albums WHERE AlbumId = ?"]
+        ]
+        assert ["VM BIND ? ? ?", 0, 1, 2] in vm_server.commands
+
+    def test_execute_with_named_parameters(self, vm_server):
+        conn = sqlitecloud.connect(vm_server.config().account, vm_server.config())
+
+        with conn.prepare("SELECT * FROM albums WHERE AlbumId = :id") as statement:
+            row = statement.execute({"id": 2}).fetchone()
+
+        assert row == (2, "Balls to the Wall")
+        assert "VM FINALIZE 0" in vm_server.commands
+
+    def test_execute_with_wrong_number_of_bindings(self, vm_server):
+        conn = sqlitecloud.connect(vm_server.config().account, vm_server.config())
+
+        statement = conn.prepare("SELECT * FROM albums WHERE AlbumId = ?")
+
+        with pytest.raises(SQLiteCloudException):
+            statement.execute((1, 2))
+
+    def test_bind_error_leaves_connection_usable(self, vm_server):
+        conn = sqlitecloud.connect(vm_server.config().account, vm_server.config())
+
+        statement = conn.prepare("SELECT * FROM albums WHERE AlbumId = ?")
+
+        with pytest.raises(SQLiteCloudProgrammingError) as e:
+            statement.execute(("invalid",))
+
+        assert e.value.errmsg == "datatype mismatch"
+        assert statement.execute((1,)).fetchone() == (1, "For Those About To Rock")
+
+    def test_closed_statement_cannot_be_executed(self, vm_server):
+        conn = sqlitecloud.connect(vm_server.config().account, vm_server.config())
+
+        statement = conn.prepare("SELECT * FROM albums WHERE AlbumId = ?")
+        statement.close()
+
+        with pytest.raises(SQLiteCloudProgrammingError):
+            statement.execute((1,))
+
+
+class TestCancellation:
+    @pytest.fixture()
+    def slow_server(self, scsp_server):
+        def handler(command):
+            command = command if isinstance(command, str) else command[0]
+            if command.startswith("SLOW"):
+                time.sleep(2)
+            if command.startswith("ROWS"):
+                return chunked_rowset(["n"], [[n] for n in range(100)])
+            return rowset(["command"], [[command]])
+
+        scsp_server.handler = handler
+        return scsp_server
+
+    def test_timeout_abandons_the_query_and_reopens_the_connection(self, slow_server):
+        conn = sqlitecloud.connect(slow_server.config().account, slow_server.config())
+
+        start = time.monotonic()
+        with pytest.raises(SQLiteCloudOperationalError) as e:
+            conn.execute("SLOW", timeout=0.2)
+
+        assert time.monotonic() - start < 1.5
+        assert e.value.errmsg == "Query timed out"
+        assert conn.is_connected()
+        assert conn.execute("ECHO").fetchone() == ("ECHO",)
+        assert slow_server.commands.count("AUTH APIKEY abc123;") == 2
+
+    def test_query_within_the_timeout(self, slow_server):
+        conn = sqlitecloud.connect(slow_server.config().account, slow_server.config())
+
+        assert conn.execute("ECHO", timeout=5).fetchone() == ("ECHO",)
+        assert conn.sqlitecloud_connection.deadline is None
+        assert slow_server.commands.count("AUTH APIKEY abc123;") == 1
+
+    def test_interrupt_from_another_thread(self, slow_server):
+        conn = sqlitecloud.connect(slow_server.config().account, slow_server.config())
+        timer = threading.Timer(0.2, conn.interrupt)
+        timer.start()
+
+        start = time.monotonic()
+        with pytest.raises(SQLiteCloudOperationalError) as e:
+            conn.execute("SLOW")
+        timer.join()
+
+        assert time.monotonic() - start < 1.5
+        assert e.value.errmsg == "interrupted"
+        assert conn.execute("ECHO").fetchone() == ("ECHO",)
+
+    def test_transaction_lost_by_the_interrupt_is_reported(self, slow_server):
+        conn = sqlitecloud.connect(slow_server.config().account, slow_server.config())
+        conn.execute("BEGIN")
+        timer = threading.Timer(0.2, conn.interrupt)
+        timer.start()
+
+        with pytest.raises(SQLiteCloudOperationalError):
+            conn.execute("SLOW")
+        timer.join()
+
+        with pytest.raises(SQLiteCloudOperationalError) as e:
+            conn.execute("INSERT")
+        assert "rolled back" in e.value.errmsg
+        assert "INSERT" not in slow_server.commands
+        # reported once, the connection is in autocommit mode again
+        assert conn.execute("ECHO").fetchone() == ("ECHO",)
+        assert slow_server.commands.count("AUTH APIKEY abc123;") == 2
+
+    def test_committed_transaction_is_not_reported(self, slow_server):
+        conn = sqlitecloud.connect(slow_server.config().account, slow_server.config())
+        conn.execute("BEGIN")
+        conn.execute("ROLLBACK TO sp")
+        conn.execute("COMMIT")
+
+        with pytest.raises(SQLiteCloudOperationalError):
+            conn.execute("SLOW", timeout=0.2)
+
+        assert conn.execute("ECHO").fetchone() == ("ECHO",)
+
+    def test_statement_lost_by_the_interrupt(self, slow_server):
+        conn = sqlitecloud.connect(slow_server.config().account, slow_server.config())
+        vm = SQLiteCloudVM()
+        vm.index = 0
+        vm.generation = conn.sqlitecloud_connection.generation
+
+        with pytest.raises(SQLiteCloudOperationalError):
+            conn.execute("SLOW", timeout=0.2)
+
+        with pytest.raises(SQLiteCloudOperationalError) as e:
+            conn._driver.vm_step(conn.sqlitecloud_connection, vm, ())
+        assert "lost" in e.value.errmsg
+        # nothing to release on the new socket
+        conn._driver.vm_finalize(conn.sqlitecloud_connection, vm)
+        assert "VM FINALIZE 0" not in slow_server.commands
+
+    def test_interrupt_without_a_running_query(self, slow_server):
+        conn = sqlitecloud.connect(slow_server.config().account, slow_server.config())
+
+        conn.interrupt()
+
+        assert conn.execute("ECHO").fetchone() == ("ECHO",)
+        assert slow_server.commands.count("AUTH APIKEY abc123;") == 1
+
+    def test_progress_handler_aborts_a_large_result(self, slow_server):
+        conn = sqlitecloud.connect(slow_server.config().account, slow_server.config())
+        calls = []
+
+        def handler():
+            calls.append(1)
+            return len(calls) == 5
+
+        conn.set_progress_handler(handler, 2)
+        with pytest.raises(SQLiteCloudOperationalError):
+            conn.execute("ROWS")
+
+        assert len(calls) == 5
+
+        conn.set_progress_handler(None, 0)
+        assert len(conn.execute("ROWS").fetchall()) == 100
+
+
+class TestAdapters:
+    @pytest.fixture(autouse=True)
+    def registry(self, mocker):
+        mocker.patch.dict(dbapi2.adapters, clear=True)
+
+    def test_register_adapter_after_a_type_is_resolved(self):
+        class Point:
+            pass
+
+        assert dbapi2._get_adapter(Point) is None
+
+        sqlitecloud.register_adapter(Point, lambda p: "point")
+
+        assert dbapi2._get_adapter(Point)(Point()) == "point"
+
+    def test_conform_is_resolved_once_per_type(self):
+        class Conforming:
+            def __conform__(self, protocol):
+                return 1
+
+        assert dbapi2._get_adapter(Conforming) is dbapi2._conform
+        assert dbapi2._resolved_adapters[Conforming] is dbapi2._conform
+
+    def test_resolved_types_are_bounded(self, mocker):
+        mocker.patch.object(dbapi2, "_MAX_RESOLVED_ADAPTERS", 10)
+
+        for _ in range(25):
+            dbapi2._get_adapter(type("Dynamic", (), {}))
+
+        assert len(dbapi2._resolved_adapters) <= 10
@@ -0,0 +1,236 @@
+import threading
+
+import pytest
+
+from sqlitecloud.datatypes import SQLITECLOUD_PUBSUB_OVERFLOW, SQLiteCloudConnect
+from sqlitecloud.dispatcher import PubSubDispatcher
+from sqlitecloud.resultset import (
+    SQLITECLOUD_RESULT_TYPE,
+    SQLiteCloudResult,
+    SQLiteCloudResultSet,
+)
+
+
+def notification(channel: str, n: int) -> SQLiteCloudResultSet:
+    return SQLiteCloudResultSet(
+        SQLiteCloudResult(
+            SQLITECLOUD_RESULT_TYPE.RESULT_JSON, {"channel": channel, "n": n}
+        )
+    )
+
+
+def numbers(batch):
+    return [result.get_result()["n"] for result in batch]
+
+
+class TestPubSubDispatcher:
+    def test_channels_are_delivered_in_order_by_many_workers(self):
+        received = {"a": [], "b": []}
+        threads = set()
+
+        def on_batch(batch):
+            threads.add(threading.current_thread())
+            received[batch[0].get_result()["channel"]] += numbers(batch)
+
+        with PubSubDispatcher(workers=4, batch_size=10) as dispatcher:
+            dispatcher.add_callback(on_batch, "a")
+            dispatcher.add_callback(on_batch, "b")
+            for i in range(500):
+                dispatcher(SQLiteCloudConnect(), notification("a", i), None)
+                dispatcher(SQLiteCloudConnect(), notification("b", i), None)
+
+        assert received["a"] == list(range(500))
+        assert received["b"] == list(range(500))
+        assert threading.current_thread() not in threads
+        assert dispatcher.delivered == 1000
+        assert dispatcher.depth == 0
+
+    def test_many_callbacks_per_channel(self):
+        first, second, every = [], [], []
+
+        with PubSubDispatcher() as dispatcher:
+            dispatcher.add_callback(lambda b: first.extend(numbers(b)), "a")
+            dispatcher.add_callback(lambda b: second.extend(numbers(b)), "a")
+            dispatcher.add_callback(lambda b: every.extend(numbers(b)))
+            dispatcher.put(notification("a", 1))
+            dispatcher.put(notification("b", 2))
+
+        assert first == second == [1]
+        assert sorted(every) == [1, 2]
+
+    def test_slow_callback_does_not_block_the_reader(self):
+        started = threading.Event()
+        release = threading.Event()
+        received = []
+
+        def slow(batch):
+            started.set()
+            release.wait(5)
+            received.extend(numbers(batch))
+
+        dispatcher = PubSubDispatcher(maxsize=100)
+        dispatcher.add_callback(slow, "a")
+        dispatcher.put(notification("a", 0))
+        assert started.wait(5)
+        for i in range(1, 50):
+            dispatcher.put(notification("a", i))
+
+        assert dispatcher.depth == 49
+        assert dispatcher.lag > 0
+        release.set()
+        dispatcher.close(timeout=5)
+
+        assert received == list(range(50))
+        assert dispatcher.max_depth == 49
+
+    @pytest.mark.parametrize(
+        "overflow, expected",
+        [
+            (SQLITECLOUD_PUBSUB_OVERFLOW.DROP_OLDEST, [0, 3, 4]),
+            (SQLITECLOUD_PUBSUB_OVERFLOW.COALESCE, [0, 1, 4]),
+        ],
+    )
+    def test_overflow(self, overflow, expected):
+        started = threading.Event()
+        release = threading.Event()
+        received = []
+
+        def on_batch(batch):
+            started.set()
+            release.wait(5)
+            received.extend(numbers(batch))
+
+        dispatcher = PubSubDispatcher(maxsize=2, overflow=overflow)
+        dispatcher.add_callback(on_batch, "a")
+        dispatcher.put(notification("a", 0))
+        # the first notification is being delivered, the others wait
+        assert started.wait(5)
+        for i in range(1, 5):
+            dispatcher.put(notification("a", i))
+
+        assert dispatcher.depth == 2
+        release.set()
+        dispatcher.close(timeout=5)
+
+        assert received == expected
+        assert dispatcher.dropped + dispatcher.coalesced == 2
+
+    def test_drop_oldest_by_default(self):
+        with PubSubDispatcher(maxsize=1) as dispatcher:
+            assert dispatcher.overflow == SQLITECLOUD_PUBSUB_OVERFLOW.DROP_OLDEST
+
+    @pytest.mark.parametrize(
+        "payloads, content, expected",
+        [
+            # the rows changed in a table
+            (
+                [[{"id": 1}], [{"id": 2}, {"id": 3}], [{"id": 4}]],
+                {"pk": ["id"]},
+                [{"id": i} for i in range(1, 5)],
+            ),
+            # messages of a channel
+            (["one", "two", "three"], {}, ["one", "two", "three"]),
+            # lists sent as messages are not rows
+            ([[1], [2]], {}, [[1], [2]]),
+        ],
+    )
+    def test_coalesce_merges_the_payloads(self, payloads, content, expected):
+        started = threading.Event()
+        release = threading.Event()
+        received = []
+
+        def on_batch(batch):
+            started.set()
+            release.wait(5)
+            received.extend(result.get_result() for result in batch)
+
+        dispatcher = PubSubDispatcher(
+            maxsize=1, overflow=SQLITECLOUD_PUBSUB_OVERFLOW.COALESCE
+        )
+        dispatcher.add_callback(on_batch, "t")
+        dispatcher.put(notification("t", 0))
+        assert started.wait(5)
+        for i, payload in enumerate(payloads):
+            result = notification("t", i + 1)
+            result.get_result()["payload"] = payload
+            result.get_result().update(content)
+            dispatcher.put(result)
+
+        release.set()
+        dispatcher.close(timeout=5)
+
+        assert len(received) == 2
+        assert received[1]["channel"] == "t"
+        assert received[1]["payload"] == expected
+        assert received[1]["n"] == len(payloads)
+        assert dispatcher.coalesced == len(payloads) - 1
+
+    def test_block_waits_for_room(self):
+        release = threading.Event()
+        received = []
+
+        def on_batch(batch):
+            release.wait(5)
+            received.extend(numbers(batch))
+
+        dispatcher = PubSubDispatcher(
+            maxsize=1, overflow=SQLITECLOUD_PUBSUB_OVERFLOW.BLOCK
+        )
+        dispatcher.add_callback(on_batch, "a")
+        dispatcher.put(notification("a", 0))
+        dispatcher.put(notification("a", 1))
+
+        reader = threading.Thread(
+            target=dispatcher.put, args=(notification("a", 2),), daemon=True
+        )
+        reader.start()
+        reader.join(0.1)
+        assert reader.is_alive()
+
+        release.set()
+        reader.join(5)
+        dispatcher.close(timeout=5)
+
+        assert received == [0, 1, 2]
+        assert dispatcher.dropped == 0
+
+    def test_closed_connection(self, mocker):
+        on_closed = mocker.Mock()
+        connection = SQLiteCloudConnect()
+
+        with PubSubDispatcher(on_closed=on_closed) as dispatcher:
+            dispatcher(connection, None, None)
+
+        on_closed.assert_called_once_with(connection)
+
+    def test_callback_errors_are_logged(self, caplog):
+        received = []
+
+        def failing(batch):
+            raise ValueError("boom")
+
+        with PubSubDispatcher() as dispatcher:
+            dispatcher.add_callback(failing, "a")
+            dispatcher.add_callback(lambda b: received.extend(numbers(b)), "a")
+            dispatcher.put(notification("a", 1))
+
+        assert received == [1]
+        assert "boom" in caplog.text
+
+    def test_submitted_functions_run_in_order_per_key(self):
+        calls = {"a": [], "b": []}
+
+        with PubSubDispatcher(workers=4, maxsize=1) as dispatcher:
+            assert dispatcher.threads == 0
+            for i in range(100):
+                assert dispatcher.submit("a", calls["a"].append, i)
+                assert dispatcher.submit("b", calls["b"].append, i)
+
+            # not counted in the notifications waiting, never dropped
+            assert dispatcher.dropped == 0
+            assert 1 <= dispatcher.threads <= 4
+
+        assert calls["a"] == list(range(100))
+        assert calls["b"] == list(range(100))
+        assert dispatcher.delivered == 0
+        assert not dispatcher.submit("a", calls["a"].append, 100)
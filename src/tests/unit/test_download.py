@@ -0,0 +1,184 @@
+import os
+import sqlite3
+
+import pytest
+
+from sqlitecloud import download
+from sqlitecloud.driver import Driver
+from sqlitecloud.exceptions import SQLiteCloudError, SQLiteCloudException
+from tests.scsp_server import array, error, value
+
+
+class TestDownload:
+    @pytest.fixture()
+    def server(self, scsp_server):
+        """Stand-in server with a database of 10 chunks of 100 bytes."""
+        scsp_server.content = bytes(range(250)) * 4
+        scsp_server.fail_at = None
+        # sizes of the chunks, the last one is repeated
+        scsp_server.chunk_sizes = [100]
+        chunks = []
+
+        def handler(command):
+            if command.startswith("DOWNLOAD DATABASE"):
+                content = scsp_server.content
+                chunks[:] = []
+                sizes = list(scsp_server.chunk_sizes)
+                while content:
+                    size = sizes.pop(0) if len(sizes) > 1 else sizes[0]
+                    chunks.append(content[:size])
+                    content = content[size:]
+                return array([len(scsp_server.content), len(chunks), 0])
+            if command == "DOWNLOAD STEP":
+                if scsp_server.fail_at == len(chunks):
+                    return error("Download failed")
+                if not chunks:
+                    return error("No download in progress")
+                return value(chunks.pop(0))
+            return None
+
+        scsp_server.handler = handler
+        return scsp_server
+
+    @pytest.fixture()
+    def connection(self, server):
+        config = server.config()
+        return Driver().connect(config.account.hostname, config.account.port, config)
+
+    def steps(self, server):
+        return server.commands.count("DOWNLOAD STEP")
+
+    def test_steps_are_pipelined(self, server, connection, tmp_path, mocker):
+        write = mocker.spy(Driver, "_internal_socket_write")
+        filename = str(tmp_path / "db.sqlite")
+
+        download.download_db(connection, "db.sqlite", filename)
+
+        with open(filename, "rb") as file:
+            assert file.read() == server.content
+        assert not os.path.exists(filename + ".progress")
+        # first step alone to learn the chunk size, then a full window
+        steps = [
+            len(c.args[2]) for c in write.call_args_list if isinstance(c.args[2], list)
+        ]
+        assert steps[:2] == [1, 8]
+        # no step past the end of the database
+        assert self.steps(server) == 10
+
+    def test_steps_past_the_end_are_ignored(self, server, connection, tmp_path):
+        # the first chunk is smaller: more steps are requested than needed
+        server.chunk_sizes = [50, 200]
+        filename = str(tmp_path / "db.sqlite")
+
+        download.download_db(connection, "db.sqlite", filename)
+
+        with open(filename, "rb") as file:
+            assert file.read() == server.content
+        assert self.steps(server) > 6
+        assert "DOWNLOAD ABORT" not in server.commands
+
+    def test_failure_aborts_and_keeps_the_progress(
+        self, server, connection, tmp_path, mocker
+    ):
+        mocker.patch.object(download, "DOWNLOAD_CHECKPOINT_SIZE", 100)
+        filename = str(tmp_path / "db.sqlite")
+        server.fail_at = 4
+
+        with pytest.raises(SQLiteCloudError):
+            download.download_db(connection, "db.sqlite", filename, reuse_partial=True)
+
+        assert "DOWNLOAD ABORT" in server.commands
+        assert os.path.getsize(filename) == len(server.content)
+        with open(filename + ".progress") as file:
+            assert '"offset": 600' in file.read()
+
+        # the connection is still usable after the abort
+        server.fail_at = None
+        verify = mocker.spy(download._DownloadFile, "_verify")
+        download.download_db(connection, "db.sqlite", filename, reuse_partial=True)
+
+        with open(filename, "rb") as file:
+            assert file.read() == server.content
+        # the chunks saved before the failure are not written again
+        assert verify.spy_return_list == [True] * 6 + [False] * 4
+        assert not os.path.exists(filename + ".progress")
+
+    def test_no_progress_is_saved_by_default(self, server, connection, tmp_path):
+        filename = str(tmp_path / "db.sqlite")
+        server.fail_at = 4
+
+        with pytest.raises(SQLiteCloudError):
+            download.download_db(connection, "db.sqlite", filename)
+
+        assert not os.path.exists(filename + ".progress")
+
+    def test_abort_stops_on_network_error(self, mocker):
+        driver = Driver()
+        read = mocker.patch.object(
+            driver,
+            "_internal_socket_read",
+            side_effect=SQLiteCloudException("Connection closed"),
+        )
+        run = mocker.patch.object(driver, "_internal_run_command")
+
+        driver._internal_abort_transfer(mocker.Mock(), "DOWNLOAD ABORT", 5)
+
+        read.assert_called_once()
+        run.assert_not_called()
+
+    def test_changed_chunks_are_written_again(self, server, connection, tmp_path):
+        filename = str(tmp_path / "db.sqlite")
+        with open(filename, "wb") as file:
+            file.write(b"\xff" * 1000)
+        with open(filename + ".progress", "w") as file:
+            file.write('{"dbname": "db.sqlite", "offset": 500}')
+
+        download.download_db(connection, "db.sqlite", filename, reuse_partial=True)
+
+        with open(filename, "rb") as file:
+            assert file.read() == server.content
+
+    def test_progress_of_other_database_is_ignored(self, server, connection, tmp_path):
+        filename = str(tmp_path / "db.sqlite")
+        with open(filename, "wb") as file:
+            file.write(b"old")
+        with open(filename + ".progress", "w") as file:
+            file.write('{"dbname": "other.sqlite", "offset": 3}')
+
+        download.download_db(connection, "db.sqlite", filename, reuse_partial=True)
+
+        with open(filename, "rb") as file:
+            assert file.read() == server.content
+
+    @pytest.mark.skipif(
+        not hasattr(sqlite3.Connection, "deserialize"), reason="Python 3.11+"
+    )
+    def test_download_db_to_sqlite3(self, server, connection, mocker):
+        temporary = mocker.spy(download.tempfile, "TemporaryDirectory")
+        source = sqlite3.connect(":memory:")
+        source.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        source.execute("INSERT INTO items (name) VALUES ('one')")
+        source.commit()
+        server.content = source.serialize()
+
+        db = download.download_db_to_sqlite3(connection, "db.sqlite")
+
+        assert db.execute("SELECT * FROM items").fetchall() == [(1, "one")]
+        assert self.steps(server) == len(server.content) // 100 + 1
+        temporary.assert_not_called()
+
+    def test_download_db_to_sqlite3_without_deserialize(
+        self, server, connection, mocker, tmp_path
+    ):
+        mocker.patch.object(download, "_HAS_DESERIALIZE", False)
+        filename = tmp_path / "source.db"
+        source = sqlite3.connect(filename)
+        source.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        source.execute("INSERT INTO items (name) VALUES ('one')")
+        source.commit()
+        source.close()
+        server.content = filename.read_bytes()
+
+        db = download.download_db_to_sqlite3(connection, "db.sqlite")
+
+        assert db.execute("SELECT * FROM items").fetchall() == [(1, "one")]
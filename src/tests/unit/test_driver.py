@@ -1,8 +1,20 @@
+import os
+import socket
+import threading
+import time
+
 import pytest
 from pytest_mock import MockerFixture
 
-from sqlitecloud.datatypes import SQLiteCloudAccount, SQLiteCloudConfig
-from sqlitecloud.driver import Driver
+from sqlitecloud.datatypes import (
+    SQLiteCloudAccount,
+    SQLiteCloudConfig,
+    SQLiteCloudConnect,
+)
+from sqlitecloud.driver import Driver, _interleave_families
+from sqlitecloud.exceptions import SQLiteCloudException
+from sqlitecloud.nodes import NodeSelector
+from tests.scsp_server import chunked_rowset, rowset, value
 
 
 class TestDriver:
@@ -197,3 +209,288 @@ class TestDriver:
         run_command_mock.assert_called_once()
         assert expected_buffer in run_command_mock.call_args[0][1]
         assert b"AUTH APIKEY" not in run_command_mock.call_args[0][1]
+
+    def test_serialize_buffers_does_not_copy_blobs(self):
+        driver = Driver()
+        blob = b"x" * (1024 * 1024)
+
+        buffers = driver._internal_serialize_buffers(["SELECT ?", blob])
+
+        assert any(buffer is blob for buffer in buffers)
+        assert b"".join(buffers) == (b"=1048599 2 !9 SELECT ?\x00$1048576 " + blob)
+
+    def test_serialize_statement_with_many_bindings(self):
+        driver = Driver()
+        bindings = tuple(range(10000))
+
+        buffers = driver._internal_serialize_statement(
+            driver.encode_query("SELECT ?"), bindings
+        )
+
+        expected = driver._internal_serialize_command(
+            ["SELECT ?"] + list(bindings), zero_string=True
+        )
+        assert b"".join(buffers) == expected
+
+    def test_coalesce_buffers_joins_only_small_buffers(self):
+        driver = Driver()
+        blob = memoryview(b"y" * (128 * 1024))
+
+        coalesced = driver._internal_coalesce_buffers(
+            [b"=10 ", b"2 ", b"", b"$131072 ", blob, b":1 "]
+        )
+
+        assert coalesced[0] == b"=10 2 $131072 "
+        assert coalesced[1] is blob
+        assert coalesced[2] == b":1 "
+
+    def test_socket_sendmsg_handles_partial_writes(self, mocker: MockerFixture):
+        driver = Driver()
+        written = bytearray()
+
+        def sendmsg(buffers):
+            # the kernel accepts at most 7 bytes per call
+            data = b"".join(bytes(b) for b in buffers)[:7]
+            written.extend(data)
+            return len(data)
+
+        sock = mocker.Mock()
+        sock.sendmsg.side_effect = sendmsg
+
+        driver._internal_socket_sendmsg(
+            sock, [b"$10 ", memoryview(b"0123456789"), b":42 "]
+        )
+
+        assert bytes(written) == b"$10 0123456789:42 "
+
+    def test_socket_write_with_scatter_gather(self):
+        driver = Driver()
+        connection = SQLiteCloudConnect()
+        connection.socket, server = socket.socketpair()
+        blob = b"z" * (256 * 1024)
+        buffers = driver._internal_serialize_buffers(["SELECT ?", blob])
+        expected = b"".join(buffers)
+
+        received = bytearray()
+
+        def read():
+            while len(received) < len(expected):
+                received.extend(server.recv(65536))
+
+        reader = threading.Thread(target=read, daemon=True)
+        reader.start()
+        try:
+            driver._internal_socket_write(connection, buffers)
+            reader.join(5)
+
+            assert bytes(received) == expected
+        finally:
+            connection.socket.close()
+            server.close()
+
+    @pytest.mark.parametrize("blob_as_memoryview", [False, True])
+    def test_parse_rowset_blob_cells(self, blob_as_memoryview):
+        driver = Driver()
+        connection = SQLiteCloudConnect()
+        connection.config = SQLiteCloudConfig()
+        connection.config.blob_as_memoryview = blob_as_memoryview
+        buffer = rowset(["id", "thumbnail"], [[1, b"\x89PNG"], [2, b"GIF8"]])
+
+        result = driver._internal_parse_buffer(connection, buffer, len(buffer))
+
+        thumbnail = result.get_value(1, 1)
+        assert thumbnail == b"GIF8"
+        assert result.get_value(1, 0) == 2
+        if blob_as_memoryview:
+            assert isinstance(thumbnail, memoryview)
+            assert thumbnail.readonly
+            assert thumbnail.obj is buffer
+        else:
+            assert isinstance(thumbnail, bytes)
+
+    def test_blob_as_memoryview_from_socket(self, scsp_server):
+        driver = Driver()
+        config = scsp_server.config()
+        config.blob_as_memoryview = True
+        scsp_server.handler = lambda command: rowset(["data"], [[b"abc"], [b"def"]])
+
+        connection = driver.connect("127.0.0.1", scsp_server.port, config)
+        result = driver.execute("SELECT data FROM media", connection)
+
+        first, second = result.get_value(0, 0), result.get_value(1, 0)
+        assert isinstance(first, memoryview)
+        assert first.obj is second.obj
+        assert (first, second) == (b"abc", b"def")
+
+    def test_connection_shared_by_many_threads(self, scsp_server):
+        driver = Driver()
+        scsp_server.handler = lambda command: (
+            chunked_rowset(["n"], [[int(command.split()[1])]] * 3)
+            if command.startswith("SELECT")
+            else value(command)
+        )
+        connection = driver.connect("127.0.0.1", scsp_server.port, scsp_server.config())
+        errors = []
+
+        def run(i):
+            try:
+                for j in range(50):
+                    assert driver.execute(f"ECHO {i}-{j}", connection).get_value(
+                        0, 0
+                    ) == (f"ECHO {i}-{j}")
+                    result = driver.execute(f"SELECT {i}", connection)
+                    assert [result.get_value(r, 0) for r in range(3)] == [i] * 3
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+
+        assert errors == []
+
+    def test_connection_inherited_by_a_child_process_reconnects(self, scsp_server):
+        driver = Driver()
+        scsp_server.handler = lambda command: value(command)
+        connection = driver.connect("127.0.0.1", scsp_server.port, scsp_server.config())
+        connection.pubsub_listening.add("LISTEN orders;")
+        inherited = connection.socket
+
+        # as seen by a child process
+        connection.pid = -1
+        result = driver.execute("ECHO child", connection)
+
+        assert result.get_value(0, 0) == "ECHO child"
+        assert inherited.fileno() == -1
+        assert connection.socket is not inherited
+        assert connection.pid == os.getpid()
+        assert scsp_server.commands == [
+            "AUTH APIKEY abc123;",
+            "AUTH APIKEY abc123;",
+            "LISTEN orders;",
+            "ECHO child",
+        ]
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork()")
+    def test_fork_does_not_share_the_socket(self, scsp_server):
+        driver = Driver()
+        scsp_server.handler = lambda command: value(command)
+        connection = driver.connect("127.0.0.1", scsp_server.port, scsp_server.config())
+        reader, writer = os.pipe()
+
+        pid = os.fork()
+        if pid == 0:
+            try:
+                result = driver.execute("ECHO child", connection).get_value(0, 0)
+                os.write(writer, result.encode())
+            finally:
+                os._exit(0)
+
+        os.close(writer)
+        os.waitpid(pid, 0)
+        child = os.read(reader, 100)
+        os.close(reader)
+
+        assert child == b"ECHO child"
+        assert driver.execute("ECHO parent", connection).get_value(0, 0) == (
+            "ECHO parent"
+        )
+        assert scsp_server.commands.count("AUTH APIKEY abc123;") == 2
+
+    def test_connect_to_the_live_node_of_many(self, scsp_server, mocker):
+        selector = NodeSelector()
+        mocker.patch("sqlitecloud.driver.get_node_selector", return_value=selector)
+        scsp_server.handler = lambda command: value(command)
+        # a port with nobody listening
+        closed = socket.socket()
+        closed.bind(("127.0.0.1", 0))
+        dead = ("127.0.0.1", closed.getsockname()[1])
+        closed.close()
+        live = ("localhost", scsp_server.port)
+
+        config = scsp_server.config()
+        config.account.hostname, config.account.port = dead
+        config.account.nodes = [dead, live]
+        driver = Driver()
+
+        for _ in range(5):
+            connection = driver.connect(*dead, config)
+            assert connection.node == live
+            assert driver.execute("ECHO", connection).get_value(0, 0) == "ECHO"
+            driver.disconnect(connection)
+
+        assert selector.is_ejected(dead)
+        assert selector.latency(live) is not None
+        assert selector.request_latency(live) is not None
+
+    def test_connect_fails_when_no_node_answers(self, mocker):
+        mocker.patch(
+            "sqlitecloud.driver.get_node_selector", return_value=NodeSelector()
+        )
+        closed = socket.socket()
+        closed.bind(("127.0.0.1", 0))
+        port = closed.getsockname()[1]
+        closed.close()
+        config = SQLiteCloudConfig()
+        config.account = SQLiteCloudAccount(hostname="127.0.0.1", port=port)
+        config.insecure = True
+
+        with pytest.raises(SQLiteCloudException):
+            Driver().connect("127.0.0.1", port, config)
+
+    def test_slow_lookup_does_not_delay_the_other_nodes(self, mocker):
+        mocker.patch(
+            "sqlitecloud.driver.get_node_selector", return_value=NodeSelector()
+        )
+        release = threading.Event()
+        getaddrinfo = socket.getaddrinfo
+
+        def lookup(host, port, **kwargs):
+            if host == "slow":
+                release.wait(5)
+            return getaddrinfo("127.0.0.1", port, **kwargs)
+
+        mocker.patch("sqlitecloud.driver.socket.getaddrinfo", side_effect=lookup)
+        start = time.monotonic()
+
+        addresses, error = Driver()._internal_resolve_nodes(
+            [("slow", 1), ("fast", 2)], time.monotonic() + 5
+        )
+        release.set()
+
+        assert time.monotonic() - start < 1
+        assert [node for _, _, node in addresses] == [("fast", 2)]
+        assert error is None
+
+    def test_lookup_errors_do_not_eject_the_node(self, mocker):
+        selector = NodeSelector()
+        mocker.patch("sqlitecloud.driver.get_node_selector", return_value=selector)
+        mocker.patch(
+            "sqlitecloud.driver.socket.getaddrinfo",
+            side_effect=socket.gaierror(socket.EAI_AGAIN, "Temporary failure"),
+        )
+
+        addresses, error = Driver()._internal_resolve_nodes(
+            [("node", 1)], time.monotonic() + 5
+        )
+
+        assert addresses == []
+        assert isinstance(error, socket.gaierror)
+        assert not selector.is_ejected(("node", 1))
+
+    def test_interleave_address_families(self):
+        addresses = [
+            (socket.AF_INET6, "a6", 1),
+            (socket.AF_INET6, "b6", 1),
+            (socket.AF_INET6, "c6", 2),
+            (socket.AF_INET, "a4", 1),
+        ]
+
+        assert [a[1] for a in _interleave_families(addresses)] == [
+            "a6",
+            "a4",
+            "b6",
+            "c6",
+        ]
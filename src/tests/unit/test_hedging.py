@@ -0,0 +1,42 @@
+from sqlitecloud.hedging import HedgingPolicy
+
+
+class TestHedgingPolicy:
+    def test_initial_delay_until_enough_samples(self):
+        policy = HedgingPolicy(min_samples=3, initial_delay=0.5)
+
+        policy.observe(0.01)
+        policy.observe(0.02)
+
+        assert policy.delay() == 0.5
+
+    def test_delay_is_the_quantile_of_the_latencies(self):
+        policy = HedgingPolicy(quantile=0.95, min_samples=1)
+
+        for ms in range(100, 0, -1):
+            policy.observe(ms / 1000)
+
+        assert policy.delay() == 0.095
+
+    def test_old_latencies_leave_the_window(self):
+        policy = HedgingPolicy(quantile=1.0, window=10, min_samples=1)
+
+        policy.observe(5.0)
+        for _ in range(10):
+            policy.observe(0.01)
+
+        assert policy.delay() == 0.01
+
+    def test_min_delay(self):
+        policy = HedgingPolicy(min_samples=1, min_delay=0.002)
+
+        policy.observe(0.0001)
+
+        assert policy.delay() == 0.002
+
+    def test_only_single_selects_are_hedged(self):
+        policy = HedgingPolicy()
+
+        assert policy.should_hedge("  select * from t")
+        assert not policy.should_hedge("UPDATE t SET a = 1")
+        assert not policy.should_hedge("SELECT 1; DELETE FROM t")
@@ -0,0 +1,89 @@
+import random
+from collections import Counter
+
+from sqlitecloud.nodes import NodeSelector
+
+FAST = ("fast", 8860)
+SLOW = ("slow", 8860)
+NEW = ("new", 8860)
+
+
+class TestNodeSelector:
+    def test_faster_nodes_are_preferred(self):
+        selector = NodeSelector(rng=random.Random(1))
+        selector.observe(FAST, 0.01)
+        selector.observe(SLOW, 0.1)
+
+        first = Counter(selector.order([SLOW, FAST])[0] for _ in range(1000))
+
+        assert 850 < first[FAST] < 950
+        assert first[SLOW] > 0
+
+    def test_latency_is_a_moving_average(self):
+        selector = NodeSelector(alpha=0.5)
+
+        selector.observe(FAST, 0.1)
+        selector.observe(FAST, 0.2)
+
+        assert abs(selector.latency(FAST) - 0.15) < 1e-9
+        assert selector.latency(NEW) is None
+
+    def test_slower_requests_are_avoided(self):
+        selector = NodeSelector(rng=random.Random(1))
+        selector.observe(FAST, 0.01)
+        selector.observe(SLOW, 0.01)
+        selector.observe_request(FAST, 0.01)
+        selector.observe_request(SLOW, 0.19)
+
+        first = Counter(selector.order([SLOW, FAST])[0] for _ in range(1000))
+
+        assert 850 < first[FAST] < 950
+
+    def test_request_latency_is_a_moving_average(self):
+        selector = NodeSelector(alpha=0.5)
+
+        selector.observe_request(FAST, 0.1)
+        selector.observe_request(FAST, 0.2)
+
+        assert abs(selector.request_latency(FAST) - 0.15) < 1e-9
+        assert selector.latency(FAST) is None
+
+    def test_new_nodes_are_tried_like_the_fastest(self):
+        selector = NodeSelector(rng=random.Random(1))
+        selector.observe(FAST, 0.01)
+        selector.observe(SLOW, 1)
+
+        first = Counter(selector.order([SLOW, FAST, NEW])[0] for _ in range(1000))
+
+        assert first[NEW] > 400
+        assert first[FAST] > 400
+
+    def test_ejected_nodes_are_tried_last(self):
+        selector = NodeSelector(cooldown=60)
+        selector.observe(FAST, 0.01)
+
+        selector.eject(FAST)
+
+        assert selector.is_ejected(FAST)
+        assert selector.order([FAST, SLOW]) == [SLOW, FAST]
+
+    def test_cooldown_grows_with_the_failures(self, mocker):
+        selector = NodeSelector(cooldown=1, max_cooldown=3)
+        monotonic = mocker.patch("sqlitecloud.nodes.time.monotonic", return_value=100)
+
+        selector.eject(SLOW)
+        selector.eject(SLOW)
+        selector.eject(SLOW)
+
+        monotonic.return_value = 102.5
+        assert selector.is_ejected(SLOW)
+        monotonic.return_value = 103
+        assert not selector.is_ejected(SLOW)
+
+    def test_connection_ends_the_ejection(self):
+        selector = NodeSelector(cooldown=60)
+        selector.eject(SLOW)
+
+        selector.observe(SLOW, 0.1)
+
+        assert not selector.is_ejected(SLOW)
@@ -0,0 +1,333 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from sqlitecloud.datatypes import SQLITECLOUD_PUBSUB_SUBJECT, SQLiteCloudConnect
+from sqlitecloud.driver import Driver
+from sqlitecloud.exceptions import SQLiteCloudError
+from sqlitecloud.pubsub import PubSubPublisher, SQLiteCloudPubSub, _get_timers
+from sqlitecloud.reactor import PubSubReactor
+from sqlitecloud.resultset import (
+    SQLITECLOUD_RESULT_TYPE,
+    SQLiteCloudResult,
+    SQLiteCloudResultSet,
+)
+from tests.scsp_server import error
+
+
+def notification(payload: str) -> bytes:
+    return f"+{len(payload)} {payload}".encode()
+
+
+def change(table: str, *rows) -> SQLiteCloudResultSet:
+    return SQLiteCloudResultSet(
+        SQLiteCloudResult(
+            SQLITECLOUD_RESULT_TYPE.RESULT_JSON,
+            {"channel": table, "pk": ["id"], "payload": list(rows)},
+        )
+    )
+
+
+class TestCoalescing:
+    @pytest.fixture()
+    def listen(self, mocker):
+        pubsub = SQLiteCloudPubSub()
+        mocker.patch.object(pubsub._driver, "execute")
+        connection = SQLiteCloudConnect()
+        received = []
+
+        def listen(**kwargs):
+            pubsub.listen(
+                connection,
+                SQLITECLOUD_PUBSUB_SUBJECT.TABLE,
+                "orders",
+                lambda conn, result, data: received.append(
+                    result.get_result() if result else None
+                ),
+                **kwargs,
+            )
+            return lambda result: connection.pubsub_callback(connection, result, None)
+
+        return listen, received
+
+    def test_changes_are_summarized_up_to_the_max(self, listen):
+        listen, received = listen
+        notify = listen(coalesce_window=60, coalesce_max=3)
+
+        notify(change("orders", {"type": "INSERT", "id": 1}))
+        notify(change("orders", {"type": "UPDATE", "id": 1}))
+        assert received == []
+        notify(
+            change(
+                "orders",
+                {"type": "UPDATE", "id": 3, "sqlite_pk_id": 2},
+                {"type": "DELETE", "id": 1},
+            )
+        )
+
+        assert received == [
+            {
+                "channel": "orders",
+                "pk": ["id"],
+                "keys": [[1], [3], [2]],
+                "types": ["DELETE", "INSERT", "UPDATE"],
+                "count": 3,
+            }
+        ]
+
+    def test_changes_are_delivered_when_the_window_expires(self, listen):
+        listen, received = listen
+        notify = listen(coalesce_window=0.05)
+
+        for i in range(100):
+            notify(change("orders", {"type": "INSERT", "id": i % 10}))
+        for _ in range(100):
+            if received:
+                break
+            time.sleep(0.01)
+
+        assert len(received) == 1
+        assert received[0]["count"] == 100
+        assert received[0]["keys"] == [[i] for i in range(10)]
+
+    def test_windows_share_a_single_thread(self, mocker):
+        pubsub = SQLiteCloudPubSub()
+        mocker.patch.object(pubsub._driver, "execute")
+        received = []
+        threads = threading.active_count()
+
+        for i in range(20):
+            connection = SQLiteCloudConnect()
+            pubsub.listen(
+                connection,
+                SQLITECLOUD_PUBSUB_SUBJECT.TABLE,
+                f"t{i}",
+                lambda conn, result, data: received.append(result.get_result()),
+                coalesce_window=0.05 + i * 0.001,
+            )
+            connection.pubsub_callback(
+                connection, change(f"t{i}", {"type": "INSERT", "id": i}), None
+            )
+
+        assert threading.active_count() <= threads + 1
+        for _ in range(100):
+            if len(received) == 20:
+                break
+            time.sleep(0.01)
+
+        # in the order of expiration
+        assert [r["channel"] for r in received] == [f"t{i}" for i in range(20)]
+
+    def test_expired_changes_are_delivered_by_the_reactor_workers(self, mocker):
+        pubsub = SQLiteCloudPubSub()
+        mocker.patch.object(pubsub._driver, "execute")
+        reactor = PubSubReactor()
+        server, client = socket.socketpair()
+        connection = SQLiteCloudConnect()
+        connection.pubsub_socket = client
+        connection.pubsub_reactor = reactor
+        threads = []
+        delivered = threading.Event()
+
+        def callback(conn, result, data):
+            threads.append(threading.current_thread())
+            delivered.set()
+
+        pubsub.listen(
+            connection,
+            SQLITECLOUD_PUBSUB_SUBJECT.TABLE,
+            "orders",
+            callback,
+            coalesce_window=0.01,
+        )
+        reactor.register(connection, lambda: True, lambda: None)
+        try:
+            connection.pubsub_callback(
+                connection, change("orders", {"type": "INSERT", "id": 1}), None
+            )
+            assert delivered.wait(5)
+        finally:
+            reactor.shutdown(timeout=5)
+            server.close()
+            client.close()
+
+        assert threads[0] is not _get_timers()._thread
+        assert threads[0].name.startswith("sqlitecloud-dispatch")
+
+    def test_other_messages_flush_the_changes_first(self, listen):
+        listen, received = listen
+        notify = listen(coalesce_window=60)
+
+        notify(change("orders", {"type": "INSERT", "id": 1}))
+        notify(None)
+
+        assert received[0]["count"] == 1
+        assert received[1] is None
+
+    def test_without_coalescing_every_change_is_delivered(self, listen):
+        listen, received = listen
+        notify = listen()
+
+        notify(change("orders", {"type": "INSERT", "id": 1}))
+        notify(change("orders", {"type": "INSERT", "id": 2}))
+
+        assert [r["payload"][0]["id"] for r in received] == [1, 2]
+
+
+class TestNotify:
+    @pytest.fixture()
+    def server(self, scsp_server):
+        def handler(command):
+            if command.endswith("'fail';"):
+                return error("Cannot notify")
+            return None
+
+        scsp_server.handler = handler
+        return scsp_server
+
+    @pytest.fixture()
+    def connection(self, server):
+        config = server.config()
+        connection = Driver().connect(
+            config.account.hostname, config.account.port, config
+        )
+        yield connection
+        Driver().disconnect(connection)
+
+    def test_payload_is_escaped(self, server, connection):
+        SQLiteCloudPubSub().notify_channel(connection, "news", "it's")
+
+        assert server.commands[-1] == "NOTIFY \"news\" 'it''s';"
+
+    def test_channel_is_quoted(self, server, connection):
+        SQLiteCloudPubSub().notify_many(connection, "x\" 'a'; DROP TABLE t; --", ["b"])
+
+        assert server.commands[1:] == ["NOTIFY \"x\"\" 'a'; DROP TABLE t; --\" 'b';"]
+
+    def test_notify_many_sends_batches(self, server, connection, mocker):
+        pubsub = SQLiteCloudPubSub()
+        run_pipeline = mocker.spy(pubsub._driver, "_internal_run_pipeline")
+
+        sent = pubsub.notify_many(
+            connection, "news", (f"n{i}" for i in range(250)), batch_size=100
+        )
+
+        assert sent == 250
+        assert run_pipeline.call_count == 3
+        assert server.commands[1:] == [f"NOTIFY \"news\" 'n{i}';" for i in range(250)]
+
+    def test_publisher_batches_the_notifications(self, server, connection):
+        with PubSubPublisher(connection, flush_interval=60, max_batch=100) as publisher:
+            for i in range(250):
+                publisher.publish("news", f"n{i}")
+            publisher.flush()
+
+            assert publisher.sent == 250
+            assert publisher.batches == 3
+
+        assert server.commands[1:] == [f"NOTIFY \"news\" 'n{i}';" for i in range(250)]
+
+    def test_publisher_sends_after_the_interval(self, server, connection):
+        publisher = PubSubPublisher(connection, flush_interval=0.01)
+        publisher.publish("news", "a")
+        publisher.publish("news", "b")
+
+        for _ in range(100):
+            if publisher.sent == 2:
+                break
+            time.sleep(0.01)
+
+        assert publisher.sent == 2
+        assert publisher.batches == 1
+        publisher.close()
+
+    def test_publisher_raises_the_errors(self, server, connection):
+        publisher = PubSubPublisher(connection)
+        publisher.publish("news", "fail")
+        publisher.publish("news", "ok")
+
+        with pytest.raises(SQLiteCloudError, match="Cannot notify"):
+            publisher.flush()
+
+        publisher.close()
+        assert server.commands[-1] == "NOTIFY \"news\" 'ok';"
+
+
+class TestPubSubSubscription:
+    @pytest.fixture()
+    def server(self, scsp_server):
+        def handler(command):
+            if command.startswith("LISTEN"):
+                # the command to send on the PubSub socket
+                return b"|11 PUBSUB ID 1"
+            return None
+
+        scsp_server.handler = handler
+        return scsp_server
+
+    @pytest.fixture()
+    def connection(self, server):
+        config = server.config()
+        connection = Driver().connect(
+            config.account.hostname, config.account.port, config
+        )
+        yield connection
+        Driver().disconnect(connection)
+
+    def test_notifications_are_received_in_the_event_loop(
+        self, server, connection, mocker
+    ):
+        get_pubsub_reactor = mocker.patch("sqlitecloud.driver.get_pubsub_reactor")
+        pubsub = SQLiteCloudPubSub()
+
+        async def main():
+            events = []
+            async with pubsub.subscribe(
+                connection, SQLITECLOUD_PUBSUB_SUBJECT.CHANNEL, "orders"
+            ) as subscription:
+                peer = server._clients[-1]
+                peer.sendall(b"".join(notification(f'{{"n": {i}}}') for i in range(20)))
+
+                async for event in subscription:
+                    events.append((threading.current_thread(), event.get_result()))
+                    if len(events) == 20:
+                        break
+            return events
+
+        events = asyncio.run(main())
+
+        assert [json.loads(e)["n"] for _, e in events] == list(range(20))
+        assert {thread for thread, _ in events} == {threading.current_thread()}
+        get_pubsub_reactor.assert_not_called()
+        assert server.commands[1:] == [
+            "LISTEN orders;",
+            "PUBSUB ID 1",
+            "UNLISTEN orders;",
+        ]
+
+    def test_iteration_ends_when_the_connection_is_closed(self, server, connection):
+        pubsub = SQLiteCloudPubSub()
+
+        async def main():
+            events = []
+            subscription = pubsub.subscribe(
+                connection, SQLITECLOUD_PUBSUB_SUBJECT.TABLE, "orders"
+            )
+            await subscription.start()
+
+            peer = server._clients[-1]
+            peer.sendall(notification('{"channel": "orders"}'))
+            peer.shutdown(socket.SHUT_RDWR)
+
+            async for event in subscription:
+                events.append(event.get_result())
+            return events
+
+        events = asyncio.run(asyncio.wait_for(main(), 5))
+
+        assert events == ['{"channel": "orders"}']
+        assert server.commands[1] == "LISTEN TABLE orders;"
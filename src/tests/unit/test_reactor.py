@@ -0,0 +1,263 @@
+import json
+import logging
+import socket
+import threading
+import time
+
+import pytest
+
+from sqlitecloud.datatypes import SQLiteCloudConnect
+from sqlitecloud.driver import Driver, _FrameDecoder
+from sqlitecloud.reactor import PubSubReactor
+
+
+def notification(payload: str) -> bytes:
+    return f"+{len(payload)} {payload}".encode()
+
+
+class TestPubSubReactor:
+    @pytest.fixture()
+    def reactor(self):
+        reactor = PubSubReactor()
+        yield reactor
+        reactor.shutdown(timeout=5)
+
+    def make_connection(self, driver, received, closed):
+        server, client = socket.socketpair()
+
+        connection = SQLiteCloudConnect()
+        connection.pubsub_socket = client
+        connection.pubsub_callback = lambda conn, result, data: (
+            received.append((threading.current_thread(), result.get_result()))
+            if result
+            else closed.set()
+        )
+        return connection, server
+
+    def test_single_thread_for_all_connections(self, reactor):
+        driver = Driver()
+        received = []
+        done = threading.Event()
+        peers = []
+
+        for _ in range(10):
+            connection, server = self.make_connection(driver, received, done)
+            reactor.register(
+                connection,
+                driver._internal_pubsub_reader(connection, reactor),
+                lambda c=connection: driver._internal_pubsub_closed(c),
+            )
+            peers.append(server)
+
+        for i, server in enumerate(peers):
+            server.sendall(notification(f'{{"channel": "c{i}"}}'))
+
+        for _ in range(100):
+            if len(received) == 10:
+                break
+            threading.Event().wait(0.05)
+
+        # the thread reading the sockets and the workers running the callbacks
+        workers = {thread for thread, _ in received}
+        assert reactor.thread not in workers
+        assert len(workers) <= reactor.threads - 1 <= reactor.max_workers
+        assert reactor.connections == 10
+        assert sorted(json.loads(r)["channel"] for _, r in received) == [
+            f"c{i}" for i in range(10)
+        ]
+
+    def test_slow_callback_does_not_delay_other_connections(self, reactor):
+        driver = Driver()
+        release = threading.Event()
+        received = threading.Event()
+        closed = threading.Event()
+
+        slow, slow_server = self.make_connection(driver, [], closed)
+        slow.pubsub_callback = lambda conn, result, data: release.wait(5)
+        fast, fast_server = self.make_connection(driver, [], closed)
+        fast.pubsub_callback = lambda conn, result, data: result and received.set()
+
+        for connection in (slow, fast):
+            reactor.register(
+                connection,
+                driver._internal_pubsub_reader(connection, reactor),
+                lambda c=connection: driver._internal_pubsub_closed(c),
+            )
+
+        slow_server.sendall(notification('{"channel": "slow"}'))
+        time.sleep(0.05)
+        fast_server.sendall(notification('{"channel": "fast"}'))
+
+        assert received.wait(2)
+        release.set()
+
+    def test_callbacks_of_a_connection_run_in_order(self, mocker):
+        reactor = PubSubReactor(max_workers=4, max_pending=8)
+        driver = Driver()
+        received = []
+        closed = threading.Event()
+        connection, server = self.make_connection(driver, received, closed)
+        reactor.register(
+            connection,
+            driver._internal_pubsub_reader(connection, reactor),
+            lambda: driver._internal_pubsub_closed(connection),
+        )
+
+        payloads = [f'{{"channel": "c", "n": {i}}}' for i in range(200)]
+        server.sendall(b"".join(notification(p) for p in payloads))
+        server.close()
+
+        assert closed.wait(5)
+        assert [r for _, r in received] == payloads
+        reactor.shutdown(timeout=5)
+
+    def test_closed_connection_is_unregistered(self, reactor):
+        driver = Driver()
+        closed = threading.Event()
+        connection, server = self.make_connection(driver, [], closed)
+        reactor.register(
+            connection,
+            driver._internal_pubsub_reader(connection, reactor),
+            lambda: driver._internal_pubsub_closed(connection),
+        )
+
+        server.close()
+
+        assert closed.wait(5)
+        assert reactor.connections == 0
+
+    def test_disconnect_unregisters_the_connection(self, reactor, mocker):
+        mocker.patch("sqlitecloud.driver.get_pubsub_reactor", return_value=reactor)
+        driver = Driver()
+        closed = threading.Event()
+        connection, server = self.make_connection(driver, [], closed)
+        on_closed = mocker.Mock()
+        reactor.register(connection, lambda: True, on_closed)
+
+        driver.disconnect(connection)
+
+        on_closed.assert_called_once_with()
+        assert reactor.connections == 0
+        assert connection.pubsub_socket is None
+
+    def test_shutdown_stops_the_thread(self, reactor):
+        server, client = socket.socketpair()
+        connection = SQLiteCloudConnect()
+        connection.pubsub_socket = client
+        closed = threading.Event()
+        reactor.register(connection, lambda: True, closed.set)
+
+        reactor.shutdown(timeout=5)
+
+        assert closed.is_set()
+        assert reactor.threads == 0
+        assert reactor.connections == 0
+
+    def test_many_notifications_in_a_single_read(self, reactor):
+        driver = Driver()
+        received = []
+        closed = threading.Event()
+        connection, server = self.make_connection(driver, received, closed)
+        reactor.register(
+            connection,
+            driver._internal_pubsub_reader(connection, reactor),
+            lambda: driver._internal_pubsub_closed(connection),
+        )
+
+        payloads = [f'{{"channel": "c", "n": {i}}}' for i in range(50)]
+        data = b"".join(notification(p) for p in payloads)
+        # the tail of the data arrives with a later read
+        server.sendall(data[:-10])
+        time.sleep(0.05)
+        server.sendall(data[-10:])
+        server.close()
+
+        assert closed.wait(5)
+        assert [r for _, r in received] == payloads
+
+    @pytest.mark.slow
+    def test_notifications_throughput(self, reactor):
+        driver = Driver()
+        received = []
+        closed = threading.Event()
+        connection, server = self.make_connection(driver, received, closed)
+        reactor.register(
+            connection,
+            driver._internal_pubsub_reader(connection, reactor),
+            lambda: driver._internal_pubsub_closed(connection),
+        )
+
+        count = 20000
+        payload = '{"channel": "t", "payload": [' + '{"type": "INSERT"}, ' * 20 + "{}]}"
+        data = notification(payload) * count
+
+        start = time.perf_counter()
+        server.sendall(data)
+        server.close()
+        assert closed.wait(60)
+        elapsed = time.perf_counter() - start
+
+        assert len(received) == count
+        logging.info(
+            f"{count / elapsed:.0f} notifications/s, {len(data) / elapsed / 2**20:.1f} MB/s"
+        )
+
+
+class TestFrameDecoder:
+    def test_frames_split_at_every_byte(self):
+        data = b"+5 hello:42 _ $3 abc,1.5 +2 ok"
+        decoder = _FrameDecoder()
+
+        frames = []
+        for i in range(len(data)):
+            decoder.feed(data[i : i + 1])
+            frames += decoder.frames()
+
+        assert frames == [b"+5 hello", b":42 ", b"_ ", b"$3 abc", b",1.5 ", b"+2 ok"]
+
+    def test_remainder_is_kept_for_the_next_read(self):
+        decoder = _FrameDecoder()
+
+        decoder.feed(b"+3 one+3 tw")
+        assert decoder.frames() == [b"+3 one"]
+
+        decoder.feed(b"o+5 th")
+        assert decoder.frames() == [b"+3 two"]
+
+        decoder.feed(b"ree")
+        assert decoder.frames() == [b"+5 three"]
+        assert decoder.frames() == []
+
+    def test_large_frame_is_received_into_a_single_buffer(self):
+        server, client = socket.socketpair()
+        payload = b"x" * (3 * 1024 * 1024)
+        frame = b"$%d " % len(payload) + payload
+
+        sender = threading.Thread(target=server.sendall, args=(frame,))
+        sender.start()
+
+        decoder = _FrameDecoder()
+        frames = []
+        while not frames:
+            assert decoder.recv(client) > 0
+            frames = decoder.frames()
+        sender.join()
+
+        assert frames == [frame]
+        assert decoder.recv_size > _FrameDecoder.MIN_RECV_SIZE
+
+    def test_recv_size_shrinks_with_small_reads(self):
+        server, client = socket.socketpair()
+        decoder = _FrameDecoder(recv_size=_FrameDecoder.MAX_RECV_SIZE)
+
+        server.sendall(b"+2 ok")
+        decoder.recv(client)
+
+        assert decoder.frames() == [b"+2 ok"]
+        assert decoder.recv_size == _FrameDecoder.MAX_RECV_SIZE // 2
+
+    def test_recv_returns_zero_when_closed(self):
+        server, client = socket.socketpair()
+        server.close()
+
+        assert _FrameDecoder().recv(client) == 0
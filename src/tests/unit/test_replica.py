@@ -0,0 +1,168 @@
+import sqlite3
+
+import pytest
+
+from sqlitecloud.datatypes import SQLITECLOUD_PUBSUB_SUBJECT
+from sqlitecloud.driver import Driver
+from sqlitecloud.replica import LocalReplica
+from sqlitecloud.resultset import (
+    SQLITECLOUD_RESULT_TYPE,
+    SQLiteCloudResult,
+    SQLiteCloudResultSet,
+)
+from tests.scsp_server import array, rowset, value
+
+
+def notification(table, *rows, pk=("id",)):
+    return SQLiteCloudResultSet(
+        SQLiteCloudResult(
+            SQLITECLOUD_RESULT_TYPE.RESULT_JSON,
+            {"channel": table, "type": "TABLE", "pk": list(pk), "payload": list(rows)},
+        )
+    )
+
+
+class TestLocalReplica:
+    @pytest.fixture()
+    def server(self, scsp_server, tmp_path):
+        """Stand-in server with a database of a single table `items`."""
+        filename = str(tmp_path / "remote.db")
+        db = sqlite3.connect(filename)
+        db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        db.executemany("INSERT INTO items VALUES (?, ?)", [(1, "one"), (2, "two")])
+        db.commit()
+        db.close()
+
+        with open(filename, "rb") as file:
+            content = file.read()
+        chunks = []
+
+        def handler(command):
+            if command.startswith("DOWNLOAD DATABASE"):
+                chunks[:] = [
+                    content[i : i + 1024] for i in range(0, len(content), 1024)
+                ]
+                return array([len(content), len(chunks), 0])
+            if command == "DOWNLOAD STEP":
+                return value(chunks.pop(0))
+            if command.startswith("SELECT name FROM sqlite_master"):
+                return rowset(["name"], [["items"]])
+            return None
+
+        scsp_server.handler = handler
+        return scsp_server
+
+    @pytest.fixture()
+    def connection(self, server):
+        config = server.config()
+        return Driver().connect(config.account.hostname, config.account.port, config)
+
+    def downloads(self, server):
+        return [c for c in server.commands if c.startswith("DOWNLOAD DATABASE")]
+
+    def test_queries_run_on_the_downloaded_copy(self, server, connection):
+        replica = LocalReplica(connection, "remote.db")
+
+        assert replica.execute("SELECT name FROM items ORDER BY id") == [
+            ("one",),
+            ("two",),
+        ]
+        assert replica.execute("SELECT name FROM items WHERE id = ?", (2,)) == [
+            ("two",)
+        ]
+        assert len(self.downloads(server)) == 1
+
+    def test_download_to_file(self, server, connection, tmp_path):
+        filename = str(tmp_path / "replica.db")
+
+        with LocalReplica(connection, "remote.db", filename=filename) as replica:
+            replica.sync()
+            replica.sync()
+            assert replica.execute("SELECT count(*) FROM items") == [(2,)]
+
+        assert [p.name for p in tmp_path.iterdir() if p.suffix == ".download"] == []
+
+    def test_replica_is_readonly(self, server, connection):
+        replica = LocalReplica(connection, "remote.db")
+
+        with pytest.raises(sqlite3.OperationalError):
+            replica.execute("DELETE FROM items")
+
+    def test_listens_to_all_tables(self, server, connection, mocker):
+        listen = mocker.patch("sqlitecloud.replica.SQLiteCloudPubSub.listen")
+        pubsub_connection = object()
+
+        replica = LocalReplica(
+            connection, "remote.db", pubsub_connection=pubsub_connection
+        )
+        replica.sync()
+
+        listen.assert_called_once_with(
+            pubsub_connection,
+            SQLITECLOUD_PUBSUB_SUBJECT.TABLE,
+            "items",
+            replica._on_notification,
+        )
+
+    def test_applies_notified_changes(self, server, connection):
+        replica = LocalReplica(connection, "remote.db", tables=["items"])
+        replica.sync()
+
+        replica._on_notification(
+            None,
+            notification(
+                "items",
+                {"id": 3, "name": "three", "type": "INSERT"},
+                {"id": 10, "sqlite_pk_id": 1, "name": "ten", "type": "UPDATE"},
+                {"id": 2, "type": "DELETE"},
+            ),
+            None,
+        )
+
+        assert replica.execute("SELECT * FROM items ORDER BY id") == [
+            (3, "three"),
+            (10, "ten"),
+        ]
+        assert replica.changes == 3
+        assert not replica.stale
+
+    def test_changes_received_while_downloading_are_applied(self, server, connection):
+        replica = LocalReplica(connection, "remote.db", tables=["items"])
+        download = replica._download_in_memory
+
+        def download_and_notify():
+            db = download()
+            replica._on_notification(
+                None,
+                notification("items", {"id": 1, "name": "uno", "type": "UPDATE"}),
+                None,
+            )
+            return db
+
+        replica._download_in_memory = download_and_notify
+        replica.sync()
+
+        assert replica.execute("SELECT name FROM items WHERE id = 1") == [("uno",)]
+
+    def test_resyncs_when_a_change_cannot_be_applied(self, server, connection):
+        replica = LocalReplica(connection, "remote.db", tables=["items"])
+        replica.sync()
+
+        replica._on_notification(
+            None, notification("items", {"id": 7, "name": "x", "type": "UPDATE"}), None
+        )
+        assert replica.stale
+
+        replica.execute("SELECT * FROM items")
+
+        assert len(self.downloads(server)) == 2
+        assert not replica.stale
+
+    def test_resyncs_when_the_pubsub_connection_is_lost(self, server, connection):
+        replica = LocalReplica(connection, "remote.db", tables=["items"])
+        replica.sync()
+
+        replica._on_notification(None, None, None)
+        replica.execute("SELECT * FROM items")
+
+        assert len(self.downloads(server)) == 2
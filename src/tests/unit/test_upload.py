@@ -0,0 +1,306 @@
+import io
+import sqlite3
+import threading
+
+import pytest
+
+from sqlitecloud import upload
+from sqlitecloud.driver import Driver, _UploadChunkTuner
+from sqlitecloud.exceptions import SQLiteCloudException
+from tests.scsp_server import error
+
+
+class TestUpload:
+    @pytest.fixture()
+    def server(self, scsp_server):
+        """Stand-in server collecting the uploaded chunks."""
+        scsp_server.chunks = []
+        scsp_server.fail_at = None
+
+        def handler(command):
+            # the empty confirmation blob is parsed as an empty string
+            if isinstance(command, bytes) or command == "":
+                if len(scsp_server.chunks) == scsp_server.fail_at:
+                    return error("Upload failed")
+                scsp_server.chunks.append(command)
+            return None
+
+        scsp_server.handler = handler
+        return scsp_server
+
+    @pytest.fixture()
+    def connection(self, server):
+        config = server.config()
+        return Driver().connect(config.account.hostname, config.account.port, config)
+
+    @pytest.fixture()
+    def database(self, tmp_path):
+        filename = tmp_path / "db.sqlite"
+        filename.write_bytes(bytes(range(256)) * 40)
+        return filename
+
+    def upload(self, connection, database, **kwargs):
+        with open(database, "rb") as fd:
+            Driver().upload_database(
+                connection,
+                "db.sqlite",
+                None,
+                False,
+                0,
+                False,
+                fd,
+                database.stat().st_size,
+                upload.xCallback,
+                **kwargs,
+            )
+
+    def test_upload_db(self, server, connection, database):
+        upload.upload_db(connection, "db.sqlite", None, str(database))
+
+        assert (
+            server.commands[-len(server.chunks) - 1] == "UPLOAD DATABASE 'db.sqlite' "
+        )
+        assert b"".join(server.chunks[:-1]) == database.read_bytes()
+        # final confirmation
+        assert server.chunks[-1] == ""
+
+    def test_chunks_are_pipelined(self, server, connection, database, mocker):
+        events = []
+        write = Driver._internal_socket_write
+        read = Driver._internal_socket_read
+
+        def spy_write(self, *args, **kwargs):
+            events.append("write")
+            return write(self, *args, **kwargs)
+
+        def spy_read(self, *args, **kwargs):
+            # the stand-in server reads with the driver too
+            if threading.current_thread() is threading.main_thread():
+                events.append("read")
+            return read(self, *args, **kwargs)
+
+        mocker.patch.object(Driver, "_internal_socket_write", spy_write)
+        mocker.patch.object(Driver, "_internal_socket_read", spy_read)
+
+        self.upload(connection, database, window=4, chunk_size=1024)
+
+        # 10 chunks and the final confirmation, after UPLOAD DATABASE
+        assert len(server.chunks) == 11
+        assert events[2:8] == ["write"] * 4 + ["read", "write"]
+        assert events.count("read") == events.count("write")
+
+    def test_failure_aborts_the_upload(self, server, connection, database):
+        server.fail_at = 2
+
+        with pytest.raises(SQLiteCloudException):
+            self.upload(connection, database, window=4, chunk_size=1024)
+
+        assert server.commands[-1] == "UPLOAD ABORT"
+        # the connection is still usable after the abort
+        assert Driver().execute("SELECT 1", connection).data == [True]
+
+    def test_upload_db_from_bytes(self, server, connection, database, mocker):
+        serialize = mocker.spy(Driver, "_internal_serialize_buffers")
+        data = bytearray(database.read_bytes())
+
+        upload.upload_db_from_bytes(connection, "db.sqlite", None, data)
+
+        assert b"".join(server.chunks[:-1]) == data
+        # chunks are slices of the data
+        assert isinstance(serialize.call_args_list[1].args[1], memoryview)
+
+    def test_upload_db_from_stream(self, server, connection, database):
+        with open(database, "rb") as stream:
+            upload.upload_db_from_stream(
+                connection, "db.sqlite", None, stream, database.stat().st_size
+            )
+
+        assert b"".join(server.chunks[:-1]) == database.read_bytes()
+
+    def test_upload_db_from_short_stream(self, server, connection):
+        with pytest.raises(SQLiteCloudException):
+            upload.upload_db_from_stream(
+                connection, "db.sqlite", None, io.BytesIO(b"abc"), 10
+            )
+
+        assert server.commands[-1] == "UPLOAD ABORT"
+
+    @pytest.mark.skipif(
+        not hasattr(sqlite3.Connection, "serialize"), reason="Python 3.11+"
+    )
+    def test_upload_db_from_sqlite3(self, server, connection, mocker):
+        temporary = mocker.spy(upload.tempfile, "TemporaryDirectory")
+        db = sqlite3.connect(":memory:")
+        db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        db.execute("INSERT INTO items (name) VALUES ('one')")
+        db.commit()
+
+        upload.upload_db_from_sqlite3(connection, "db.sqlite", None, db)
+
+        assert b"".join(server.chunks[:-1]) == db.serialize()
+        temporary.assert_not_called()
+
+    def test_upload_db_from_sqlite3_without_serialize(
+        self, server, connection, mocker, tmp_path
+    ):
+        mocker.patch.object(upload, "_HAS_SERIALIZE", False)
+        db = sqlite3.connect(":memory:")
+        db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        db.execute("INSERT INTO items (name) VALUES ('one')")
+        db.commit()
+
+        upload.upload_db_from_sqlite3(connection, "db.sqlite", None, db)
+
+        filename = tmp_path / "uploaded.db"
+        filename.write_bytes(b"".join(server.chunks[:-1]))
+        uploaded = sqlite3.connect(filename)
+        try:
+            assert uploaded.execute("SELECT * FROM items").fetchall() == [(1, "one")]
+        finally:
+            uploaded.close()
+
+
+class TestUploadChunkTuner:
+    def test_chunk_size_covers_bandwidth_delay_product(self, mocker):
+        now = mocker.patch("sqlitecloud.driver.time.monotonic")
+        tuner = _UploadChunkTuner(None, window=4)
+
+        # 100 ms of round trip, 1 MB of chunk acknowledged every 100 ms: 10 MB/s
+        for i in range(20):
+            now.return_value = 0.1 * (i + 1)
+            tuner.acknowledged(1024 * 1024, 0.1 * i)
+
+        assert tuner.rtt == pytest.approx(0.1)
+        assert tuner.bandwidth == pytest.approx(10 * 1024 * 1024)
+        # 2 * 1 MB of BDP over 4 chunks in flight
+        assert tuner.chunk_size == pytest.approx(512 * 1024, abs=1)
+
+    def test_chunk_size_is_bounded(self, mocker):
+        now = mocker.patch("sqlitecloud.driver.time.monotonic")
+        tuner = _UploadChunkTuner(None, window=4)
+
+        now.return_value = 1.001
+        tuner.acknowledged(1024, 1.0)
+
+        assert tuner.chunk_size == _UploadChunkTuner.MIN_SIZE
+
+    def test_fixed_chunk_size(self, mocker):
+        tuner = _UploadChunkTuner(1000, window=4)
+
+        tuner.acknowledged(1000, 0)
+
+        assert tuner.chunk_size == 1000
+
+
+class TestUploadIfChanged:
+    @pytest.fixture()
+    def server(self, scsp_server):
+        """Stand-in server storing the uploaded database."""
+        scsp_server.database = bytearray()
+        scsp_server.uploads = 0
+        received = []
+
+        def handler(command):
+            if isinstance(command, str) and command.startswith("UPLOAD DATABASE"):
+                received[:] = []
+            elif isinstance(command, bytes):
+                received.append(command)
+            elif command == "" and received:
+                # confirmation of the upload
+                scsp_server.database[:] = b"".join(received)
+                scsp_server.uploads += 1
+            return None
+
+        scsp_server.handler = handler
+        return scsp_server
+
+    @pytest.fixture()
+    def connection(self, server):
+        config = server.config()
+        return Driver().connect(config.account.hostname, config.account.port, config)
+
+    @pytest.fixture()
+    def database(self, tmp_path):
+        filename = str(tmp_path / "db.sqlite")
+        db = sqlite3.connect(filename)
+        db.execute("PRAGMA page_size = 1024")
+        db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+        db.executemany(
+            "INSERT INTO items (name) VALUES (?)", [("x" * 100,) for _ in range(200)]
+        )
+        db.commit()
+        yield filename, db
+        db.close()
+
+    def read(self, filename):
+        with open(filename, "rb") as file:
+            return file.read()
+
+    def test_uploads_only_when_changed(self, server, connection, database):
+        filename, db = database
+
+        size = upload.upload_db_if_changed(connection, "db.sqlite", None, filename)
+        assert size == len(self.read(filename))
+
+        assert upload.upload_db_if_changed(connection, "db.sqlite", None, filename) == 0
+        assert server.uploads == 1
+
+        db.execute("UPDATE items SET name = 'changed' WHERE id = 100")
+        db.commit()
+        size = upload.upload_db_if_changed(connection, "db.sqlite", None, filename)
+
+        assert size == len(self.read(filename))
+        assert server.database == self.read(filename)
+        assert server.uploads == 2
+
+    def test_uploads_truncated_database(self, server, connection, database):
+        filename, db = database
+        upload.upload_db_if_changed(connection, "db.sqlite", None, filename)
+
+        db.execute("DELETE FROM items WHERE id > 10")
+        db.commit()
+        db.execute("VACUUM")
+        upload.upload_db_if_changed(connection, "db.sqlite", None, filename)
+
+        assert server.database == self.read(filename)
+        assert server.uploads == 2
+
+    def test_uploads_without_manifest(self, server, connection, database, tmp_path):
+        filename, db = database
+        upload.upload_db_if_changed(connection, "db.sqlite", None, filename)
+
+        size = upload.upload_db_if_changed(
+            connection,
+            "db.sqlite",
+            None,
+            filename,
+            manifest_filename=str(tmp_path / "other.manifest"),
+        )
+
+        assert size == len(self.read(filename))
+
+    def test_uploads_to_another_database(self, server, connection, database):
+        filename, db = database
+        upload.upload_db_if_changed(connection, "db.sqlite", None, filename)
+
+        size = upload.upload_db_if_changed(connection, "other.sqlite", None, filename)
+
+        assert size == len(self.read(filename))
+
+    def test_failed_upload_keeps_the_previous_manifest(
+        self, server, connection, database, mocker
+    ):
+        filename, db = database
+        upload.upload_db_if_changed(connection, "db.sqlite", None, filename)
+        db.execute("UPDATE items SET name = 'changed' WHERE id = 100")
+        db.commit()
+
+        mocker.patch.object(
+            upload, "upload_db", side_effect=SQLiteCloudException("failed")
+        )
+        with pytest.raises(SQLiteCloudException):
+            upload.upload_db_if_changed(connection, "db.sqlite", None, filename)
+        mocker.stopall()
+
+        assert upload.upload_db_if_changed(connection, "db.sqlite", None, filename)
+        assert server.database == self.read(filename)